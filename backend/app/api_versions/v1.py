@@ -10,6 +10,8 @@ from datetime import datetime, timezone
 
 from flask import Blueprint, jsonify, request
 from utils.firebase_utils import FirebaseUtils
+from utils.product_similarity import queue_similarity_refresh
+from utils.recommendation_cache import invalidate_products
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -128,6 +130,8 @@ def create_product():
 
         product_id = firebase.create_document("products", product_data)
         product_data["id"] = product_id
+        queue_similarity_refresh([product_data])
+        invalidate_products(product_data)
 
         logger.info(f"V1 - Created product: {product_id}")
         return jsonify(product_data), 201
@@ -10,6 +10,8 @@ from datetime import datetime, timezone
 
 from flask import Blueprint, jsonify, request
 from utils.firebase_utils import FirebaseUtils
+from utils.product_similarity import queue_similarity_refresh
+from utils.recommendation_cache import ALL, invalidate_products, recommendation_cache
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -203,6 +205,8 @@ def create_product():
 
         product_id = firebase.create_document("products", product_data)
         product_data["id"] = product_id
+        queue_similarity_refresh([product_data])
+        invalidate_products(product_data)
 
         logger.info(f"V2 - Created product: {product_id}")
         return jsonify(product_data), 201
@@ -271,42 +275,46 @@ def search_products():
 def get_recommendations(product_id):
     """Get product recommendations - V2 Only"""
     try:
-        product = firebase.get_document("products", product_id)
-        if not product:
-            return jsonify({"error": "Product not found", "version": "2.0.0"}), 404
 
-        # V2 simple recommendation algorithm
-        all_products = firebase.get_documents("products")
-        recommendations = []
+        def compute():
+            product = firebase.get_document("products", product_id)
+            if not product:
+                return None, None
 
-        for p in all_products:
-            if p.get("id") != product_id:
-                score = 0
+            # V2 simple recommendation algorithm
+            all_products = firebase.get_documents("products")
+            recommendations = []
 
-                # Same category
-                if p.get("category") == product.get("category"):
-                    score += 5
+            for p in all_products:
+                if p.get("id") != product_id:
+                    score = 0
 
-                # Similar price range
-                price_diff = abs(p.get("price", 0) - product.get("price", 0))
-                if price_diff <= product.get("price", 0) * 0.2:  # Within 20%
-                    score += 3
+                    # Same category
+                    if p.get("category") == product.get("category"):
+                        score += 5
 
-                if score > 0:
-                    p["recommendation_score"] = score
-                    recommendations.append(p)
+                    # Similar price range
+                    price_diff = abs(p.get("price", 0) - product.get("price", 0))
+                    if price_diff <= product.get("price", 0) * 0.2:  # Within 20%
+                        score += 3
 
-        # Sort and limit
-        recommendations.sort(key=lambda x: x["recommendation_score"], reverse=True)
-        recommendations = recommendations[:5]
+                    if score > 0:
+                        p["recommendation_score"] = score
+                        recommendations.append(p)
 
-        return jsonify(
-            {
-                "recommendations": recommendations,
-                "base_product": product,
-                "version": "2.0.0",
-            }
-        )
+            # Sort and limit
+            recommendations.sort(key=lambda x: x["recommendation_score"], reverse=True)
+            recommendations = recommendations[:5]
+
+            result = {"recommendations": recommendations, "base_product": product}
+            # Price matches cross categories, so any product change counts
+            return result, [ALL]
+
+        result, _ = recommendation_cache.get_or_compute(("v2", product_id, 5), compute)
+        if result is None:
+            return jsonify({"error": "Product not found", "version": "2.0.0"}), 404
+
+        return jsonify({**result, "version": "2.0.0"})
     except Exception as e:
         logger.error(f"V2 - Recommendations error: {str(e)}")
         return (
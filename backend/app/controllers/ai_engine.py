@@ -3,13 +3,16 @@ import logging
 import re
 import warnings
 from datetime import datetime, timedelta
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Union
 
 import numpy as np
 import openai
 import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
+from utils import forecasting, holt_winters
+from utils.product_catalog import ProductCatalog
+from utils.product_similarity import get_similarity_index
 
 warnings.filterwarnings("ignore")
 
@@ -56,6 +59,55 @@ class AIEngine:
             avg = np.mean(historical_data) if historical_data else 0
             return [avg] * days_ahead
 
+    def holt_winters_forecast(
+        self,
+        history,
+        days_ahead: int = 30,
+        product_ids: Optional[List[Any]] = None,
+    ) -> np.ndarray:
+        """
+        Holt-Winters forecast with weekly seasonality for one series or a
+        (series x days) matrix of equal-length histories.
+
+        With ``product_ids`` the fitted parameters are stored per product and
+        reused, so a request only runs the forecast step; a product is refit
+        when it has none yet or its recent errors have drifted past the
+        fit's. Without ids every series is fitted on the spot.
+
+        Returns:
+            np.ndarray: (series x days_ahead) forecast
+        """
+        history = np.atleast_2d(np.asarray(history, dtype=float))
+        if history.shape[1] < 2 * holt_winters.SEASON:
+            raise ValueError(
+                f"Holt-Winters needs at least {2 * holt_winters.SEASON} days of history"
+            )
+        if product_ids is None:
+            return holt_winters.forecast(
+                history, holt_winters.fit(history), days_ahead
+            )[0]
+
+        keys = [str(pid) for pid in product_ids]
+        stored = holt_winters.load_params(keys)
+        params = [stored.get(key) for key in keys]
+        refit = [i for i, p in enumerate(params) if p is None]
+        if len(refit) < len(keys):
+            known = [i for i, p in enumerate(params) if p is not None]
+            _, recent_rmse = holt_winters.forecast(
+                history[known], [params[i] for i in known], 1
+            )
+            refit += [
+                i
+                for i, rmse in zip(known, recent_rmse)
+                if holt_winters.drifted(params[i], rmse)
+            ]
+        if refit:
+            refit.sort()
+            for i, p in zip(refit, holt_winters.fit(history[refit])):
+                params[i] = p
+            holt_winters.save_params({keys[i]: params[i] for i in refit})
+        return holt_winters.forecast(history, params, days_ahead)[0]
+
     def find_product_substitutes(
         self, original_product: Dict, all_products: List[Dict], preferences: Dict = None
     ) -> List[Dict]:
@@ -85,13 +137,26 @@ class AIEngine:
             if not category_products:
                 return []
 
+            # Use the precomputed neighbour list when the product is indexed
+            index = get_similarity_index()
+            neighbors = (
+                index.neighbors_of(original_product.get("id")) if index else None
+            )
+            if neighbors is not None:
+                by_id = {p.get("id"): p for p in category_products}
+                candidates = [
+                    (by_id[pid], score) for pid, score in neighbors if pid in by_id
+                ]
+            else:
+                candidates = [
+                    (p, self._calculate_product_similarity(original_product, p))
+                    for p in category_products
+                ]
+
             # Calculate similarity scores
             scored_substitutes = []
 
-            for product in category_products:
-                similarity_score = self._calculate_product_similarity(
-                    original_product, product
-                )
+            for product, similarity_score in candidates:
 
                 # Apply user preferences
                 preference_score = self._apply_preference_scoring(
@@ -374,77 +439,70 @@ class AIEngine:
             return products[:10]  # Fallback to first 10 products
 
     def generate_recommendations(
-        self, user_preferences: Dict, products: List[Dict]
+        self, user_preferences: Dict, products: Union[List[Dict], ProductCatalog]
     ) -> List[Dict]:
         """
         Generate AI-powered product recommendations
 
         Args:
             user_preferences (Dict): User preferences and history
-            products (List[Dict]): List of all products
+            products (List[Dict] | ProductCatalog): All products, or a
+                prebuilt columnar catalogue of them
 
         Returns:
             List[Dict]: Recommended products
         """
         try:
-            if not products:
+            if not len(products):
                 return []
 
+            catalog = (
+                products
+                if isinstance(products, ProductCatalog)
+                else ProductCatalog(products)
+            )
+
             # Extract user preferences
             preferred_categories = user_preferences.get("categories", [])
             price_range = user_preferences.get("price_range", {})
             previous_purchases = user_preferences.get("purchase_history", [])
             favorite_brands = user_preferences.get("brands", [])
 
-            scored_products = []
-
-            for product in products:
-                score = 0
-
-                # Category preference
-                if product.get("category") in preferred_categories:
-                    score += 15
+            scores = np.zeros(len(catalog), dtype=np.int64)
 
-                # Price range preference
-                price = product.get("price", 0)
-                min_price = price_range.get("min", 0)
-                max_price = price_range.get("max", float("inf"))
-                if min_price <= price <= max_price:
-                    score += 10
-
-                # Brand preference
-                if product.get("brand") in favorite_brands:
-                    score += 12
+            # Category preference
+            scores += 15 * catalog.isin("category", preferred_categories)
 
-                # Avoid recommending previously purchased items
-                if product.get("id") not in previous_purchases:
-                    score += 5
+            # Price range preference
+            min_price = price_range.get("min", 0)
+            max_price = price_range.get("max", float("inf"))
+            scores += 10 * ((min_price <= catalog.price) & (catalog.price <= max_price))
 
-                # High-rated products
-                rating = product.get("rating", 0)
-                if rating >= 4.0:
-                    score += 8
-                elif rating >= 3.5:
-                    score += 5
+            # Brand preference
+            scores += 12 * catalog.isin("brand", favorite_brands)
 
-                # Popular products (based on review count)
-                review_count = product.get("review_count", 0)
-                if review_count > 100:
-                    score += 6
-                elif review_count > 50:
-                    score += 3
+            # Avoid recommending previously purchased items
+            scores += 5 * ~catalog.isin("id", previous_purchases)
 
-                if score > 0:
-                    product_copy = product.copy()
-                    product_copy["recommendation_score"] = score
-                    scored_products.append(product_copy)
+            # High-rated products
+            scores += np.select(
+                [catalog.rating >= 4.0, catalog.rating >= 3.5], [8, 5], default=0
+            )
 
-            # Sort by recommendation score
-            scored_products.sort(key=lambda x: x["recommendation_score"], reverse=True)
+            # Popular products (based on review count)
+            scores += np.select(
+                [catalog.review_count > 100, catalog.review_count > 50],
+                [6, 3],
+                default=0,
+            )
 
-            return scored_products[:15]  # Return top 15 recommendations
+            # Only the top 15 rows are copied out as dicts
+            rows = catalog.top_k(scores, 15, mask=scores > 0)
+            return catalog.materialize(rows, recommendation_score=scores)
         except Exception as e:
             logger.error(f"Error generating recommendations: {str(e)}")
+            if isinstance(products, ProductCatalog):
+                return products.products[:10]
             return products[:10]  # Fallback to first 10 products
 
     def analyze_sentiment(self, text: str) -> str:
@@ -649,48 +707,12 @@ class AIEngine:
     ) -> pd.Series:
         """Exponential smoothing forecast"""
         try:
-            # Simple exponential smoothing
-            alpha = 0.3  # Smoothing parameter
-
-            # Initialize
-            forecast = [data.iloc[0]]
-
-            # Calculate smoothed values
-            for i in range(1, len(data)):
-                forecast.append(alpha * data.iloc[i] + (1 - alpha) * forecast[-1])
-
-            # Generate future forecasts
-            last_forecast = forecast[-1]
-            future_forecasts = []
-
-            for i in range(days_ahead):
-                # Add slight trend based on recent data
-                trend = self._calculate_trend_factor(data.tail(10))
-                future_forecast = last_forecast * (1 + trend)
-                future_forecasts.append(max(0, future_forecast))
-                last_forecast = future_forecast
-
-            return pd.Series(future_forecasts)
+            return pd.Series(forecasting.forecast(data.values, days_ahead)[0])
 
         except Exception as e:
             logger.error(f"Error in exponential smoothing: {str(e)}")
             return pd.Series([np.mean(data)] * days_ahead)
 
-    def _calculate_trend_factor(self, data: pd.Series) -> float:
-        """Calculate trend factor from recent data"""
-        if len(data) < 2:
-            return 0
-
-        # Simple linear trend
-        x = np.arange(len(data))
-        y = data.values
-
-        try:
-            slope = np.polyfit(x, y, 1)[0]
-            return slope / max(np.mean(y), 1) * 0.01  # Small trend factor
-        except:
-            return 0
-
     def _calculate_product_similarity(self, product1: Dict, product2: Dict) -> float:
         """Calculate similarity between two products"""
         try:
@@ -1,13 +1,26 @@
 import logging
+import os
 from datetime import datetime, timedelta
 
 import numpy as np
 import pandas as pd
 from controllers.ai_engine import AIEngine
+from utils import (
+    forecasting,
+    holt_winters,
+    model_registry,
+    regional_inventory,
+    sales_rollup,
+)
 from utils.firebase_utils import FirebaseUtils
+from utils.forecast_cache import forecast_cache, make_key
+from utils.store_sales import StoreSales, load_store_sales
 
 logger = logging.getLogger(__name__)
 
+FORECAST_MODELS = ("smoothing", "holt_winters")
+FORECAST_MODEL = os.getenv("FORECAST_MODEL", "smoothing")
+
 
 class InventoryController:
     def __init__(self):
@@ -16,19 +29,25 @@ class InventoryController:
         self.inventory_collection = "inventory"
         self.sales_collection = "sales"
 
-    def forecast_demand(self, product_ids, days_ahead=30):
+    def forecast_demand(self, product_ids, days_ahead=30, model=None):
         """
         Generate demand forecast using LSTM/ARIMA models
 
         Args:
             product_ids (list): List of product IDs to forecast
             days_ahead (int): Number of days to forecast ahead
+            model (str, optional): "smoothing" or "holt_winters",
+                defaults to FORECAST_MODEL
 
         Returns:
             dict: Forecast data for each product
         """
+        model = model or FORECAST_MODEL
+        if model not in FORECAST_MODELS:
+            raise ValueError(f"model must be one of {', '.join(FORECAST_MODELS)}")
         try:
             forecasts = {}
+            histories = {}
 
             for product_id in product_ids:
                 # Get historical sales data
@@ -39,20 +58,55 @@ class InventoryController:
                         "forecast": [],
                         "confidence": "low",
                         "message": "Insufficient historical data",
+                        "cached": False,
                     }
                     continue
+                histories[product_id] = sales_data
 
-                # Generate forecast using AI engine
-                forecast = self.ai_engine.forecast_demand(sales_data, days_ahead)
-
-                forecasts[product_id] = {
-                    "forecast": forecast,
-                    "confidence": "high" if len(sales_data) > 90 else "medium",
-                    "historical_average": np.mean(sales_data),
-                    "trend": self._calculate_trend(sales_data),
-                }
+            # Reuse forecasts of unchanged histories (and published models)
+            if model == "holt_winters":
+                registry = model_registry.get_registry("holt_winters")
+                version = f"{holt_winters.MODEL_VERSION}/{registry.current_version()}"
+            else:
+                version = forecasting.MODEL_VERSION
+            keys = {
+                product_id: make_key(product_id, version, sales_data, days_ahead)
+                for product_id, sales_data in histories.items()
+            }
+            cached = forecast_cache.get_many(keys.values())
+            for product_id, key in keys.items():
+                if key in cached:
+                    forecasts[product_id] = {**cached[key], "cached": True}
+
+            # Forecast the rest at once, grouped by history length
+            by_length = {}
+            for product_id, sales_data in histories.items():
+                if product_id not in forecasts:
+                    by_length.setdefault(len(sales_data), []).append(product_id)
+            computed = {}
+            for length, ids in by_length.items():
+                matrix = np.array([histories[pid] for pid in ids], dtype=float)
+                if model == "holt_winters":
+                    predicted = self._holt_winters_forecast(matrix, days_ahead, ids)
+                else:
+                    predicted = forecasting.forecast(matrix, days_ahead)
+                averages = matrix.mean(axis=1)
+                trends = forecasting.trend_labels(matrix)
+                for i, product_id in enumerate(ids):
+                    computed[keys[product_id]] = {
+                        "forecast": predicted[i].tolist(),
+                        "confidence": "high" if length > 90 else "medium",
+                        "historical_average": float(averages[i]),
+                        "trend": trends[i],
+                        "model": model,
+                    }
+                    forecasts[product_id] = {
+                        **computed[keys[product_id]],
+                        "cached": False,
+                    }
+            forecast_cache.put_many(computed)
 
-            return forecasts
+            return {product_id: forecasts[product_id] for product_id in product_ids}
         except Exception as e:
             logger.error(f"Error forecasting demand: {str(e)}")
             raise
@@ -81,13 +135,15 @@ class InventoryController:
                 "optimization_score": 0,
             }
 
-            for item in inventory_data:
+            # One load of the store's sales feeds every item's velocity
+            velocities = self._load_store_sales(store_id).velocity(
+                item.get("product_id") for item in inventory_data
+            )
+
+            for item, velocity in zip(inventory_data, velocities.tolist()):
                 product_id = item.get("product_id")
                 current_stock = item.get("current_stock", 0)
 
-                # Get sales velocity
-                velocity = self._calculate_sales_velocity(product_id, store_id)
-
                 # Calculate reorder point
                 reorder_point = self._calculate_reorder_point(
                     velocity, item.get("lead_time", 7)
@@ -162,18 +218,20 @@ class InventoryController:
                 "out_of_stock": [],
             }
 
-            for item in inventory_data:
+            store_sales = self._load_store_sales(store_id)
+            velocities = store_sales.velocity(
+                item.get("product_id") for item in inventory_data
+            )
+
+            for item, velocity in zip(inventory_data, velocities.tolist()):
                 current_stock = item.get("current_stock", 0)
                 product_id = item.get("product_id")
 
-                # Get sales velocity for context
-                velocity = self._calculate_sales_velocity(product_id, store_id)
-
                 if current_stock == 0:
                     alerts["out_of_stock"].append(
                         {
                             "product_id": product_id,
-                            "last_sale": self._get_last_sale_date(product_id, store_id),
+                            "last_sale": store_sales.last_sale_date(product_id),
                             "priority": "high" if velocity > 5 else "medium",
                         }
                     )
@@ -232,28 +290,27 @@ class InventoryController:
                 "regional_trends": {},
             }
 
+            # Inventory and sales for the whole region are loaded once
+            store_ids = [store.get("id") for store in stores]
+            inventory = regional_inventory.fetch_for_stores(
+                self.firebase, self.inventory_collection, store_ids
+            )
+            velocities = regional_inventory.load_velocities(
+                self.firebase, store_ids, collection=self.sales_collection
+            )
+            metrics = regional_inventory.store_metrics(store_ids, inventory, velocities)
+
             for store in stores:
                 store_id = store.get("id")
-
-                # Get inventory data for this store
-                inventory = self.firebase.get_documents(
-                    self.inventory_collection, {"store_id": store_id}
-                )
-
-                # Calculate store performance metrics
-                total_value = sum(
-                    item.get("current_stock", 0) * item.get("unit_cost", 0)
-                    for item in inventory
-                )
-                turnover_rate = self._calculate_inventory_turnover(store_id)
+                store_metrics = metrics[str(store_id)]
 
                 insights["performance_by_store"].append(
                     {
                         "store_id": store_id,
                         "store_name": store.get("name"),
-                        "inventory_value": total_value,
-                        "turnover_rate": turnover_rate,
-                        "stock_health": self._assess_stock_health(store_id),
+                        "inventory_value": store_metrics["inventory_value"],
+                        "turnover_rate": store_metrics["turnover_rate"],
+                        "stock_health": store_metrics["stock_health"],
                     }
                 )
 
@@ -265,9 +322,65 @@ class InventoryController:
             logger.error(f"Error getting geo insights: {str(e)}")
             raise
 
+    def record_sale(self, sale_data):
+        """
+        Record a sale and add it to the daily rollup
+
+        Args:
+            sale_data (dict): product_id, quantity, and optional store_id / date
+
+        Returns:
+            str: Sale ID
+        """
+        try:
+            for field in ("product_id", "quantity"):
+                if field not in sale_data:
+                    raise ValueError(f"Missing required field: {field}")
+            sale = {
+                **sale_data,
+                "quantity": float(sale_data["quantity"]),
+                "date": sale_data.get("date") or datetime.now().isoformat(),
+            }
+            if sales_rollup.sale_day(sale["date"]) is None:
+                raise ValueError("date must be an ISO 8601 date")
+
+            sale_id = self.firebase.create_document(self.sales_collection, sale)
+            sales_rollup.record_sales([sale])
+            # The product's history changed, so its cached forecasts are stale
+            forecast_cache.invalidate_products([sale["product_id"]])
+            return sale_id
+        except Exception as e:
+            logger.error(f"Error recording sale: {str(e)}")
+            raise
+
+    def _holt_winters_forecast(self, matrix, days_ahead, product_ids):
+        """
+        Forecast each product with the model nightly training published for
+        it (or its category), fitting products without one on the spot
+        """
+        registry = model_registry.get_registry("holt_winters")
+        predicted = np.empty((len(product_ids), days_ahead))
+        untrained = []
+        for i, product_id in enumerate(product_ids):
+            key = registry.model_key(product_id)
+            forecast = registry.forecast(key, matrix[i], days_ahead) if key else None
+            if forecast is None:
+                untrained.append(i)
+            else:
+                predicted[i] = forecast
+        if untrained:
+            predicted[untrained] = self.ai_engine.holt_winters_forecast(
+                matrix[untrained], days_ahead, [product_ids[i] for i in untrained]
+            )
+        return predicted
+
     def _get_historical_sales(self, product_id, days=90):
         """Get historical sales data for a product"""
         try:
+            if sales_rollup.is_ready():
+                # At most days + 1 pre-aggregated rows
+                return sales_rollup.daily_history(product_id, days)
+
             end_date = datetime.now()
             start_date = end_date - timedelta(days=days)
 
@@ -305,13 +418,15 @@ class InventoryController:
             logger.error(f"Error getting historical sales: {str(e)}")
             return []
 
-    def _calculate_sales_velocity(self, product_id, store_id):
-        """Calculate average daily sales velocity"""
+    def _load_store_sales(self, store_id, days=30):
+        """Daily sales of every product in a store, from one query"""
         try:
-            sales_data = self._get_historical_sales(product_id, 30)
-            return np.mean(sales_data) if sales_data else 0
-        except:
-            return 0
+            return load_store_sales(
+                self.firebase, store_id, days, collection=self.sales_collection
+            )
+        except Exception as e:
+            logger.error(f"Error loading store sales: {str(e)}")
+            return StoreSales.empty(days)
 
     def _calculate_reorder_point(self, velocity, lead_time):
         """Calculate reorder point based on velocity and lead time"""
@@ -324,71 +439,16 @@ class InventoryController:
         # In practice, this would include holding costs, ordering costs, etc.
         return max(velocity * 30, 10)  # At least 30 days of stock or minimum 10 units
 
-    def _calculate_trend(self, sales_data):
-        """Calculate sales trend (increasing, decreasing, stable)"""
-        if len(sales_data) < 10:
-            return "insufficient_data"
-
-        recent_avg = np.mean(sales_data[-10:])
-        older_avg = (
-            np.mean(sales_data[-30:-20])
-            if len(sales_data) >= 30
-            else np.mean(sales_data[:-10])
-        )
-
-        if recent_avg > older_avg * 1.1:
-            return "increasing"
-        elif recent_avg < older_avg * 0.9:
-            return "decreasing"
-        else:
-            return "stable"
-
-    def _get_last_sale_date(self, product_id, store_id):
-        """Get the date of the last sale for a product"""
-        try:
-            sales = self.firebase.query_documents(
-                self.sales_collection, "product_id", "==", product_id
-            )
-
-            store_sales = [s for s in sales if s.get("store_id") == store_id]
-            if store_sales:
-                # Sort by date and get the most recent
-                store_sales.sort(key=lambda x: x.get("date", ""), reverse=True)
-                return store_sales[0].get("date", "Unknown")
-
-            return "No sales recorded"
-        except:
-            return "Unknown"
-
-    def _calculate_inventory_turnover(self, store_id):
-        """Calculate inventory turnover rate for a store"""
-        try:
-            # Get cost of goods sold (COGS) for the period
-            # This is simplified - in practice would use actual COGS calculation
-            return 6.0  # Placeholder - represents 6x annual turnover
-        except:
-            return 0.0
-
     def _assess_stock_health(self, store_id):
         """Assess overall stock health for a store"""
         try:
             alerts = self.get_stock_alerts(store_id)
 
-            total_issues = (
-                len(alerts["out_of_stock"]) * 3  # Weight out of stock heavily
-                + len(alerts["critical_low"]) * 2
-                + len(alerts["low_stock"]) * 1
-                + len(alerts["overstock"]) * 0.5
+            total_issues = sum(
+                len(alerts[kind]) * weight
+                for kind, weight in regional_inventory.ISSUE_WEIGHTS.items()
             )
-
-            if total_issues == 0:
-                return "excellent"
-            elif total_issues <= 2:
-                return "good"
-            elif total_issues <= 5:
-                return "fair"
-            else:
-                return "poor"
+            return regional_inventory.health_label(total_issues)
         except:
             return "unknown"
 
@@ -2,6 +2,14 @@ import logging
 
 from controllers.ai_engine import AIEngine
 from utils.firebase_utils import FirebaseUtils
+from utils.product_catalog import ProductCatalog
+from utils.product_similarity import queue_similarity_refresh
+from utils.recommendation_cache import (
+    ALL,
+    fingerprint,
+    invalidate_products,
+    recommendation_cache,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -79,19 +87,39 @@ class ProductController:
             list: List of recommended products
         """
         try:
-            # Get all products
-            all_products = self.firebase.get_documents(self.collection_name)
 
-            # Use AI engine to generate recommendations
-            recommendations = self.ai_engine.generate_recommendations(
-                user_preferences, all_products
-            )
+            def compute():
+                # Get all products
+                all_products = self.firebase.get_documents(self.collection_name)
+
+                # Use AI engine to generate recommendations
+                recommendations = self.ai_engine.generate_recommendations(
+                    user_preferences, all_products
+                )
+                # Any product in any category can enter the top 15
+                return recommendations, [ALL]
 
+            recommendations, _ = recommendation_cache.get_or_compute(
+                ("preferences", fingerprint(user_preferences), 15), compute
+            )
             return recommendations
         except Exception as e:
             logger.error(f"Error generating recommendations: {str(e)}")
             raise
 
+    def get_catalog(self):
+        """
+        Load all products once as a columnar catalogue
+
+        Returns:
+            ProductCatalog: Catalogue for batch scoring
+        """
+        try:
+            return ProductCatalog(self.firebase.get_documents(self.collection_name))
+        except Exception as e:
+            logger.error(f"Error loading product catalogue: {str(e)}")
+            raise
+
     def create_product(self, product_data):
         """
         Create a new product
@@ -116,6 +144,8 @@ class ProductController:
             product_id = self.firebase.create_document(
                 self.collection_name, enhanced_data
             )
+            queue_similarity_refresh([{**enhanced_data, "id": product_id}])
+            invalidate_products(enhanced_data)
 
             return product_id
         except Exception as e:
@@ -145,6 +175,13 @@ class ProductController:
             success = self.firebase.update_document(
                 self.collection_name, product_id, update_data
             )
+            if success:
+                queue_similarity_refresh(
+                    [{**existing_product, **update_data, "id": product_id}]
+                )
+                invalidate_products(
+                    existing_product, {**existing_product, **update_data}
+                )
 
             return success
         except Exception as e:
@@ -163,6 +200,10 @@ class ProductController:
         """
         try:
             success = self.firebase.delete_document(self.collection_name, product_id)
+            if success:
+                queue_similarity_refresh(removed_ids=[product_id])
+                # The deleted product's category is not known here
+                invalidate_products(None)
             return success
         except Exception as e:
             logger.error(f"Error deleting product {product_id}: {str(e)}")
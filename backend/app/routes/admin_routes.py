@@ -3,6 +3,8 @@ from datetime import datetime, timezone
 
 from flask import Blueprint, jsonify
 from utils.firebase_utils import FirebaseUtils
+from utils.product_similarity import queue_similarity_refresh
+from utils.recommendation_cache import invalidate_products
 
 logger = logging.getLogger(__name__)
 admin_bp = Blueprint("admin", __name__)
@@ -48,6 +50,8 @@ def init_database():
             product_id = firebase.create_document("products", product)
             product["id"] = product_id
             created_products.append(product)
+        queue_similarity_refresh(created_products)
+        invalidate_products(*created_products)
 
         logger.info("Database initialized with sample data")
         return (
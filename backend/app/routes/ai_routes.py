@@ -16,11 +16,21 @@ try:
 except Exception:
     genai = None
 
+from utils.embedding_cache import QueryEmbeddingCache, embed_with_cache, text_hash
+from utils.embedding_pipeline import EmbeddingPipeline, openai_embedder
+from controllers.ai_engine import AIEngine
+from utils.co_purchase import METRICS as CO_PURCHASE_METRICS
+from utils.co_purchase import frequently_bought_together
 from utils.firebase_utils import FirebaseUtils
+from utils.hybrid_search import FUSION_MODES, category_key, hybrid_search
+from utils.local_embeddings import get_local_embedder, remote_embeddings_enabled
+from utils.recommendation_cache import fingerprint, recommendation_cache
+from utils.vector_store import get_item as get_item_json
 from utils.vector_store import query_similar as query_json
 from utils.vector_store import upsert_embeddings as upsert_json
 
 try:
+    from utils.vector_store_sqlite import get_item as get_item_sqlite
     from utils.vector_store_sqlite import query_similar as query_sqlite
     from utils.vector_store_sqlite import upsert_embeddings as upsert_sqlite
 
@@ -28,6 +38,7 @@ try:
 except Exception:
     upsert_sqlite = None  # type: ignore
     query_sqlite = None  # type: ignore
+    get_item_sqlite = None  # type: ignore
     SQLITE_AVAILABLE = False
 
 
@@ -283,7 +294,7 @@ def generate_description():
 
 def _get_embeddings_client():
     api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key or not OpenAI:
+    if not api_key or not OpenAI or not remote_embeddings_enabled():
         return None
     try:
         return OpenAI(api_key=api_key)
@@ -294,13 +305,53 @@ def _get_embeddings_client():
 def _embed_texts(client, texts: list) -> list:
     if not texts:
         return []
+    if not client:
+        # Offline fallback so semantic search still ranks meaningfully
+        return get_local_embedder().embed(texts)
+    embeddings = _embedding_pipeline(client).embed(texts)
+    if any(embedding is None for embedding in embeddings):
+        raise RuntimeError("Embedding request failed after retries")
+    return embeddings
+
+
+_query_embeddings = QueryEmbeddingCache()
+
+
+def _embed_query(client, text: str) -> list:
+    """Embed one search text, reusing recent embeddings of the same query."""
+    if not client:
+        return _embed_texts(client, [text])[0]
     model = os.getenv("EMBEDDINGS_MODEL", "text-embedding-3-small")
-    try:
-        resp = client.embeddings.create(model=model, input=texts)
-        return [d.embedding for d in resp.data]
-    except Exception as e:  # pragma: no cover
-        dim = 1536
-        return [[0.0] * dim for _ in texts]
+    return _query_embeddings.get_or_embed(
+        text, model, lambda t: _embed_texts(client, [t])[0]
+    )
+
+
+def _get_indexed_item(product_id):
+    if _use_sqlite_store() and get_item_sqlite:
+        return get_item_sqlite(product_id)
+    return get_item_json(product_id)
+
+
+def _embedding_pipeline(client) -> EmbeddingPipeline:
+    model = os.getenv("EMBEDDINGS_MODEL", "text-embedding-3-small")
+    return EmbeddingPipeline(openai_embedder(client, model), model=model)
+
+
+def _upsert_items(items: list) -> int:
+    if _use_sqlite_store() and upsert_sqlite:
+        return upsert_sqlite(items)
+    return upsert_json(items)
+
+
+def _index_entry(product: dict) -> tuple:
+    """(id, embedded text, metadata) of one product."""
+    pid = product.get("id") or product.get("_id") or product.get("sku")
+    name = product.get("name", "")
+    desc = product.get("description", "")
+    category = product.get("category", "Unknown")
+    text = f"Name: {name}\nCategory: {category}\nDescription: {desc}"
+    return pid, text, {"category": category_key(category), "name": name}
 
 
 @ai_bp.route("/ai/index-products", methods=["POST"])
@@ -315,30 +366,87 @@ def index_products():
         except Exception:
             products = []
 
-    to_index = []
-    for p in products:
-        pid = p.get("id") or p.get("_id") or p.get("sku")
-        name = p.get("name", "")
-        desc = p.get("description", "")
-        category = p.get("category", "Unknown")
-        text = f"Name: {name}\nCategory: {category}\nDescription: {desc}"
-        to_index.append((pid, text, {"category": category, "name": name}))
+    to_index = [_index_entry(p) for p in products]
+    # A partial upload only changes its own categories; a full one may refit
+    touched = {meta["category"] for _, _, meta in to_index}
+    if not payload.get("products"):
+        touched = {None}
 
     client = _get_embeddings_client()
     texts = [t for _, t, _ in to_index]
-    embeddings = (
-        _embed_texts(client, texts) if client else [[0.0] * 1536 for _ in texts]
-    )
+    if not client:
+        embedder = get_local_embedder()
+        # IDF weights come from the whole catalogue, never a partial upload
+        if not payload.get("products"):
+            embedder.fit(texts)
+        elif not embedder.fitted:
+            try:
+                catalogue = firebase.get_documents("products") or []
+            except Exception:
+                catalogue = []
+            if not catalogue:
+                return (
+                    jsonify(
+                        {
+                            "error": "Local embeddings are not fitted yet; "
+                            "index the full catalogue first"
+                        }
+                    ),
+                    409,
+                )
+            embedder.fit([_index_entry(p)[1] for p in catalogue])
+        written = _upsert_items(
+            [
+                {"id": pid, "text": text, "embedding": emb, "metadata": meta}
+                for (pid, text, meta), emb in zip(to_index, embedder.embed(texts))
+            ]
+        )
+        recommendation_cache.invalidate(touched)
+        return (
+            jsonify(
+                {
+                    "indexed": written,
+                    "embedding_cache": None,
+                    "embeddings_model": embedder.model,
+                }
+            ),
+            200,
+        )
 
-    items = []
-    for (pid, text, meta), emb in zip(to_index, embeddings):
-        items.append({"id": pid, "text": text, "embedding": emb, "metadata": meta})
+    by_hash = {}
+    for entry in to_index:
+        by_hash.setdefault(text_hash(entry[1]), []).append(entry)
 
-    if _use_sqlite_store() and upsert_sqlite:
-        written = upsert_sqlite(items)
-    else:
-        written = upsert_json(items)
-    return jsonify({"indexed": written}), 200
+    written = 0
+
+    def write_batch(hashes, embeddings):
+        # Each finished batch goes straight into the store
+        nonlocal written
+        items = [
+            {"id": pid, "text": text, "embedding": emb, "metadata": meta}
+            for h, emb in zip(hashes, embeddings)
+            for pid, text, meta in by_hash[h]
+        ]
+        written += _upsert_items(items)
+
+    _, cache_stats = embed_with_cache(
+        texts,
+        os.getenv("EMBEDDINGS_MODEL", "text-embedding-3-small"),
+        _embedding_pipeline(client),
+        on_batch=write_batch,
+    )
+    recommendation_cache.invalidate(touched)
+    # Products whose embedding batch failed are left out of the store
+    return (
+        jsonify(
+            {
+                "indexed": written,
+                "failed": cache_stats["failed"],
+                "embedding_cache": cache_stats,
+            }
+        ),
+        200,
+    )
 
 
 @ai_bp.route("/ai/semantic-search", methods=["POST"])
@@ -352,7 +460,7 @@ def semantic_search():
         return jsonify({"error": "query is required"}), 400
 
     client = _get_embeddings_client()
-    q_emb = _embed_texts(client, [query])[0] if client else [0.0] * 1536
+    q_emb = _embed_query(client, query)
 
     filters = {"category": category} if category else None
     if _use_sqlite_store() and query_sqlite:
@@ -362,42 +470,100 @@ def semantic_search():
     return jsonify({"results": hits}), 200
 
 
+def _query_store(embedding, top_k: int, filters=None):
+    if _use_sqlite_store() and query_sqlite:
+        return query_sqlite(embedding, top_k=top_k, filter_meta=filters)
+    return query_json(embedding, top_k=top_k, filter_meta=filters)
+
+
+def _optional_float(value):
+    return float(value) if value not in (None, "") else None
+
+
+@ai_bp.route("/ai/hybrid-search", methods=["POST"])
+def hybrid_search_route():
+    data = request.get_json(silent=True) or {}
+    query = data.get("query", "").strip()
+    if not query:
+        return jsonify({"error": "query is required"}), 400
+    try:
+        top_k = int(data.get("top_k", 10))
+        min_price = _optional_float(data.get("min_price"))
+        max_price = _optional_float(data.get("max_price"))
+        semantic_weight = float(data.get("semantic_weight", 0.5))
+    except (TypeError, ValueError):
+        return jsonify({"error": "top_k, prices and weights must be numeric"}), 400
+    mode = data.get("mode", "rrf")
+    if mode not in FUSION_MODES:
+        return jsonify({"error": f"mode must be one of {list(FUSION_MODES)}"}), 400
+
+    client = _get_embeddings_client()
+
+    def semantic(q, k, filters):
+        return _query_store(_embed_query(client, q), k, filters)
+
+    firebase = FirebaseUtils()
+    result = hybrid_search(
+        query,
+        lambda: firebase.get_documents("products"),
+        AIEngine().search_products,
+        semantic,
+        top_k=top_k,
+        category=data.get("category"),
+        min_price=min_price,
+        max_price=max_price,
+        mode=mode,
+        semantic_weight=semantic_weight,
+    )
+    return jsonify(result), 200
+
+
 @ai_bp.route("/ai/recommendations", methods=["POST"])
 def recommendations():
     data = request.get_json(silent=True) or {}
     product = data.get("product")
     product_id = data.get("product_id")
-
-    firebase = FirebaseUtils()
-    if not product and product_id:
-        try:
-            product = firebase.get_document("products", product_id)
-        except Exception:
-            product = None
-    if not product:
+    top_k = int(data.get("top_k", 5))
+    if not product and not product_id:
         return jsonify({"error": "product or product_id required"}), 400
 
-    category = product.get("category", "Unknown")
-    base_text = f"Name: {product.get('name','')}\nCategory: {category}\nDescription: {product.get('description','')}"
-
-    client = _get_embeddings_client()
-    base_emb = _embed_texts(client, [base_text])[0] if client else [0.0] * 1536
-
-    if _use_sqlite_store() and query_sqlite:
-        hits = query_sqlite(
-            base_emb,
-            top_k=int(data.get("top_k", 5)),
-            filter_meta={"category": category},
-        )
-    else:
-        hits = query_json(
-            base_emb,
-            top_k=int(data.get("top_k", 5)),
-            filter_meta={"category": category},
+    def compute():
+        nonlocal product
+        base_emb = None
+        if not product and product_id:
+            indexed = _get_indexed_item(product_id)
+            if indexed and any(indexed.get("embedding") or []):
+                # Already embedded at index time; skip Firebase and the embeddings API
+                base_emb = indexed["embedding"]
+                category = indexed.get("metadata", {}).get("category") or "Unknown"
+                pid = product_id
+
+        if base_emb is None:
+            firebase = FirebaseUtils()
+            if not product and product_id:
+                try:
+                    product = firebase.get_document("products", product_id)
+                except Exception:
+                    product = None
+            if not product:
+                return None, None
+
+            category = product.get("category", "Unknown")
+            base_text = f"Name: {product.get('name','')}\nCategory: {category}\nDescription: {product.get('description','')}"
+            base_emb = _embed_query(_get_embeddings_client(), base_text)
+            pid = product.get("id") or product.get("_id") or product.get("sku")
+
+        hits = _query_store(
+            base_emb, top_k=top_k, filters={"category": category_key(category)}
         )
+        return [h for h in hits if h.get("id") != pid], [category]
 
-    pid = product.get("id") or product.get("_id") or product.get("sku")
-    filtered = [h for h in hits if h.get("id") != pid]
+    subject = fingerprint(product) if product else product_id
+    filtered, _ = recommendation_cache.get_or_compute(
+        ("semantic", subject, top_k), compute
+    )
+    if filtered is None:
+        return jsonify({"error": "product or product_id required"}), 400
     return jsonify({"recommendations": filtered}), 200
 
 
@@ -563,23 +729,56 @@ def chat_assistant():
 
 @ai_bp.route("/api/recommendations/<product_id>", methods=["GET"])
 def get_recommendations_endpoint(product_id):
-    """Retrieve product recommendations (similar products in same category)"""
+    """
+    Frequently bought together products, from order baskets.
+    Query params: limit (default 10), metric (lift | confidence).
+    Falls back to products in the same category when there is no order data.
+    """
     try:
-        firebase = FirebaseUtils()
-        product = firebase.get_document("products", product_id)
-        all_products = firebase.get_documents("products")
-
-        if not product:
-            # Fallback for integration tests that request nonexistent product IDs
-            recommendations = [p for p in all_products if p.get("id") != product_id]
-            return jsonify(recommendations), 200
-
-        recommendations = [
-            p
-            for p in all_products
-            if p.get("category") == product.get("category")
-            and p.get("id") != product_id
-        ]
+        limit = max(1, request.args.get("limit", 10, type=int))
+        metric = request.args.get("metric", "lift")
+        if metric not in CO_PURCHASE_METRICS:
+            return jsonify({"error": "metric must be 'lift' or 'confidence'"}), 400
+
+        def compute():
+            firebase = FirebaseUtils()
+            product = firebase.get_document("products", product_id)
+
+            if not product:
+                # Fallback for integration tests that request nonexistent product IDs
+                # Every other product, as before; limit applies to real results
+                all_products = firebase.get_documents("products")
+                return [p for p in all_products if p.get("id") != product_id], None
+
+            category = product.get("category")
+            together = frequently_bought_together(
+                product_id, top_k=limit, metric=metric
+            )
+            recommendations = []
+            for pair in together:
+                partner = firebase.get_document("products", pair["product_id"])
+                if partner:
+                    recommendations.append(
+                        {**partner, "id": pair["product_id"], "bought_together": pair}
+                    )
+            if recommendations:
+                # New baskets only show up once the entry expires
+                return recommendations, [category] + [
+                    p.get("category") for p in recommendations
+                ]
+
+            recommendations = [
+                p
+                for p in firebase.get_documents(
+                    "products", filters={"category": category}, limit=limit + 1
+                )
+                if p.get("category") == category and p.get("id") != product_id
+            ]
+            return recommendations[:limit], [category]
+
+        recommendations, _ = recommendation_cache.get_or_compute(
+            ("bought_together", product_id, metric, limit), compute
+        )
         return jsonify(recommendations), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
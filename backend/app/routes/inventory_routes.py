@@ -12,8 +12,9 @@ def forecast_demand():
         data = request.get_json()
         product_ids = data.get("product_ids", [])
         days_ahead = data.get("days_ahead", 30)
+        model = data.get("model")
 
-        forecasts = inventory_controller.forecast_demand(product_ids, days_ahead)
+        forecasts = inventory_controller.forecast_demand(product_ids, days_ahead, model)
 
         return (
             jsonify(
@@ -25,6 +26,17 @@ def forecast_demand():
             ),
             200,
         )
+    except ValueError as e:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "error": str(e),
+                    "message": "Invalid forecast request",
+                }
+            ),
+            400,
+        )
     except Exception as e:
         return (
             jsonify(
@@ -38,6 +50,47 @@ def forecast_demand():
         )
 
 
+@inventory_bp.route("/sales", methods=["POST"])
+def record_sale():
+    """Record a sale and update its daily rollup"""
+    try:
+        data = request.get_json(silent=True) or {}
+        sale_id = inventory_controller.record_sale(data)
+
+        return (
+            jsonify(
+                {
+                    "success": True,
+                    "data": {"id": sale_id},
+                    "message": "Sale recorded successfully",
+                }
+            ),
+            201,
+        )
+    except ValueError as e:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "error": str(e),
+                    "message": "Invalid sale",
+                }
+            ),
+            400,
+        )
+    except Exception as e:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "error": str(e),
+                    "message": "Failed to record sale",
+                }
+            ),
+            500,
+        )
+
+
 @inventory_bp.route("/optimization", methods=["POST"])
 def optimize_inventory():
     """Get inventory optimization recommendations"""
@@ -3,6 +3,7 @@ from datetime import datetime, timezone
 
 from flask import Blueprint, jsonify, request
 from middleware.auth_middleware import require_auth
+from utils.co_purchase import record_order
 from utils.firebase_utils import FirebaseUtils
 
 logger = logging.getLogger(__name__)
@@ -10,6 +11,18 @@ order_bp = Blueprint("orders", __name__)
 firebase = FirebaseUtils()
 
 
+def _record_basket(order_data):
+    """
+    Count the order's basket for frequently-bought-together lookups.
+    Recorded inline: baskets are capped at MAX_BASKET_ITEMS, so this is one
+    small transaction, and a failure must not fail the order.
+    """
+    try:
+        record_order(order_data)
+    except Exception as e:
+        logger.error(f"Failed to record order basket: {str(e)}")
+
+
 @order_bp.route("", methods=["GET"])
 def get_orders():
     """Get all orders"""
@@ -45,6 +58,7 @@ def create_order():
 
         order_id = firebase.create_document("orders", order_data)
         order_data["id"] = order_id
+        _record_basket(order_data)
 
         logger.info(f"Created order: {order_id}")
         return jsonify(order_data), 201
@@ -1,53 +1,88 @@
 import logging
 import os
 from datetime import datetime, timezone
+from typing import Any, Dict, List, Tuple
 
-import joblib
 import numpy as np
 from flask import Blueprint, jsonify, request
+from utils import lstm_inference
 from utils.firebase_utils import FirebaseUtils
+from utils.micro_batcher import MicroBatcher
 
 logger = logging.getLogger(__name__)
 predict_demand_bp = Blueprint("predict_demand", __name__)
 
-# Load model and scaler from absolute paths
-model_path = os.path.abspath(
-    os.path.join(
-        os.path.dirname(__file__), "..", "..", "..", "ml_models", "demand_model.h5"
-    )
-)
-scaler_path = os.path.abspath(
-    os.path.join(
-        os.path.dirname(__file__), "..", "..", "..", "ml_models", "scaler.save"
-    )
-)
+# Weights exported from demand_model.h5 by scripts/export_lstm_weights.py,
+# so serving needs NumPy only
+model_path = os.getenv("DEMAND_MODEL_PATH", lstm_inference.DEFAULT_NPZ_PATH)
 
 model = None
 scaler = None
 
 try:
-    from tensorflow.keras.models import load_model
-
     if os.path.exists(model_path):
-        model = load_model(model_path)
+        model, scaler = lstm_inference.load(model_path)
     else:
-        logger.warning(f"Model file not found at {model_path}")
-except ImportError:
-    logger.info(
-        "TensorFlow not installed. ML features will run in heuristic fallback mode."
-    )
+        logger.warning(
+            f"Model file not found at {model_path}; "
+            "run scripts/export_lstm_weights.py to create it"
+        )
 except Exception as e:
-    logger.error(f"Error loading TensorFlow model: {e}")
+    logger.error(f"Error loading demand model: {e}")
 
-try:
-    if os.path.exists(scaler_path):
-        scaler = joblib.load(scaler_path)
+firebase = FirebaseUtils()
+
+SERIES_LENGTH = 10
+MAX_BATCH_SERIES = int(os.getenv("PREDICT_DEMAND_MAX_BATCH", "10000"))
+# Window for coalescing concurrent single requests; 0 turns micro-batching off
+MICRO_BATCH_MS = float(os.getenv("PREDICT_DEMAND_MICRO_BATCH_MS", "0"))
+FALLBACK_NOTE = "Prediction generated using heuristic fallback (ML model unavailable)"
+
+
+def _valid_series(series) -> bool:
+    return (
+        isinstance(series, list)
+        and len(series) == SERIES_LENGTH
+        and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in series)
+    )
+
+
+def predict_series(series: List[List[float]]) -> Tuple[List[float], str]:
+    """
+    Next-day demand for each 10-day series, scaled in one transform and
+    predicted in one forward pass. Returns the predictions and the method.
+    """
+    values = np.asarray(series, dtype=float).reshape(-1, SERIES_LENGTH)
+    if model is None or scaler is None:
+        # Heuristic: Average of last 10 days + 10% buffer
+        predicted = values.mean(axis=1) * 1.1
+        method = "heuristic_fallback"
     else:
-        logger.warning(f"Scaler file not found at {scaler_path}")
-except Exception as e:
-    logger.error(f"Error loading scaler: {e}")
+        scaled = scaler.transform(values.reshape(-1, 1))
+        predicted_scaled = model.predict(scaled.reshape(-1, SERIES_LENGTH, 1))
+        predicted = scaler.inverse_transform(predicted_scaled)[:, 0]
+        method = "lstm_model"
+    return [max(round(float(v), 2), 0) for v in predicted], method
 
-firebase = FirebaseUtils()
+
+def _run_micro_batch(items: List[List[float]]) -> List[Tuple[float, str]]:
+    predictions, method = predict_series(items)
+    return [(value, method) for value in predictions]
+
+
+batcher = (
+    MicroBatcher(_run_micro_batch, max_wait=MICRO_BATCH_MS / 1000)
+    if MICRO_BATCH_MS > 0
+    else None
+)
+
+
+def _log_prediction(document: Dict[str, Any]) -> None:
+    try:
+        document["timestamp"] = datetime.now(timezone.utc).isoformat()
+        firebase.create_document("predictions", document)
+    except Exception as e:
+        logger.error(f"Failed to log prediction to Firebase: {e}")
 
 
 @predict_demand_bp.route("/predict-demand", methods=["POST"])
@@ -55,7 +90,7 @@ def predict_demand():
     """Predict demand based on last 10 days sales data"""
     data = request.get_json(silent=True) or {}
 
-    if not data or "last_10_days" not in data or len(data["last_10_days"]) != 10:
+    if not _valid_series(data.get("last_10_days")):
         return (
             jsonify(
                 {"error": 'Invalid input. Provide 10 numbers under "last_10_days".'}
@@ -64,64 +99,77 @@ def predict_demand():
         )
 
     try:
-        # Fallback logic if model is missing
-        if model is None or scaler is None:
-            # Heuristic: Average of last 10 days + 10% buffer
-            last_10_days = data["last_10_days"]
-            avg_demand = sum(last_10_days) / len(last_10_days)
-            predicted_value = round(avg_demand * 1.1, 2)
-            safe_value = max(predicted_value, 0)
-
-            # Log prediction
-            try:
-                firebase.create_document(
-                    "predictions",
-                    {
-                        "input": data["last_10_days"],
-                        "predicted_value": safe_value,
-                        "timestamp": datetime.now(timezone.utc).isoformat(),
-                        "method": "heuristic_fallback",
-                    },
-                )
-            except Exception as e:
-                logger.error(f"Failed to log prediction to Firebase: {e}")
-
-            return (
-                jsonify(
-                    {
-                        "predicted_demand": safe_value,
-                        "note": "Prediction generated using heuristic fallback (ML model unavailable)",
-                    }
-                ),
-                200,
-            )
-
-        last_10_days = np.array(data["last_10_days"]).reshape(-1, 1)
-        scaled_data = scaler.transform(last_10_days)
-        input_data = np.reshape(scaled_data, (1, 10, 1))
-
-        predicted_scaled = model.predict(input_data)
-        predicted_demand = scaler.inverse_transform(predicted_scaled)
-
-        predicted_value = round(float(predicted_demand[0][0]), 2)
-        safe_value = max(predicted_value, 0)
-
-        # Log prediction
-        try:
-            firebase.create_document(
-                "predictions",
-                {
-                    "input": data["last_10_days"],
-                    "predicted_value": safe_value,
-                    "timestamp": datetime.now(timezone.utc).isoformat(),
-                    "method": "lstm_model",
-                },
-            )
-        except Exception as e:
-            logger.error(f"Failed to log prediction to Firebase: {e}")
+        if batcher is not None:
+            safe_value, method = batcher.submit(data["last_10_days"])
+        else:
+            predictions, method = predict_series([data["last_10_days"]])
+            safe_value = predictions[0]
+
+        _log_prediction(
+            {
+                "input": data["last_10_days"],
+                "predicted_value": safe_value,
+                "method": method,
+            }
+        )
 
-        return jsonify({"predicted_demand": safe_value}), 200
+        response = {"predicted_demand": safe_value}
+        if method == "heuristic_fallback":
+            response["note"] = FALLBACK_NOTE
+        return jsonify(response), 200
 
     except Exception as e:
         logger.error(f"Demand prediction error: {str(e)}")
         return jsonify({"error": str(e)}), 500
+
+
+@predict_demand_bp.route("/predict-demand/batch", methods=["POST"])
+def predict_demand_batch():
+    """Predict demand for many 10-day series in one model pass"""
+    data = request.get_json(silent=True) or {}
+    series = data.get("series")
+
+    if not isinstance(series, list) or not series:
+        return (
+            jsonify(
+                {"error": 'Invalid input. Provide a list of series under "series".'}
+            ),
+            400,
+        )
+    if len(series) > MAX_BATCH_SERIES:
+        return (
+            jsonify({"error": f"At most {MAX_BATCH_SERIES} series per request."}),
+            400,
+        )
+    invalid = [i for i, values in enumerate(series) if not _valid_series(values)]
+    if invalid:
+        return (
+            jsonify(
+                {
+                    "error": "Each series must be 10 numbers.",
+                    "invalid_indexes": invalid[:100],
+                }
+            ),
+            400,
+        )
+
+    try:
+        predictions, method = predict_series(series)
+
+        # One log entry per batch; inputs are left out to stay within document limits
+        _log_prediction(
+            {
+                "count": len(predictions),
+                "predicted_values": predictions,
+                "method": method,
+            }
+        )
+
+        response = {"predicted_demand": predictions, "count": len(predictions)}
+        if method == "heuristic_fallback":
+            response["note"] = FALLBACK_NOTE
+        return jsonify(response), 200
+
+    except Exception as e:
+        logger.error(f"Batch demand prediction error: {str(e)}")
+        return jsonify({"error": str(e)}), 500
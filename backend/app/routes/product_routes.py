@@ -1,8 +1,14 @@
+import json
 import logging
 
 from controllers.product_controller import ProductController
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from middleware.auth_middleware import require_auth
+from utils.batch_recommendations import (
+    MAX_BATCH_ITEMS,
+    MAX_WORKERS,
+    batch_recommendations,
+)
 
 logger = logging.getLogger(__name__)
 product_bp = Blueprint("products", __name__)
@@ -156,3 +162,47 @@ def get_recommendations():
     except Exception as e:
         logger.error(f"Failed to generate recommendations: {str(e)}")
         return jsonify({"error": "Failed to generate recommendations"}), 500
+
+
+@product_bp.route("/recommendations/batch", methods=["POST"])
+def get_batch_recommendations():
+    """
+    Recommendations for many products and/or preference profiles, streamed
+    as NDJSON, one line per request item. The catalogue is loaded once.
+    Body: {"product_ids": [...], "profiles": [{...}], "limit": 5, "workers": 0}
+    """
+    data = request.get_json(silent=True) or {}
+    product_ids = data.get("product_ids") or []
+    profiles = data.get("profiles") or []
+    if not isinstance(product_ids, list) or not isinstance(profiles, list):
+        return jsonify({"error": "product_ids and profiles must be lists"}), 400
+    if not product_ids and not profiles:
+        return jsonify({"error": "product_ids or profiles required"}), 400
+    if len(product_ids) + len(profiles) > MAX_BATCH_ITEMS:
+        return (
+            jsonify({"error": f"At most {MAX_BATCH_ITEMS} items per batch"}),
+            400,
+        )
+    try:
+        limit = max(1, int(data.get("limit", 5)))
+        workers = min(int(data.get("workers", MAX_WORKERS)), MAX_WORKERS)
+    except (TypeError, ValueError):
+        return jsonify({"error": "limit and workers must be integers"}), 400
+
+    try:
+        catalog = product_controller.get_catalog()
+    except Exception as e:
+        logger.error(f"Failed to load catalogue for batch: {str(e)}")
+        return jsonify({"error": "Failed to generate recommendations"}), 500
+
+    def generate():
+        try:
+            for result in batch_recommendations(
+                catalog, product_ids, profiles, k=limit, workers=workers
+            ):
+                yield json.dumps(result, default=str) + "\n"
+        except Exception as e:
+            logger.error(f"Batch recommendations failed: {str(e)}")
+            yield json.dumps({"error": "Failed to generate recommendations"}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
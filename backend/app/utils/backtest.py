@@ -0,0 +1,182 @@
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from utils import holt_winters
+from utils.model_training import mape, rmse
+
+# A model maps (history, horizon) to a forecast of ``horizon`` days
+Forecaster = Callable[[np.ndarray, int], Union[np.ndarray, Sequence[float]]]
+
+
+def smoothing_model() -> Forecaster:
+    """``AIEngine.forecast_demand``, the production path."""
+    from controllers.ai_engine import AIEngine
+
+    engine = AIEngine()
+    return lambda history, horizon: engine.forecast_demand(list(history), horizon)
+
+
+def holt_winters_model() -> Forecaster:
+    """Holt-Winters refit at every origin, as on a parameter cache miss."""
+    return lambda history, horizon: holt_winters.forecast(
+        history, holt_winters.fit(history), horizon
+    )[0][0]
+
+
+def lstm_model(path: Optional[str] = None) -> Forecaster:
+    """The exported /predict-demand LSTM, fed its own predictions day by day."""
+    from utils import lstm_inference, model_training
+
+    model = lstm_inference.load(path) if path else lstm_inference.load()
+    return lambda history, horizon: model_training.lstm_forecast(
+        model, history, horizon
+    )
+
+
+MODELS: Dict[str, Callable[[], Forecaster]] = {
+    "smoothing": smoothing_model,
+    "holt_winters": holt_winters_model,
+    "lstm": lstm_model,
+}
+
+
+def synthetic_series(
+    n: int = 50, days: int = 180, seed: int = 0
+) -> Dict[str, List[float]]:
+    """
+    Daily sales with weekly seasonality, trend and noise; every fifth
+    series is intermittent (mostly zero days) like slow movers.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(days)
+    week = np.array([1.0, 0.9, 1.0, 1.1, 1.3, 1.8, 1.6])
+    series = {}
+    for i in range(n):
+        level = rng.uniform(2, 60)
+        trend = rng.normal(0, 0.05) * level / 30
+        values = (level + trend * t) * week[t % 7] * rng.lognormal(0, 0.15, days)
+        if i % 5 == 4:
+            values = values * (rng.random(days) < 0.2)
+        series[f"synthetic-{i}"] = np.maximum(values, 0).round().tolist()
+    return series
+
+
+def origins(days: int, horizon: int, min_train: int, step: int) -> List[int]:
+    """Rolling forecast origins: every ``step`` days once ``min_train`` are known."""
+    return list(range(min_train, days - horizon + 1, step))
+
+
+def _forecast_windows(
+    model: Forecaster, values: np.ndarray, cuts: List[int], horizon: int
+) -> np.ndarray:
+    return np.concatenate(
+        [np.asarray(model(values[:o], horizon), dtype=float)[:horizon] for o in cuts]
+    )
+
+
+def backtest(
+    model: Forecaster,
+    series_by_key: Dict[str, Sequence[float]],
+    horizon: int = 14,
+    min_train: int = 60,
+    step: int = 7,
+    memory_sample: int = 3,
+) -> Dict[str, Any]:
+    """
+    Rolling-origin evaluation of one model: at each origin it sees only the
+    days before it and forecasts the next ``horizon``. Reports MAPE and RMSE
+    over all windows, per series and in total, with wall time.
+
+    Peak memory is traced in a separate pass over the first
+    ``memory_sample`` series, since tracing slows NumPy-heavy models enough
+    to skew their timings.
+    """
+    per_series = {}
+    actual_all: List[np.ndarray] = []
+    predicted_all: List[np.ndarray] = []
+    skipped = []
+    prepared = []
+    for key, raw in series_by_key.items():
+        values = np.asarray(raw, dtype=float)
+        cuts = origins(len(values), horizon, min_train, step)
+        if cuts:
+            prepared.append((key, values, cuts))
+        else:
+            skipped.append(key)
+
+    started = time.perf_counter()
+    for key, values, cuts in prepared:
+        series_started = time.perf_counter()
+        predicted = _forecast_windows(model, values, cuts, horizon)
+        seconds = time.perf_counter() - series_started
+        actual = np.concatenate([values[o : o + horizon] for o in cuts])
+        per_series[key] = {
+            "windows": len(cuts),
+            "mape": mape(actual, predicted),
+            "rmse": rmse(actual, predicted),
+            "seconds": round(seconds, 6),
+        }
+        actual_all.append(actual)
+        predicted_all.append(predicted)
+    total_seconds = time.perf_counter() - started
+
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    try:
+        for _, values, cuts in prepared[:memory_sample]:
+            _forecast_windows(model, values, cuts, horizon)
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+
+    actual = np.concatenate(actual_all) if actual_all else np.zeros(0)
+    predicted = np.concatenate(predicted_all) if predicted_all else np.zeros(0)
+    return {
+        "series": len(per_series),
+        "skipped": skipped,
+        "windows": sum(s["windows"] for s in per_series.values()),
+        "mape": mape(actual, predicted) if len(actual) else None,
+        "rmse": rmse(actual, predicted) if len(actual) else None,
+        "total_seconds": round(total_seconds, 6),
+        "peak_memory_bytes": int(peak),
+        "per_series": per_series,
+    }
+
+
+def compare(
+    report: Dict[str, Any],
+    baseline: Dict[str, Any],
+    error_tolerance: float = 0.05,
+    time_tolerance: float = 0.5,
+) -> List[str]:
+    """
+    Regressions of ``report`` against ``baseline``: a model whose MAPE or
+    RMSE grew by more than ``error_tolerance`` or whose total time grew by
+    more than ``time_tolerance`` (both relative).
+    """
+    regressions = []
+    for name, result in report.get("models", {}).items():
+        base = baseline.get("models", {}).get(name)
+        if base is None:
+            continue
+        for metric, tolerance in (
+            ("mape", error_tolerance),
+            ("rmse", error_tolerance),
+            ("total_seconds", time_tolerance),
+        ):
+            new, old = result.get(metric), base.get(metric)
+            if new is None or old is None:
+                continue
+            if new > old * (1 + tolerance) and new - old > 1e-9:
+                regressions.append(
+                    f"{name}.{metric}: {old:.6g} -> {new:.6g} "
+                    f"(+{(new / old - 1) * 100 if old else float('inf'):.1f}%)"
+                )
+    return regressions
@@ -0,0 +1,122 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from controllers.ai_engine import AIEngine
+from utils.product_catalog import ProductCatalog
+
+MAX_WORKERS = int(os.getenv("BATCH_RECOMMENDATION_WORKERS", "0"))
+MAX_BATCH_ITEMS = int(os.getenv("BATCH_RECOMMENDATION_MAX_ITEMS", "10000"))
+# Score matrix cells per block, bounding memory to about 32 MB of float64
+BLOCK_CELLS = 2**22
+# Requests handed to a worker process at a time
+TASK_SIZE = 64
+
+
+def similar_products(
+    catalog: ProductCatalog, product_ids: Sequence[Any], k: int = 5
+) -> List[Dict[str, Any]]:
+    """
+    The v2 recommendation rule for many products at once: +5 for the same
+    category, +3 for a price within 20%, best ``k`` with score > 0.
+    Products are scored in blocks as a (products x catalogue) matrix.
+    """
+    results: List[Dict[str, Any]] = [None] * len(product_ids)
+    found = []
+    for i, pid in enumerate(product_ids):
+        row = catalog.row_of(pid)
+        if row is None:
+            results[i] = {"product_id": pid, "error": "Product not found"}
+        else:
+            found.append((i, row))
+
+    block = max(1, BLOCK_CELLS // max(1, len(catalog)))
+    for start in range(0, len(found), block):
+        chunk = found[start : start + block]
+        rows = np.array([row for _, row in chunk], dtype=np.int64)
+        base_price = catalog.price[rows][:, None]
+        with np.errstate(invalid="ignore"):
+            scores = 5 * (catalog.category[rows][:, None] == catalog.category) + 3 * (
+                np.abs(catalog.price - base_price) <= base_price * 0.2
+            )
+        # Never recommend the product itself (or another row with its id)
+        scores[catalog.id[rows][:, None] == catalog.id] = 0
+        for (i, _), row_scores in zip(chunk, scores):
+            top = catalog.top_k(row_scores, k, mask=row_scores > 0)
+            results[i] = {
+                "product_id": product_ids[i],
+                "recommendations": catalog.materialize(
+                    top, recommendation_score=row_scores
+                ),
+            }
+    return results
+
+
+def profile_recommendations(
+    catalog: ProductCatalog, profiles: Sequence[Dict[str, Any]], offset: int = 0
+) -> List[Dict[str, Any]]:
+    """``generate_recommendations`` for each preference profile."""
+    engine = AIEngine()
+    return [
+        {
+            "profile": offset + i,
+            "recommendations": engine.generate_recommendations(profile, catalog),
+        }
+        for i, profile in enumerate(profiles)
+    ]
+
+
+_worker_catalog: Optional[ProductCatalog] = None
+
+
+def _init_worker(catalog: ProductCatalog) -> None:
+    # Each worker receives the catalogue once, not with every task
+    global _worker_catalog
+    _worker_catalog = catalog
+
+
+def _run(
+    catalog: ProductCatalog, kind: str, items: List[Any], k: int, offset: int
+) -> List[Dict[str, Any]]:
+    if kind == "products":
+        return similar_products(catalog, items, k)
+    return profile_recommendations(catalog, items, offset)
+
+
+def _run_task(kind: str, items: List[Any], k: int, offset: int) -> List[Dict]:
+    return _run(_worker_catalog, kind, items, k, offset)
+
+
+def batch_recommendations(
+    catalog: ProductCatalog,
+    product_ids: Sequence[Any] = (),
+    profiles: Sequence[Dict[str, Any]] = (),
+    k: int = 5,
+    workers: int = 0,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield one result per product id, then one per profile, in request order.
+    ``k`` applies to product lists; profiles keep the usual top 15.
+    With ``workers`` > 1 the requests are split across a process pool;
+    results are still yielded in order as each task finishes.
+    """
+    tasks = [
+        ("products", list(product_ids[i : i + TASK_SIZE]), k, i)
+        for i in range(0, len(product_ids), TASK_SIZE)
+    ] + [
+        ("profiles", list(profiles[i : i + TASK_SIZE]), k, i)
+        for i in range(0, len(profiles), TASK_SIZE)
+    ]
+    workers = min(workers, len(tasks))
+    if workers <= 1:
+        for task in tasks:
+            yield from _run(catalog, *task)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(catalog,)
+    ) as pool:
+        for results in pool.map(_run_task, *zip(*tasks)):
+            yield from results
@@ -0,0 +1,198 @@
+import os
+import sqlite3
+from collections import Counter, defaultdict
+from itertools import permutations
+from typing import Any, Dict, Iterable, List, Optional
+
+from utils import sqlite_pool
+
+DEFAULT_DB_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "data", "co_purchase.sqlite")
+)
+
+METRICS = ("lift", "confidence")
+# Partners kept per product; lower-count pairs are evicted past this, and
+# among equal counts the least recently seen goes first so new pairs can enter
+MAX_PAIRS = int(os.getenv("CO_PURCHASE_MAX_PAIRS", "100"))
+# Pairs seen together fewer times than this are treated as noise
+MIN_COUNT = int(os.getenv("CO_PURCHASE_MIN_COUNT", "2"))
+# Larger baskets are truncated so one bulk order cannot add O(n^2) pairs
+MAX_BASKET_ITEMS = 50
+
+PAIR_UPSERT_SQL = """
+    INSERT INTO co_pairs (a, b, count, seen) VALUES (?, ?, ?, ?)
+    ON CONFLICT(a, b) DO UPDATE SET
+      count = count + excluded.count,
+      seen = excluded.seen
+    """
+ITEM_UPSERT_SQL = """
+    INSERT INTO co_items (product_id, baskets) VALUES (?, ?)
+    ON CONFLICT(product_id) DO UPDATE SET baskets = baskets + excluded.baskets
+    """
+PRUNE_SQL = """
+    DELETE FROM co_pairs WHERE a = ? AND b NOT IN (
+      SELECT b FROM co_pairs WHERE a = ? ORDER BY count DESC, seen DESC LIMIT ?
+    )
+    """
+PARTNERS_SQL = """
+    SELECT p.b, p.count, i.baskets FROM co_pairs p
+    JOIN co_items i ON i.product_id = p.b
+    WHERE p.a = ? AND p.count >= ?
+    """
+
+
+def _create_schema(conn: sqlite3.Connection) -> None:
+    with conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS co_items (
+              product_id TEXT PRIMARY KEY,
+              baskets INTEGER
+            );
+            """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS co_pairs (
+              a TEXT,
+              b TEXT,
+              count INTEGER,
+              seen INTEGER, -- basket number that last contained the pair
+              PRIMARY KEY (a, b)
+            );
+            """)
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_co_pairs_a_count "
+            "ON co_pairs(a, count DESC)"
+        )
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS co_meta (
+              key TEXT PRIMARY KEY,
+              value INTEGER
+            );
+            """)
+
+
+_pool = sqlite_pool.SQLitePool("CO_PURCHASE_DB_PATH", DEFAULT_DB_PATH, _create_schema)
+_connect = _pool.connect
+
+
+def basket_items(order: Dict[str, Any]) -> List[str]:
+    """Distinct product ids in an order's ``items`` list, in order."""
+    ids = []
+    for item in order.get("items") or []:
+        if isinstance(item, dict):
+            pid = item.get("product_id") or item.get("id")
+        else:
+            pid = item
+        if pid is not None:
+            ids.append(str(pid))
+    return list(dict.fromkeys(ids))[:MAX_BASKET_ITEMS]
+
+
+def _baskets(conn: sqlite3.Connection) -> int:
+    row = conn.execute("SELECT value FROM co_meta WHERE key='baskets'").fetchone()
+    return row[0] if row else 0
+
+
+def record_basket(product_ids: Iterable[str], max_pairs: Optional[int] = None) -> int:
+    """
+    Count one basket. Each product's partner list is trimmed back to
+    ``max_pairs`` afterwards, so storage stays bounded per product.
+    Returns the number of pair counts incremented.
+    """
+    items = list(dict.fromkeys(str(pid) for pid in product_ids))[:MAX_BASKET_ITEMS]
+    if not items:
+        return 0
+    pairs = list(permutations(items, 2))
+    limit = max_pairs or MAX_PAIRS
+    with _connect() as conn:
+        conn.execute(
+            "INSERT INTO co_meta (key, value) VALUES ('baskets', 1) "
+            "ON CONFLICT(key) DO UPDATE SET value = value + 1"
+        )
+        seen = _baskets(conn)
+        conn.executemany(ITEM_UPSERT_SQL, [(pid, 1) for pid in items])
+        conn.executemany(PAIR_UPSERT_SQL, [(a, b, 1, seen) for a, b in pairs])
+        if len(items) > 1:
+            conn.executemany(PRUNE_SQL, [(pid, pid, limit) for pid in items])
+    return len(pairs)
+
+
+def record_order(order: Dict[str, Any]) -> int:
+    return record_basket(basket_items(order))
+
+
+def rebuild(
+    orders: Iterable[Dict[str, Any]], max_pairs: Optional[int] = None
+) -> Dict[str, int]:
+    """Recount every basket from scratch and replace the stored counts."""
+    limit = max_pairs or MAX_PAIRS
+    items: Counter = Counter()
+    pairs: Dict[str, Counter] = defaultdict(Counter)
+    seen: Dict[tuple, int] = {}
+    baskets = 0
+    for order in orders:
+        basket = basket_items(order)
+        if not basket:
+            continue
+        baskets += 1
+        items.update(basket)
+        for a, b in permutations(basket, 2):
+            pairs[a][b] += 1
+            seen[a, b] = baskets
+
+    rows = []
+    for a, partners in pairs.items():
+        ranked = sorted(partners.items(), key=lambda kv: (-kv[1], -seen[a, kv[0]]))
+        rows.extend((a, b, count, seen[a, b]) for b, count in ranked[:limit])
+
+    with _connect() as conn:
+        conn.execute("DELETE FROM co_pairs")
+        conn.execute("DELETE FROM co_items")
+        conn.execute(
+            "INSERT OR REPLACE INTO co_meta (key, value) VALUES ('baskets', ?)",
+            (baskets,),
+        )
+        conn.executemany(ITEM_UPSERT_SQL, items.items())
+        conn.executemany(PAIR_UPSERT_SQL, rows)
+    return {"baskets": baskets, "products": len(items), "pairs": len(rows)}
+
+
+def frequently_bought_together(
+    product_id: str,
+    top_k: int = 10,
+    metric: str = "lift",
+    min_count: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Products most often bought with ``product_id``, best first.
+
+    confidence = P(b | a), the share of baskets with ``a`` that also hold ``b``.
+    lift = confidence / P(b); above 1 means bought together more than chance.
+    Only the stored partners of ``a`` are read, so the cost does not grow
+    with the catalogue or order history.
+    """
+    if metric not in METRICS:
+        raise ValueError(f"metric must be one of {', '.join(METRICS)}")
+    min_count = MIN_COUNT if min_count is None else min_count
+    with _connect() as conn:
+        row = conn.execute(
+            "SELECT baskets FROM co_items WHERE product_id=?", (str(product_id),)
+        ).fetchone()
+        if not row:
+            return []
+        total = _baskets(conn)
+        partners = conn.execute(PARTNERS_SQL, (str(product_id), min_count)).fetchall()
+
+    results = []
+    for pid, count, baskets in partners:
+        confidence = count / row[0]
+        lift = confidence * total / baskets if baskets else 0.0
+        results.append(
+            {
+                "product_id": pid,
+                "count": count,
+                "confidence": round(confidence, 4),
+                "lift": round(lift, 4),
+            }
+        )
+    results.sort(key=lambda r: (-r[metric], -r["count"], r["product_id"]))
+    return results[:top_k]
@@ -0,0 +1,272 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils import sqlite_pool
+
+DEFAULT_CACHE_PATH = os.path.abspath(
+    os.path.join(
+        os.path.dirname(__file__), "..", "..", "data", "embedding_cache.sqlite"
+    )
+)
+
+# Query keys share the on-disk table with product texts; the prefix keeps
+# a query from ever hitting a product entry with byte-identical text
+QUERY_KEY_PREFIX = "q:"
+
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "10000"))
+QUERY_CACHE_PERSIST = os.getenv("QUERY_EMBEDDING_CACHE_PERSIST", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+
+def _get_cache_path() -> str:
+    return os.getenv("EMBEDDING_CACHE_PATH", DEFAULT_CACHE_PATH)
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Persistent embedding cache keyed by (model, sha256 of the input text)."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or _get_cache_path()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS embedding_cache (
+                  model TEXT,
+                  text_hash TEXT,
+                  dim INTEGER,
+                  embedding BLOB, -- float32 bytes
+                  created_at TEXT,
+                  PRIMARY KEY (model, text_hash)
+                );
+                """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_meta (
+                  key TEXT PRIMARY KEY,
+                  value TEXT
+                );
+                """)
+            conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute("PRAGMA synchronous=NORMAL;")
+        return conn
+
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        unique = list(dict.fromkeys(hashes))
+        with self._connect() as conn:
+            for start in range(0, len(unique), sqlite_pool.IN_CHUNK):
+                chunk = unique[start : start + sqlite_pool.IN_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    "SELECT text_hash, embedding FROM embedding_cache "
+                    f"WHERE model=? AND text_hash IN ({placeholders})",
+                    [model, *chunk],
+                ).fetchall()
+                for h, blob in rows:
+                    found[h] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def put_many(
+        self, model: str, hashes: List[str], embeddings: List[List[float]]
+    ) -> int:
+        now = datetime.now(timezone.utc).isoformat()
+        rows = [
+            (model, h, len(emb), np.asarray(emb, dtype=np.float32).tobytes(), now)
+            for h, emb in zip(hashes, embeddings)
+            # Zero vectors are failure placeholders, never real embeddings
+            if emb and any(emb)
+        ]
+        if not rows:
+            return 0
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embedding_cache "
+                "(model, text_hash, dim, embedding, created_at) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.commit()
+        return len(rows)
+
+    def get_meta(self, key: str, default: Any = None) -> Any:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value FROM cache_meta WHERE key=?", (key,)
+            ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_meta(self, key: str, value: Any) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_meta (key, value) VALUES (?, ?)",
+                (key, json.dumps(value)),
+            )
+            conn.commit()
+
+    def size(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+
+
+def embed_with_cache(
+    texts: List[str],
+    model: str,
+    embed_fn: Callable[[List[str]], List[Optional[List[float]]]],
+    cache: Optional[EmbeddingCache] = None,
+    on_batch: Optional[Callable[[List[str], List[List[float]]], None]] = None,
+) -> Tuple[List[Optional[List[float]]], Dict[str, Any]]:
+    """
+    Embed texts, calling ``embed_fn`` only for texts not already cached for
+    ``model``. Returns embeddings in input order plus hit/miss statistics.
+
+    If ``embed_fn`` is an ``EmbeddingPipeline``, each finished batch is cached
+    straight away, so an interrupted run resumes where it stopped.
+    ``on_batch(hashes, embeddings)`` is called once for the cache hits and
+    then once per freshly embedded batch. Texts whose batch failed are None
+    in the result, counted in ``stats["failed"]`` and never passed on.
+    """
+    cache = cache or EmbeddingCache()
+    hashes = [text_hash(t) for t in texts]
+    cached = cache.get_many(model, hashes)
+    if on_batch and cached:
+        on_batch(list(cached.keys()), list(cached.values()))
+
+    missing: Dict[str, str] = {}
+    for h, t in zip(hashes, texts):
+        if h not in cached:
+            missing.setdefault(h, t)
+
+    embed_seconds = 0.0
+    if missing:
+        keys = list(missing.keys())
+
+        def store(positions: List[int], vectors: List[List[float]]) -> None:
+            batch_keys = [keys[p] for p in positions]
+            cache.put_many(model, batch_keys, vectors)
+            cached.update(zip(batch_keys, vectors))
+            if on_batch:
+                on_batch(batch_keys, vectors)
+
+        started = time.perf_counter()
+        if hasattr(embed_fn, "embed"):
+            embed_fn.embed(list(missing.values()), on_batch=store)
+        else:
+            vectors = embed_fn(list(missing.values()))
+            done = [p for p, vector in enumerate(vectors) if vector is not None]
+            if done:
+                store(done, [vectors[p] for p in done])
+        embed_seconds = time.perf_counter() - started
+
+    # Running average of embedding latency per text, used to estimate savings
+    per_text = cache.get_meta(f"seconds_per_text:{model}")
+    if missing and embed_seconds > 0:
+        observed = embed_seconds / len(missing)
+        per_text = observed if per_text is None else 0.8 * per_text + 0.2 * observed
+        cache.set_meta(f"seconds_per_text:{model}", per_text)
+
+    hits = len(texts) - sum(1 for h in hashes if h in missing)
+    stats = {
+        "texts": len(texts),
+        "hits": hits,
+        "misses": len(texts) - hits,
+        "embedded": sum(1 for h in missing if h in cached),
+        "failed": sum(1 for h in hashes if h not in cached),
+        "hit_rate": round(hits / len(texts), 4) if texts else 0.0,
+        "embed_seconds": round(embed_seconds, 3),
+        "time_saved_seconds": round(hits * (per_text or 0.0), 3),
+    }
+    if missing and hasattr(embed_fn, "stats"):
+        stats["pipeline"] = dict(embed_fn.stats)
+    return [cached.get(h) for h in hashes], stats
+
+
+def normalize_query(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+class QueryEmbeddingCache:
+    """
+    Bounded LRU of query embeddings keyed by (model, normalised text).
+    With ``persist`` set, misses fall through to the on-disk EmbeddingCache
+    so popular queries survive restarts.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        persist: Optional[bool] = None,
+        store: Optional[EmbeddingCache] = None,
+    ):
+        self.max_entries = max_entries or QUERY_CACHE_SIZE
+        self.persist = QUERY_CACHE_PERSIST if persist is None else persist
+        self._store = store
+        self._entries: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _disk(self) -> Optional[EmbeddingCache]:
+        if self.persist and self._store is None:
+            self._store = EmbeddingCache()
+        return self._store if self.persist else None
+
+    def _remember(self, key: Tuple[str, str], embedding: List[float]) -> None:
+        with self._lock:
+            self._entries[key] = embedding
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_embed(
+        self, text: str, model: str, embed_fn: Callable[[str], List[float]]
+    ) -> List[float]:
+        key = (model, text_hash(QUERY_KEY_PREFIX + normalize_query(text)))
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return embedding
+            self.misses += 1
+
+        disk = self._disk()
+        if disk is not None:
+            embedding = disk.get_many(model, [key[1]]).get(key[1])
+            if embedding is not None:
+                self._remember(key, embedding)
+                return embedding
+
+        embedding = embed_fn(text)
+        # Zero vectors mark a failed call; retry those next time
+        if embedding and any(embedding):
+            self._remember(key, embedding)
+            if disk is not None:
+                disk.put_many(model, [key[1]], [embedding])
+        return embedding
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,210 @@
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - optional, falls back to a char estimate
+    tiktoken = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+# The embeddings API accepts at most 2048 inputs per request
+MAX_BATCH_ITEMS = 2048
+
+BatchCallback = Callable[[List[int], List[List[float]]], None]
+
+
+def estimate_tokens(text: str, model: str = "text-embedding-3-small") -> int:
+    if tiktoken is not None:
+        try:
+            return len(tiktoken.encoding_for_model(model).encode(text))
+        except Exception:
+            pass
+    # ~4 characters per token for English product copy
+    return len(text) // 4 + 1
+
+
+def make_batches(
+    texts: List[str],
+    max_tokens: int,
+    max_items: int = MAX_BATCH_ITEMS,
+    model: str = "text-embedding-3-small",
+) -> List[List[int]]:
+    """Group text positions into batches bounded by token and item counts."""
+    batches: List[List[int]] = []
+    current: List[int] = []
+    tokens = 0
+    for pos, text in enumerate(texts):
+        cost = estimate_tokens(text, model)
+        if current and (tokens + cost > max_tokens or len(current) >= max_items):
+            batches.append(current)
+            current, tokens = [], 0
+        current.append(pos)
+        tokens += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _is_rate_limited(error: Exception) -> bool:
+    status = getattr(error, "status_code", None) or getattr(
+        getattr(error, "response", None), "status_code", None
+    )
+    return status == 429 or "rate limit" in str(error).lower()
+
+
+def _is_retryable(error: Exception) -> bool:
+    status = getattr(error, "status_code", None) or getattr(
+        getattr(error, "response", None), "status_code", None
+    )
+    if status is None:
+        # Connection errors and timeouts carry no status code
+        return True
+    return status == 429 or status >= 500
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        value = headers.get("retry-after")
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def openai_embedder(client, model: str) -> Callable[[List[str]], List[List[float]]]:
+    """Raw embeddings call that raises on failure so the pipeline can retry."""
+    try:
+        client = client.with_options(max_retries=0)
+    except Exception:
+        pass
+
+    def embed(texts: List[str]) -> List[List[float]]:
+        resp = client.embeddings.create(model=model, input=texts)
+        return [d.embedding for d in sorted(resp.data, key=lambda d: d.index)]
+
+    return embed
+
+
+class EmbeddingPipeline:
+    """
+    Splits inputs into token-bounded batches and embeds them concurrently.
+    Rate-limited batches back off (honouring Retry-After) and pause every
+    worker; finished batches are handed to ``on_batch`` as they complete.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[List[str]], List[List[float]]],
+        model: str = "text-embedding-3-small",
+        batch_tokens: Optional[int] = None,
+        batch_items: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        max_retries: int = 6,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.embed_fn = embed_fn
+        self.model = model
+        self.batch_tokens = batch_tokens or int(
+            os.getenv("EMBEDDINGS_BATCH_TOKENS", "8000")
+        )
+        self.batch_items = min(
+            batch_items or int(os.getenv("EMBEDDINGS_BATCH_ITEMS", "256")),
+            MAX_BATCH_ITEMS,
+        )
+        self.concurrency = max(
+            1, concurrency or int(os.getenv("EMBEDDINGS_CONCURRENCY", "4"))
+        )
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+        self._pause_until = 0.0
+        self._lock = threading.Lock()
+        self.stats: Dict[str, Any] = {}
+
+    def _wait_for_cooldown(self) -> None:
+        with self._lock:
+            remaining = self._pause_until - time.monotonic()
+        if remaining > 0:
+            self.sleep(remaining)
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        attempt = 0
+        while True:
+            self._wait_for_cooldown()
+            try:
+                return self.embed_fn(texts)
+            except Exception as e:
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    raise
+                delay = _retry_after(e)
+                if delay is None:
+                    delay = min(self.max_delay, self.base_delay * (2**attempt))
+                    delay *= 0.5 + random.random() / 2
+                with self._lock:
+                    self.stats["retries"] += 1
+                    if _is_rate_limited(e):
+                        self.stats["rate_limited"] += 1
+                        # Everyone backs off, not just the batch that got the 429
+                        self._pause_until = max(
+                            self._pause_until, time.monotonic() + delay
+                        )
+                logger.warning(
+                    f"Embedding batch failed ({e}); retrying in {delay:.1f}s"
+                )
+                self.sleep(delay)
+                attempt += 1
+
+    def embed(
+        self, texts: List[str], on_batch: Optional[BatchCallback] = None
+    ) -> List[Optional[List[float]]]:
+        """
+        Embed ``texts`` in order. ``on_batch(positions, embeddings)`` is called
+        from the caller's thread as each batch finishes. Batches that still fail
+        after retries are left as None and never reach ``on_batch``; they are
+        counted in ``stats["failed_texts"]``.
+        """
+        batches = make_batches(texts, self.batch_tokens, self.batch_items, self.model)
+        self.stats = {
+            "batches": len(batches),
+            "failed_batches": 0,
+            "failed_texts": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "seconds": 0.0,
+        }
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        started = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            futures = {
+                pool.submit(self._embed_batch, [texts[p] for p in batch]): batch
+                for batch in batches
+            }
+            for future in as_completed(futures):
+                batch = futures[future]
+                try:
+                    vectors = future.result()
+                except Exception as e:
+                    logger.error(f"Embedding batch of {len(batch)} failed: {e}")
+                    self.stats["failed_batches"] += 1
+                    self.stats["failed_texts"] += len(batch)
+                    continue
+                for pos, vec in zip(batch, vectors):
+                    results[pos] = vec
+                if on_batch:
+                    on_batch(batch, vectors)
+
+        self.stats["seconds"] = round(time.perf_counter() - started, 3)
+        return results
+
+    def __call__(self, texts: List[str]) -> List[Optional[List[float]]]:
+        return self.embed(texts)
@@ -1,7 +1,7 @@
 import logging
 import os
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import firebase_admin
 from dotenv import load_dotenv
@@ -316,31 +316,106 @@ class FirebaseUtils:
                     return []
 
                 documents = list(self._mock_data[collection_name].values())
+                result = [
+                    doc
+                    for doc in documents
+                    if self._mock_matches(doc.get(field), operator, value)
+                ]
+
+                if limit:
+                    result = result[:limit]
+
+                return result
+
+        except Exception as e:
+            logger.error(f"Error querying documents: {str(e)}")
+            raise
+
+    @staticmethod
+    def _mock_matches(field_value: Any, operator: str, value: Any) -> bool:
+        """Evaluate one where-condition against a mock document's field"""
+        if operator == "==":
+            return field_value == value
+        elif operator == ">":
+            return bool(field_value) and field_value > value
+        elif operator == "<":
+            return bool(field_value) and field_value < value
+        elif operator == ">=":
+            return bool(field_value) and field_value >= value
+        elif operator == "<=":
+            return bool(field_value) and field_value <= value
+        elif operator == "!=":
+            return field_value != value
+        elif operator == "in":
+            return field_value in value
+        elif operator == "array-contains":
+            return isinstance(field_value, list) and value in field_value
+        return False
+
+    def query_where(
+        self,
+        collection_name: str,
+        conditions: List[Tuple[str, str, Any]],
+        order_by: Optional[str] = None,
+        descending: bool = False,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Query documents matching every condition (a compound query)
+
+        Args:
+            collection_name (str): Name of the collection
+            conditions (List[Tuple[str, str, Any]]): (field, operator, value) filters
+            order_by (str, optional): Field to order by
+            descending (bool): Order from the highest value down
+            limit (int, optional): Maximum number of documents to return
+
+        Returns:
+            List[Dict[str, Any]]: List of matching documents
+        """
+        try:
+            if self.db:
+                # Use Firestore; equality plus one range field needs a composite index
+                query = self.db.collection(collection_name)
+                for field, operator, value in conditions:
+                    query = query.where(field, operator, value)
+
+                if order_by:
+                    query = query.order_by(
+                        order_by,
+                        direction=(
+                            firestore.Query.DESCENDING
+                            if descending
+                            else firestore.Query.ASCENDING
+                        ),
+                    )
+
+                if limit:
+                    query = query.limit(limit)
+
                 result = []
+                for doc in query.stream():
+                    data = doc.to_dict()
+                    data["id"] = doc.id
+                    result.append(data)
 
-                for doc in documents:
-                    field_value = doc.get(field)
-
-                    if operator == "==" and field_value == value:
-                        result.append(doc)
-                    elif operator == ">" and field_value and field_value > value:
-                        result.append(doc)
-                    elif operator == "<" and field_value and field_value < value:
-                        result.append(doc)
-                    elif operator == ">=" and field_value and field_value >= value:
-                        result.append(doc)
-                    elif operator == "<=" and field_value and field_value <= value:
-                        result.append(doc)
-                    elif operator == "!=" and field_value != value:
-                        result.append(doc)
-                    elif operator == "in" and field_value in value:
-                        result.append(doc)
-                    elif (
-                        operator == "array-contains"
-                        and isinstance(field_value, list)
-                        and value in field_value
-                    ):
-                        result.append(doc)
+                return result
+            else:
+                # Use mock database
+                if collection_name not in self._mock_data:
+                    return []
+
+                result = [
+                    doc
+                    for doc in self._mock_data[collection_name].values()
+                    if all(
+                        self._mock_matches(doc.get(field), operator, value)
+                        for field, operator, value in conditions
+                    )
+                ]
+
+                if order_by:
+                    result.sort(key=lambda x: x.get(order_by, ""), reverse=descending)
 
                 if limit:
                     result = result[:limit]
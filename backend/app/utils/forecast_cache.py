@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from utils import sqlite_pool
+
+CACHE_SIZE = int(os.getenv("FORECAST_CACHE_SIZE", "50000"))
+
+# (product_id, model version, series hash, horizon)
+Key = Tuple[str, str, str, int]
+
+
+def series_hash(history) -> str:
+    """Fingerprint of an input series; any changed day changes it."""
+    values = np.ascontiguousarray(history, dtype=np.float64)
+    return hashlib.sha256(values.tobytes()).hexdigest()[:32]
+
+
+def make_key(product_id: Any, model: str, history, horizon: int) -> Key:
+    return (str(product_id), model, series_hash(history), int(horizon))
+
+
+def _create_schema(conn: sqlite3.Connection) -> None:
+    with conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS forecast_cache (
+              product_id TEXT,
+              model TEXT,
+              series_hash TEXT,
+              horizon INTEGER,
+              value TEXT, -- JSON forecast result
+              created_at TEXT,
+              PRIMARY KEY (product_id, model, series_hash, horizon)
+            );
+            """)
+
+
+# An unset path keeps the cache in memory only, so callers check it first
+_pool = sqlite_pool.SQLitePool("FORECAST_CACHE_PATH", "", _create_schema)
+_get_db_path = _pool.path
+_connect = _pool.connect
+
+
+class ForecastCache:
+    """
+    Bounded LRU of forecast results keyed by (product, model version, input
+    series hash, horizon), optionally backed by a sqlite file shared between
+    processes (``FORECAST_CACHE_PATH``).
+
+    Because the key includes the series hash, a forecast is never served for
+    a history it was not computed from; ``invalidate_products`` just drops
+    entries that can no longer be hit once a product's sales change.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries or CACHE_SIZE
+        self._entries: "OrderedDict[Key, Dict[str, Any]]" = OrderedDict()
+        self._by_product: Dict[str, set] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _drop(self, key: Key) -> None:
+        del self._entries[key]
+        keys = self._by_product.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_product[key[0]]
+
+    def _remember(self, key: Key, value: Dict[str, Any]) -> None:
+        if key in self._entries:
+            self._entries.move_to_end(key)
+        self._entries[key] = value
+        self._by_product.setdefault(key[0], set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+    def get_many(self, keys: Iterable[Key]) -> Dict[Key, Dict[str, Any]]:
+        """Cached results for whichever ``keys`` are present."""
+        keys = list(keys)
+        found: Dict[Key, Dict[str, Any]] = {}
+        with self._lock:
+            for key in keys:
+                value = self._entries.get(key)
+                if value is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = value
+        missing = [key for key in keys if key not in found]
+        path = _get_db_path()
+        if missing and path:
+            conn = _connect(path)
+            for key in missing:
+                row = conn.execute(
+                    "SELECT value FROM forecast_cache WHERE product_id = ? "
+                    "AND model = ? AND series_hash = ? AND horizon = ?",
+                    key,
+                ).fetchone()
+                if row is not None:
+                    found[key] = json.loads(row[0])
+            with self._lock:
+                for key in missing:
+                    if key in found:
+                        self._remember(key, found[key])
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items: Dict[Key, Dict[str, Any]]) -> None:
+        with self._lock:
+            for key, value in items.items():
+                self._remember(key, value)
+        path = _get_db_path()
+        if items and path:
+            created_at = datetime.now(timezone.utc).isoformat()
+            with _connect(path) as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO forecast_cache VALUES (?, ?, ?, ?, ?, ?)",
+                    [
+                        (*key, json.dumps(value), created_at)
+                        for key, value in items.items()
+                    ],
+                )
+
+    def invalidate_products(self, product_ids: Iterable[Any]) -> int:
+        """Drop every cached forecast of these products."""
+        product_ids = {str(pid) for pid in product_ids}
+        with self._lock:
+            keys = [key for pid in product_ids for key in self._by_product.get(pid, ())]
+            for key in keys:
+                self._drop(key)
+        path = _get_db_path()
+        if product_ids and path:
+            with _connect(path) as conn:
+                conn.executemany(
+                    "DELETE FROM forecast_cache WHERE product_id = ?",
+                    [(pid,) for pid in product_ids],
+                )
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_product.clear()
+        path = _get_db_path()
+        if path:
+            with _connect(path) as conn:
+                conn.execute("DELETE FROM forecast_cache")
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+forecast_cache = ForecastCache()
@@ -0,0 +1,80 @@
+from typing import List
+
+import numpy as np
+
+# Part of forecast cache keys; bump when the forecast output changes
+MODEL_VERSION = "smoothing-1"
+ALPHA = 0.3  # Smoothing parameter
+TREND_WINDOW = 10  # Recent days the trend slope is fitted on
+# Trend slope is scaled down to a small per-day growth factor
+TREND_SCALE = 0.01
+
+
+def _as_matrix(history) -> np.ndarray:
+    matrix = np.asarray(history, dtype=float)
+    return matrix.reshape(1, -1) if matrix.ndim == 1 else matrix
+
+
+def smoothed_level(history, alpha: float = ALPHA) -> np.ndarray:
+    """
+    Final simple exponential smoothing level of each row, seeded with the
+    first value. The recursion unrolls into fixed weights per day, so all
+    series reduce to one matrix-vector product.
+    """
+    history = _as_matrix(history)
+    days = history.shape[1]
+    if days == 0:
+        return np.zeros(history.shape[0])
+    weights = alpha * (1 - alpha) ** np.arange(days - 1, -1, -1, dtype=float)
+    weights[0] = (1 - alpha) ** (days - 1)
+    return history @ weights
+
+
+def trend_factor(history, window: int = TREND_WINDOW) -> np.ndarray:
+    """Least-squares slope of the last ``window`` days, relative to their mean."""
+    recent = _as_matrix(history)[:, -window:]
+    days = recent.shape[1]
+    if days < 2:
+        return np.zeros(recent.shape[0])
+    x = np.arange(days, dtype=float) - (days - 1) / 2
+    mean = recent.mean(axis=1)
+    slope = (recent - mean[:, None]) @ x / (x @ x)
+    factor = slope / np.maximum(mean, 1) * TREND_SCALE
+    return np.nan_to_num(factor, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def forecast(
+    history,
+    days_ahead: int,
+    alpha: float = ALPHA,
+    window: int = TREND_WINDOW,
+) -> np.ndarray:
+    """
+    Forecast every series in a (series x days) array ``days_ahead`` days out:
+    the smoothed level compounded by the recent trend, floored at zero.
+    Returns a (series x days_ahead) array.
+    """
+    history = _as_matrix(history)
+    level = smoothed_level(history, alpha)
+    growth = 1 + trend_factor(history, window)
+    steps = np.arange(1, days_ahead + 1, dtype=float)
+    return np.maximum(level[:, None] * growth[:, None] ** steps, 0)
+
+
+def trend_labels(history) -> List[str]:
+    """
+    "increasing", "decreasing" or "stable" per series: the last 10 days
+    against days -30..-20 (or everything before the last 10 when shorter).
+    """
+    history = _as_matrix(history)
+    days = history.shape[1]
+    if days < 10:
+        return ["insufficient_data"] * history.shape[0]
+    recent = history[:, -10:].mean(axis=1)
+    older = (history[:, -30:-20] if days >= 30 else history[:, :-10]).mean(axis=1)
+    labels = np.where(
+        recent > older * 1.1,
+        "increasing",
+        np.where(recent < older * 0.9, "decreasing", "stable"),
+    )
+    return labels.tolist()
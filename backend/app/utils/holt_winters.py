@@ -0,0 +1,250 @@
+import os
+import sqlite3
+from datetime import datetime, timezone
+from itertools import product
+from typing import Any, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from utils import sqlite_pool
+
+DEFAULT_DB_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "data", "holt_winters.sqlite")
+)
+
+# Part of forecast cache keys; bump when the forecast output changes
+MODEL_VERSION = "holt_winters-1"
+SEASON = 7  # Weekly seasonality in daily sales
+MODES = ("additive", "multiplicative")
+ALPHAS = (0.1, 0.3, 0.5, 0.7, 0.9)
+BETAS = (0.0, 0.05, 0.1, 0.2)
+GAMMAS = (0.05, 0.1, 0.3, 0.5)
+# Series fitted together, bounding the (series x grid x season) state
+FIT_CHUNK = 256
+# Recent one-step errors are compared against the fit's error over this many days
+DRIFT_WINDOW = 2 * SEASON
+# Refit once recent RMSE exceeds the fitted RMSE by this ratio
+DRIFT_RATIO = float(os.getenv("HOLT_WINTERS_DRIFT_RATIO", "1.5"))
+# Absolute RMSE slack so near-perfect fits are not refit on every blip
+DRIFT_FLOOR = 0.5
+
+UPSERT_SQL = """
+    INSERT OR REPLACE INTO hw_params
+      (product_id, mode, alpha, beta, gamma, rmse, observations, fitted_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """
+
+
+def _grid() -> Tuple[np.ndarray, ...]:
+    combos = list(product(range(len(MODES)), ALPHAS, BETAS, GAMMAS))
+    return tuple(np.array(column) for column in zip(*combos))
+
+
+GRID_MODE, GRID_ALPHA, GRID_BETA, GRID_GAMMA = _grid()
+
+
+def _as_matrix(history) -> np.ndarray:
+    matrix = np.asarray(history, dtype=float)
+    return matrix.reshape(1, -1) if matrix.ndim == 1 else matrix
+
+
+def _run(
+    history: np.ndarray,
+    multiplicative: np.ndarray,
+    alpha: np.ndarray,
+    beta: np.ndarray,
+    gamma: np.ndarray,
+    recent: int = 0,
+) -> Dict[str, np.ndarray]:
+    """
+    Holt-Winters recursion over a (series x days) history for a
+    (series x params) set of parameters, vectorized across both axes; only
+    the days are stepped through. Returns the final level, trend and season
+    plus one-step-ahead squared errors overall and over the last ``recent``
+    days.
+    """
+    n, days = history.shape
+    shape = np.broadcast_shapes((n, 1), alpha.shape)
+    mul = np.broadcast_to(multiplicative, shape)
+
+    first = history[:, :SEASON]
+    level = np.broadcast_to(first.mean(axis=1, keepdims=True), shape).copy()
+    if days >= 2 * SEASON:
+        second = history[:, SEASON : 2 * SEASON].mean(axis=1, keepdims=True)
+        trend = (second - first.mean(axis=1, keepdims=True)) / SEASON
+    else:
+        trend = np.zeros((n, 1))
+    trend = np.broadcast_to(trend, shape).copy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(level[..., None] > 0, first[:, None, :] / level[..., None], 1)
+    season = np.where(mul[..., None], ratio, first[:, None, :] - level[..., None])
+
+    sse = np.zeros(shape)
+    recent_sse = np.zeros(shape)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        for t in range(SEASON, days):
+            y = history[:, t : t + 1]
+            s = season[..., t % SEASON]
+            base = level + trend
+            error = y - np.where(mul, base * s, base + s)
+            sse += error**2
+            if t >= days - recent:
+                recent_sse += error**2
+
+            deseasonalized = np.where(mul, y / np.where(s != 0, s, 1), y - s)
+            new_level = alpha * deseasonalized + (1 - alpha) * base
+            trend = beta * (new_level - level) + (1 - beta) * trend
+            level = new_level
+            detrended = np.where(mul, y / np.where(level != 0, level, 1), y - level)
+            season[..., t % SEASON] = gamma * detrended + (1 - gamma) * s
+
+    return {
+        "level": level,
+        "trend": trend,
+        "season": season,
+        "sse": np.nan_to_num(sse, nan=np.inf),
+        "recent_sse": recent_sse,
+    }
+
+
+def fit(history) -> List[Dict[str, Any]]:
+    """
+    Best parameters per series by grid search over smoothing weights and
+    both seasonal modes, scored on one-step-ahead squared error. Every
+    series and grid point is evaluated in the same array pass.
+    Multiplicative seasonality is only considered for strictly positive
+    series.
+    """
+    history = _as_matrix(history)
+    fitted: List[Dict[str, Any]] = []
+    for start in range(0, len(history), FIT_CHUNK):
+        chunk = history[start : start + FIT_CHUNK]
+        state = _run(
+            chunk,
+            GRID_MODE[None, :] == 1,
+            GRID_ALPHA[None, :],
+            GRID_BETA[None, :],
+            GRID_GAMMA[None, :],
+        )
+        sse = state["sse"]
+        sse[:, GRID_MODE == 1] = np.where(
+            (chunk > 0).all(axis=1, keepdims=True), sse[:, GRID_MODE == 1], np.inf
+        )
+        best = sse.argmin(axis=1)
+        steps = max(chunk.shape[1] - SEASON, 1)
+        for row, column in enumerate(best):
+            fitted.append(
+                {
+                    "mode": MODES[GRID_MODE[column]],
+                    "alpha": float(GRID_ALPHA[column]),
+                    "beta": float(GRID_BETA[column]),
+                    "gamma": float(GRID_GAMMA[column]),
+                    "rmse": float(np.sqrt(sse[row, column] / steps)),
+                    "observations": int(chunk.shape[1]),
+                }
+            )
+    return fitted
+
+
+def _param_columns(params: List[Dict[str, Any]]) -> Tuple[np.ndarray, ...]:
+    return (
+        np.array([[p["mode"] == "multiplicative"] for p in params]),
+        np.array([[p["alpha"]] for p in params], dtype=float),
+        np.array([[p["beta"]] for p in params], dtype=float),
+        np.array([[p["gamma"]] for p in params], dtype=float),
+    )
+
+
+def forecast(
+    history, params: List[Dict[str, Any]], days_ahead: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Forecast every series with its own fitted parameters, floored at zero.
+    Returns the (series x days_ahead) forecast and each series' RMSE over
+    its last ``DRIFT_WINDOW`` days, for drift checks.
+    """
+    history = _as_matrix(history)
+    columns = _param_columns(params)
+    state = _run(history, *columns, recent=DRIFT_WINDOW)
+    days = history.shape[1]
+    steps = np.arange(1, days_ahead + 1, dtype=float)
+    positions = (days + steps.astype(int) - 1) % SEASON
+    season = state["season"][:, 0, :][:, positions]
+    base = state["level"] + state["trend"] * steps
+    predicted = np.where(columns[0], base * season, base + season)
+    recent = min(DRIFT_WINDOW, max(days - SEASON, 1))
+    recent_rmse = np.sqrt(state["recent_sse"][:, 0] / recent)
+    return np.maximum(np.nan_to_num(predicted), 0), recent_rmse
+
+
+def drifted(params: Dict[str, Any], recent_rmse: float) -> bool:
+    """True when recent errors have outgrown the fit's error."""
+    return recent_rmse > DRIFT_RATIO * max(params["rmse"], DRIFT_FLOOR)
+
+
+def _create_schema(conn: sqlite3.Connection) -> None:
+    with conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS hw_params (
+              product_id TEXT PRIMARY KEY,
+              mode TEXT,
+              alpha REAL,
+              beta REAL,
+              gamma REAL,
+              rmse REAL,
+              observations INTEGER,
+              fitted_at TEXT
+            );
+            """)
+
+
+_pool = sqlite_pool.SQLitePool("HOLT_WINTERS_DB_PATH", DEFAULT_DB_PATH, _create_schema)
+_connect = _pool.connect
+
+
+def load_params(product_ids: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+    """Stored parameters for the products that have them."""
+    product_ids = [str(pid) for pid in product_ids]
+    found: Dict[str, Dict[str, Any]] = {}
+    conn = _connect()
+    for i in range(0, len(product_ids), sqlite_pool.IN_CHUNK):
+        chunk = product_ids[i : i + sqlite_pool.IN_CHUNK]
+        rows = conn.execute(
+            "SELECT product_id, mode, alpha, beta, gamma, rmse, observations, "
+            f"fitted_at FROM hw_params WHERE product_id IN ({', '.join('?' * len(chunk))})",
+            chunk,
+        )
+        for pid, mode, alpha, beta, gamma, rmse, observations, fitted_at in rows:
+            found[pid] = {
+                "mode": mode,
+                "alpha": alpha,
+                "beta": beta,
+                "gamma": gamma,
+                "rmse": rmse,
+                "observations": observations,
+                "fitted_at": fitted_at,
+            }
+    return found
+
+
+def save_params(params: Dict[Any, Dict[str, Any]]) -> None:
+    """Store fitted parameters, stamping them with the fit time."""
+    fitted_at = datetime.now(timezone.utc).isoformat()
+    rows = []
+    for pid, p in params.items():
+        p.setdefault("fitted_at", fitted_at)
+        rows.append(
+            (
+                str(pid),
+                p["mode"],
+                p["alpha"],
+                p["beta"],
+                p["gamma"],
+                p["rmse"],
+                p["observations"],
+                p["fitted_at"],
+            )
+        )
+    if rows:
+        with _connect() as conn:
+            conn.executemany(UPSERT_SQL, rows)
@@ -0,0 +1,184 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+FUSION_MODES = ("rrf", "weighted")
+# Standard RRF damping constant; larger values flatten the rank curve
+RRF_K = 60
+# Vector candidates fetched per requested result, to survive post-filtering
+SEMANTIC_OVERSAMPLE = 4
+
+
+def _product_id(product: Dict[str, Any]) -> Optional[str]:
+    return product.get("id") or product.get("_id") or product.get("sku")
+
+
+def category_key(category: Any) -> str:
+    """
+    Case-folded category, the form both retrievers compare. Vector metadata
+    stores categories in this form, so the store's exact match agrees with
+    the lexical filter.
+    """
+    return str(category).lower()
+
+
+def apply_filters(
+    products: List[Dict[str, Any]],
+    category: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+) -> List[Dict[str, Any]]:
+    """Narrow the catalogue before any retriever scores it."""
+    if not category and min_price is None and max_price is None:
+        return products
+    wanted = category_key(category) if category else None
+    selected = []
+    for p in products:
+        if wanted and category_key(p.get("category", "")) != wanted:
+            continue
+        if min_price is not None or max_price is not None:
+            try:
+                price = float(p.get("price"))
+            except (TypeError, ValueError):
+                continue
+            if min_price is not None and price < min_price:
+                continue
+            if max_price is not None and price > max_price:
+                continue
+        selected.append(p)
+    return selected
+
+
+def reciprocal_rank_fusion(
+    rankings: Dict[str, Sequence[str]],
+    weights: Optional[Dict[str, float]] = None,
+    k: int = RRF_K,
+) -> Dict[str, float]:
+    """score(d) = sum over retrievers of weight / (k + rank of d)."""
+    fused: Dict[str, float] = {}
+    for name, ids in rankings.items():
+        weight = (weights or {}).get(name, 1.0)
+        for rank, doc_id in enumerate(ids, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + weight / (k + rank)
+    return fused
+
+
+def weighted_fusion(
+    scores: Dict[str, Dict[str, float]], weights: Optional[Dict[str, float]] = None
+) -> Dict[str, float]:
+    """Min-max normalise each retriever's scores, then take a weighted sum."""
+    fused: Dict[str, float] = {}
+    for name, by_id in scores.items():
+        if not by_id:
+            continue
+        weight = (weights or {}).get(name, 1.0)
+        lo, hi = min(by_id.values()), max(by_id.values())
+        span = hi - lo
+        for doc_id, score in by_id.items():
+            norm = (score - lo) / span if span else 1.0
+            fused[doc_id] = fused.get(doc_id, 0.0) + weight * norm
+    return fused
+
+
+def hybrid_search(
+    query: str,
+    load_products: Callable[[], List[Dict[str, Any]]],
+    lexical_search: Callable[[str, List[Dict[str, Any]]], List[Dict[str, Any]]],
+    semantic_search: Optional[
+        Callable[[str, int, Optional[Dict[str, Any]]], List[Dict[str, Any]]]
+    ] = None,
+    top_k: int = 10,
+    category: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    mode: str = "rrf",
+    semantic_weight: float = 0.5,
+    rrf_k: int = RRF_K,
+) -> Dict[str, Any]:
+    """
+    Run the lexical and vector retrievers concurrently and fuse their rankings.
+
+    The lexical side scores only the filtered catalogue. The vector side
+    filters on category inside the store and oversamples so that hits
+    outside the price range can be dropped afterwards.
+    """
+    if mode not in FUSION_MODES:
+        raise ValueError(f"mode must be one of {FUSION_MODES}")
+
+    def run_lexical():
+        catalogue = load_products() or []
+        allowed = apply_filters(catalogue, category, min_price, max_price)
+        return catalogue, allowed, lexical_search(query, allowed) if allowed else []
+
+    def run_semantic():
+        if semantic_search is None:
+            return []
+        filters = {"category": category_key(category)} if category else None
+        return semantic_search(query, top_k * SEMANTIC_OVERSAMPLE, filters)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        lexical_future = pool.submit(run_lexical)
+        semantic_future = pool.submit(run_semantic)
+        catalogue, allowed, lexical_hits = lexical_future.result()
+        try:
+            semantic_hits = semantic_future.result()
+        except Exception as e:
+            logger.error(f"Semantic retriever failed, using lexical only: {e}")
+            semantic_hits = []
+
+    filtered = bool(category or min_price is not None or max_price is not None)
+    products = {_product_id(p): p for p in catalogue}
+    allowed_ids = {_product_id(p) for p in allowed}
+
+    lexical_scores: Dict[str, float] = {}
+    for hit in lexical_hits:
+        lexical_scores.setdefault(
+            _product_id(hit), float(hit.get("relevance_score", 0.0))
+        )
+    semantic_scores: Dict[str, float] = {}
+    for hit in semantic_hits:
+        pid = hit.get("id")
+        if pid is None or pid in semantic_scores:
+            continue
+        if filtered and pid not in allowed_ids:
+            continue
+        semantic_scores[pid] = float(hit.get("score", 0.0))
+
+    semantic_order = sorted(semantic_scores, key=semantic_scores.get, reverse=True)
+
+    weights = {"lexical": 1.0 - semantic_weight, "semantic": semantic_weight}
+    if mode == "rrf":
+        fused = reciprocal_rank_fusion(
+            {"lexical": list(lexical_scores), "semantic": semantic_order},
+            weights,
+            rrf_k,
+        )
+    else:
+        fused = weighted_fusion(
+            {"lexical": lexical_scores, "semantic": semantic_scores}, weights
+        )
+
+    lexical_rank = {pid: r for r, pid in enumerate(lexical_scores, start=1)}
+    semantic_rank = {pid: r for r, pid in enumerate(semantic_order, start=1)}
+    meta_by_id = {h.get("id"): h.get("metadata", {}) for h in semantic_hits}
+
+    results = []
+    for pid in sorted(fused, key=lambda d: (-fused[d], str(d)))[:top_k]:
+        base = products.get(pid) or {"id": pid, **meta_by_id.get(pid, {})}
+        result = {k: v for k, v in base.items() if k != "relevance_score"}
+        result["hybrid_score"] = round(fused[pid], 6)
+        result["lexical_rank"] = lexical_rank.get(pid)
+        result["semantic_rank"] = semantic_rank.get(pid)
+        results.append(result)
+
+    return {
+        "results": results,
+        "mode": mode,
+        "retrievers": ["lexical"] + (["semantic"] if semantic_search else []),
+        "candidates": {
+            "lexical": len(lexical_scores),
+            "semantic": len(semantic_scores),
+        },
+    }
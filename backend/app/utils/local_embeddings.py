@@ -0,0 +1,158 @@
+import os
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.random_projection import SparseRandomProjection
+
+DEFAULT_STATE_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "data", "local_embeddings.npz")
+)
+
+PROVIDERS = ("auto", "openai", "hashing", "projection")
+# Feature space hashed before projecting down to the output dimension
+PROJECTION_FEATURES = 2**18
+
+
+def get_provider() -> str:
+    provider = os.getenv("EMBEDDINGS_PROVIDER", "auto").lower()
+    return provider if provider in PROVIDERS else "auto"
+
+
+def remote_embeddings_enabled() -> bool:
+    return get_provider() in ("auto", "openai")
+
+
+class LocalEmbedder:
+    """
+    Offline embeddings from hashed word and character n-grams.
+
+    ``hashing`` buckets features straight into ``dim`` slots. ``projection``
+    hashes into a wide space and applies a fixed sparse random projection,
+    which keeps more of the n-gram structure. Both weight features by IDF
+    once ``fit`` has seen the catalogue, and return L2-normalised vectors.
+    """
+
+    def __init__(
+        self,
+        method: str = "hashing",
+        dim: int = 384,
+        state_path: Optional[str] = None,
+    ):
+        if method not in ("hashing", "projection"):
+            raise ValueError("method must be 'hashing' or 'projection'")
+        self.method = method
+        self.dim = dim
+        self.state_path = state_path or os.getenv(
+            "LOCAL_EMBEDDINGS_PATH", DEFAULT_STATE_PATH
+        )
+        features = dim if method == "hashing" else PROJECTION_FEATURES
+        self._chars = HashingVectorizer(
+            analyzer="char_wb",
+            ngram_range=(3, 4),
+            n_features=features,
+            alternate_sign=False,
+            norm=None,
+        )
+        self._words = HashingVectorizer(
+            ngram_range=(1, 2),
+            n_features=features,
+            alternate_sign=False,
+            norm=None,
+        )
+        self._projection = None
+        if method == "projection":
+            self._projection = SparseRandomProjection(
+                n_components=dim, random_state=0
+            ).fit(sp.csr_matrix((1, features)))
+        self.idf: Optional[np.ndarray] = None
+        # mtime of the IDF file last loaded; another process may refit it
+        self._state_mtime: Optional[int] = None
+        self._lock = threading.Lock()
+        self._refresh()
+
+    @property
+    def model(self) -> str:
+        return f"local-{self.method}-{self.dim}"
+
+    @property
+    def fitted(self) -> bool:
+        self._refresh()
+        return self.idf is not None
+
+    def _features(self, texts: List[str]) -> sp.csr_matrix:
+        counts = self._chars.transform(texts) + self._words.transform(texts)
+        counts.data = 1.0 + np.log(counts.data)  # sublinear term frequency
+        return counts
+
+    def _refresh(self) -> None:
+        """Load the saved IDF weights if the file changed since the last load."""
+        try:
+            mtime = os.stat(self.state_path).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._state_mtime:
+            return
+        with self._lock:
+            try:
+                with np.load(self.state_path, allow_pickle=False) as data:
+                    if str(data["model"]) == self.model:
+                        self.idf = data["idf"]
+            except (OSError, KeyError, ValueError):
+                return
+            self._state_mtime = mtime
+
+    def fit(self, texts: List[str]) -> "LocalEmbedder":
+        """Learn IDF weights from a catalogue and persist them."""
+        if not texts:
+            return self
+        counts = self._features(texts)
+        df = np.bincount(counts.indices, minlength=counts.shape[1])
+        idf = np.log((1.0 + len(texts)) / (1.0 + df)) + 1.0
+        with self._lock:
+            self.idf = idf.astype(np.float32)
+            os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+            tmp = self.state_path + ".tmp.npz"
+            np.savez(tmp, model=np.array(self.model), idf=self.idf)
+            os.replace(tmp, self.state_path)
+            self._state_mtime = os.stat(self.state_path).st_mtime_ns
+        return self
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        self._refresh()
+        weighted = self._features(texts)
+        if self.idf is not None:
+            weighted = weighted.multiply(self.idf).tocsr()
+        if self._projection is not None:
+            dense = np.asarray(self._projection.transform(weighted).todense())
+        else:
+            dense = weighted.toarray()
+        norms = np.linalg.norm(dense, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (dense / norms).astype(np.float32).tolist()
+
+    def __call__(self, texts: List[str]) -> List[List[float]]:
+        return self.embed(texts)
+
+
+_embedders: Dict[tuple, LocalEmbedder] = {}
+_embedders_lock = threading.Lock()
+
+
+def get_local_embedder() -> LocalEmbedder:
+    """Shared embedder for the configured method."""
+    provider = get_provider()
+    if provider in ("hashing", "projection"):
+        method = provider
+    else:
+        method = os.getenv("LOCAL_EMBEDDINGS_METHOD", "hashing")
+    dim = int(os.getenv("LOCAL_EMBEDDINGS_DIM", "384"))
+    key = (method, dim, os.getenv("LOCAL_EMBEDDINGS_PATH", DEFAULT_STATE_PATH))
+    with _embedders_lock:
+        if key not in _embedders:
+            _embedders[key] = LocalEmbedder(method, dim, key[2])
+        return _embedders[key]
@@ -0,0 +1,140 @@
+import json
+import os
+from typing import Any, Dict
+
+import numpy as np
+
+DEFAULT_NPZ_PATH = os.path.abspath(
+    os.path.join(
+        os.path.dirname(__file__), "..", "..", "..", "ml_models", "demand_model.npz"
+    )
+)
+
+# Arrays in the exported file
+LSTM_ARRAYS = ("lstm_kernel", "lstm_recurrent_kernel", "lstm_bias")
+DENSE_ARRAYS = ("dense_kernel", "dense_bias")
+SCALER_ARRAYS = ("scaler_scale", "scaler_min")
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 0.5 * (1 + np.tanh(0.5 * x))  # overflow-free logistic
+
+
+class MinMaxScalerParams:
+    """The ``transform``/``inverse_transform`` of a fitted MinMaxScaler."""
+
+    def __init__(self, scale: np.ndarray, min_: np.ndarray):
+        self.scale_ = np.asarray(scale, dtype=float)
+        self.min_ = np.asarray(min_, dtype=float)
+
+    def transform(self, X) -> np.ndarray:
+        return np.asarray(X, dtype=float) * self.scale_ + self.min_
+
+    def inverse_transform(self, X) -> np.ndarray:
+        return (np.asarray(X, dtype=float) - self.min_) / self.scale_
+
+
+class NumpyLSTM:
+    """
+    Forward pass of a Keras ``Sequential([LSTM(units), Dense(1)])`` model
+    (tanh activation, sigmoid recurrent activation, gates ordered i, f, c, o
+    as Keras stores them), using only NumPy.
+    """
+
+    def __init__(
+        self,
+        kernel: np.ndarray,
+        recurrent_kernel: np.ndarray,
+        bias: np.ndarray,
+        dense_kernel: np.ndarray,
+        dense_bias: np.ndarray,
+    ):
+        self.kernel = np.asarray(kernel, dtype=float)
+        self.recurrent_kernel = np.asarray(recurrent_kernel, dtype=float)
+        self.bias = np.asarray(bias, dtype=float)
+        self.dense_kernel = np.asarray(dense_kernel, dtype=float)
+        self.dense_bias = np.asarray(dense_bias, dtype=float)
+        self.units = self.recurrent_kernel.shape[0]
+
+    def predict(self, inputs) -> np.ndarray:
+        """
+        Predictions for a (samples x timesteps x features) batch, or
+        (samples x timesteps) for a single feature, as (samples x 1).
+        """
+        x = np.asarray(inputs, dtype=float)
+        if x.ndim == 2:
+            x = x[..., None]
+        u = self.units
+        h = np.zeros((x.shape[0], u))
+        c = np.zeros((x.shape[0], u))
+        # Input contributions for every timestep in one product
+        projected = x @ self.kernel + self.bias
+        for t in range(x.shape[1]):
+            z = projected[:, t] + h @ self.recurrent_kernel
+            i = _sigmoid(z[:, :u])
+            f = _sigmoid(z[:, u : 2 * u])
+            g = np.tanh(z[:, 2 * u : 3 * u])
+            o = _sigmoid(z[:, 3 * u :])
+            c = f * c + i * g
+            h = o * np.tanh(c)
+        return h @ self.dense_kernel + self.dense_bias
+
+
+def load(path: str = DEFAULT_NPZ_PATH):
+    """The model and scaler from an exported ``.npz``."""
+    with np.load(path) as data:
+        model = NumpyLSTM(*(data[name] for name in LSTM_ARRAYS + DENSE_ARRAYS))
+        scaler = MinMaxScalerParams(*(data[name] for name in SCALER_ARRAYS))
+    return model, scaler
+
+
+def _layer_weights(group) -> Dict[str, np.ndarray]:
+    # Keras 2 nests weights as <layer>/<layer>/kernel:0, Keras 3 as
+    # <layer>/sequential/<layer>/kernel; only the final names matter
+    weights: Dict[str, np.ndarray] = {}
+
+    def visit(name, item):
+        if hasattr(item, "shape"):
+            weights[name.rsplit("/", 1)[-1].split(":")[0]] = item[()]
+
+    group.visititems(visit)
+    return weights
+
+
+def export(model_path: str, scaler_path: str, out_path: str) -> Dict[str, Any]:
+    """
+    Write the LSTM and Dense weights of a Keras ``.h5`` model, plus the
+    fitted MinMaxScaler, to ``out_path``. Needs h5py and joblib, not
+    TensorFlow; only the export step reads the ``.h5``.
+    """
+    import h5py
+    import joblib
+
+    with h5py.File(model_path, "r") as f:
+        config = f.attrs["model_config"]
+        config = json.loads(config.decode() if isinstance(config, bytes) else config)
+        layers = {
+            layer["class_name"]: layer["config"] for layer in config["config"]["layers"]
+        }
+        lstm, dense = layers.get("LSTM"), layers.get("Dense")
+        if lstm is None or dense is None:
+            raise ValueError("Expected a Sequential LSTM + Dense model")
+        if (lstm["activation"], lstm["recurrent_activation"]) != ("tanh", "sigmoid"):
+            raise ValueError("Only tanh/sigmoid LSTM activations are supported")
+        if dense.get("activation", "linear") != "linear":
+            raise ValueError("Only a linear Dense output is supported")
+        lstm_weights = _layer_weights(f["model_weights"][lstm["name"]])
+        dense_weights = _layer_weights(f["model_weights"][dense["name"]])
+
+    scaler = joblib.load(scaler_path)
+    arrays = {
+        "lstm_kernel": lstm_weights["kernel"],
+        "lstm_recurrent_kernel": lstm_weights["recurrent_kernel"],
+        "lstm_bias": lstm_weights["bias"],
+        "dense_kernel": dense_weights["kernel"],
+        "dense_bias": dense_weights["bias"],
+        "scaler_scale": np.asarray(scaler.scale_),
+        "scaler_min": np.asarray(scaler.min_),
+    }
+    np.savez(out_path, **arrays)
+    return {name: list(array.shape) for name, array in arrays.items()}
@@ -0,0 +1,109 @@
+import json
+import os
+import threading
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from utils import model_training
+
+
+class ModelRegistry:
+    """
+    Serves the latest published version of one trainer's models.
+
+    Only the manifest is read up front; each model's artifact is loaded the
+    first time its key is asked for. When training publishes a new version
+    (the ``LATEST`` pointer changes) loaded models are dropped and reloaded
+    from it on demand.
+    """
+
+    def __init__(self, trainer: str = "holt_winters", model_dir: Optional[str] = None):
+        if trainer not in model_training.TRAINERS:
+            raise ValueError(f"Unknown trainer: {trainer}")
+        self.trainer = trainer
+        self.model_dir = model_dir
+        self.version: Optional[str] = None
+        self._manifest: Dict[str, Any] = {}
+        self._models: Dict[str, Any] = {}
+        self._pointer_mtime: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _root(self) -> str:
+        return os.path.join(
+            self.model_dir or model_training.get_model_dir(), self.trainer
+        )
+
+    def _refresh(self) -> None:
+        pointer = os.path.join(self._root(), "LATEST")
+        try:
+            mtime = os.stat(pointer).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._pointer_mtime:
+            return
+        with open(pointer) as f:
+            version = f.read().strip()
+        with open(os.path.join(self._root(), version, "manifest.json")) as f:
+            manifest = json.load(f)
+        self.version, self._manifest = version, manifest
+        self._models = {}
+        self._pointer_mtime = mtime
+
+    def current_version(self) -> Optional[str]:
+        """The published version being served, or None before any training."""
+        with self._lock:
+            self._refresh()
+            return self.version
+
+    def model_key(self, product_id: Any) -> Optional[str]:
+        """
+        Key of the model serving ``product_id``: the product itself when
+        models were trained per product, else the group training recorded
+        for it (e.g. its category), or None.
+        """
+        with self._lock:
+            self._refresh()
+            if self._manifest.get("group_by") == "product":
+                return str(product_id)
+            return self._manifest.get("groups", {}).get(str(product_id))
+
+    def metadata(self, key: Any) -> Optional[Dict[str, Any]]:
+        """Training metadata of the model for ``key``, or None."""
+        with self._lock:
+            self._refresh()
+            return self._manifest.get("models", {}).get(str(key))
+
+    def get(self, key: Any) -> Any:
+        """The trained model for ``key``, loading it on first use, or None."""
+        key = str(key)
+        with self._lock:
+            self._refresh()
+            if key in self._models:
+                return self._models[key]
+            meta = self._manifest.get("models", {}).get(key)
+            if meta is None or meta.get("status") != "trained":
+                return None
+            load = model_training.TRAINERS[self.trainer][3]
+            model = load(os.path.join(self._root(), self.version, meta["artifact"]))
+            self._models[key] = model
+            return model
+
+    def forecast(self, key: Any, history, days_ahead: int) -> Optional[np.ndarray]:
+        """Forecast ``history`` with the model trained for ``key``, or None."""
+        model = self.get(key)
+        if model is None:
+            return None
+        forecast = model_training.TRAINERS[self.trainer][1]
+        return forecast(model, np.asarray(history, dtype=float), days_ahead)
+
+
+_registries: Dict[str, ModelRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry(trainer: str = "holt_winters") -> ModelRegistry:
+    with _registries_lock:
+        if trainer not in _registries:
+            _registries[trainer] = ModelRegistry(trainer)
+        return _registries[trainer]
@@ -0,0 +1,287 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils import holt_winters, lstm_inference, sales_rollup
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "data", "forecast_models")
+)
+GROUPINGS = ("product", "store", "category")
+# 0 uses every CPU
+MAX_WORKERS = int(os.getenv("FORECAST_TRAINING_WORKERS", "0"))
+# Trailing days held out to measure each model's error
+VALIDATION_DAYS = 14
+LSTM_WINDOW = 10
+LSTM_UNITS = 50
+LSTM_EPOCHS = 30
+
+
+def get_model_dir() -> str:
+    return os.getenv("FORECAST_MODEL_DIR", DEFAULT_MODEL_DIR)
+
+
+def rmse(actual, predicted) -> float:
+    actual, predicted = np.asarray(actual, float), np.asarray(predicted, float)
+    return float(np.sqrt(np.mean((actual - predicted) ** 2)))
+
+
+def mape(actual, predicted) -> Optional[float]:
+    """Mean absolute percentage error over days with sales, or None."""
+    actual, predicted = np.asarray(actual, float), np.asarray(predicted, float)
+    sold = actual != 0
+    if not sold.any():
+        return None
+    return float(np.mean(np.abs((actual[sold] - predicted[sold]) / actual[sold])))
+
+
+def _fit_holt_winters(series: np.ndarray) -> Dict[str, Any]:
+    return holt_winters.fit(series)[0]
+
+
+def _forecast_holt_winters(
+    model: Dict[str, Any], history: np.ndarray, days_ahead: int
+) -> np.ndarray:
+    return holt_winters.forecast(history, [model], days_ahead)[0][0]
+
+
+def _save_holt_winters(model: Dict[str, Any], path: str) -> str:
+    path += ".json"
+    with open(path, "w") as f:
+        json.dump(model, f)
+    return path
+
+
+def _load_holt_winters(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def _fit_lstm(series: np.ndarray):
+    # TensorFlow is only needed to train; serving uses lstm_inference
+    import tensorflow as tf
+
+    tf.config.threading.set_intra_op_parallelism_threads(1)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    low, high = float(series.min()), float(series.max())
+    scale = 1 / (high - low) if high > low else 1.0
+    scaler = lstm_inference.MinMaxScalerParams([scale], [-low * scale])
+    scaled = scaler.transform(series)
+    windows = np.lib.stride_tricks.sliding_window_view(scaled, LSTM_WINDOW + 1)
+    x, y = windows[:, :-1, None], windows[:, -1]
+
+    keras_model = tf.keras.Sequential(
+        [
+            tf.keras.Input((LSTM_WINDOW, 1)),
+            tf.keras.layers.LSTM(LSTM_UNITS),
+            tf.keras.layers.Dense(1),
+        ]
+    )
+    keras_model.compile(optimizer="adam", loss="mean_squared_error")
+    keras_model.fit(x, y, epochs=LSTM_EPOCHS, batch_size=8, verbose=0)
+    return lstm_inference.NumpyLSTM(*keras_model.get_weights()), scaler
+
+
+def lstm_forecast(model, history: np.ndarray, days_ahead: int) -> np.ndarray:
+    network, scaler = model
+    window = list(scaler.transform(history[-LSTM_WINDOW:]))
+    predicted = []
+    for _ in range(days_ahead):
+        value = float(network.predict(np.array([window[-LSTM_WINDOW:]]))[0, 0])
+        predicted.append(value)
+        window.append(value)
+    return np.maximum(scaler.inverse_transform(np.array(predicted)), 0)
+
+
+def _save_lstm(model, path: str) -> str:
+    network, scaler = model
+    path += ".npz"
+    np.savez(
+        path,
+        lstm_kernel=network.kernel,
+        lstm_recurrent_kernel=network.recurrent_kernel,
+        lstm_bias=network.bias,
+        dense_kernel=network.dense_kernel,
+        dense_bias=network.dense_bias,
+        scaler_scale=scaler.scale_,
+        scaler_min=scaler.min_,
+    )
+    return path
+
+
+# name -> (fit, forecast, save, load, minimum training days)
+TRAINERS: Dict[str, Tuple[Callable, Callable, Callable, Callable, int]] = {
+    "holt_winters": (
+        _fit_holt_winters,
+        _forecast_holt_winters,
+        _save_holt_winters,
+        _load_holt_winters,
+        2 * holt_winters.SEASON,
+    ),
+    "lstm": (_fit_lstm, lstm_forecast, _save_lstm, lstm_inference.load, 30),
+}
+
+
+def artifact_name(key: str) -> str:
+    """Filesystem-safe, collision-free file stem for a model key."""
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:8]
+    return f"{re.sub(r'[^A-Za-z0-9_.-]', '_', key)[:64]}-{digest}"
+
+
+def train_one(
+    key: str, series: Sequence[float], trainer: str, out_dir: str
+) -> Dict[str, Any]:
+    """
+    Fit one model on all but the last ``VALIDATION_DAYS`` days, score it on
+    them, refit on the full series and save the artifact. Returns its
+    metadata; failures are reported in the metadata rather than raised.
+    """
+    fit, forecast, save, _, min_days = TRAINERS[trainer]
+    values = np.asarray(series, dtype=float)
+    meta: Dict[str, Any] = {
+        "key": key,
+        "trainer": trainer,
+        "observations": len(values),
+    }
+    started = time.perf_counter()
+    try:
+        if len(values) < min_days + VALIDATION_DAYS:
+            raise ValueError(
+                f"needs at least {min_days + VALIDATION_DAYS} days, has {len(values)}"
+            )
+        train, holdout = values[:-VALIDATION_DAYS], values[-VALIDATION_DAYS:]
+        predicted = forecast(fit(train), train, VALIDATION_DAYS)
+        meta["validation"] = {
+            "days": VALIDATION_DAYS,
+            "rmse": rmse(holdout, predicted),
+            "mape": mape(holdout, predicted),
+        }
+        path = save(fit(values), os.path.join(out_dir, artifact_name(key)))
+        meta["artifact"] = os.path.basename(path)
+        meta["status"] = "trained"
+    except Exception as e:
+        meta["status"] = "failed"
+        meta["error"] = str(e)
+    meta["train_seconds"] = round(time.perf_counter() - started, 4)
+    return meta
+
+
+def train_models(
+    series_by_key: Dict[str, Sequence[float]],
+    trainer: str = "holt_winters",
+    group_by: str = "product",
+    workers: Optional[int] = None,
+    model_dir: Optional[str] = None,
+    groups: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Train one model per key across a process pool and publish them as a new
+    version: artifacts and ``manifest.json`` go into
+    ``<model_dir>/<trainer>/<version>/``, then the ``LATEST`` pointer is
+    swapped so servers only ever see complete versions. ``groups`` maps
+    product ids to their key (e.g. category) so products can be served by
+    their group's model.
+    """
+    if trainer not in TRAINERS:
+        raise ValueError(f"trainer must be one of {', '.join(TRAINERS)}")
+    version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    root = os.path.join(model_dir or get_model_dir(), trainer)
+    out_dir = os.path.join(root, version)
+    os.makedirs(out_dir, exist_ok=True)
+
+    keys = list(series_by_key)
+    workers = min(workers or MAX_WORKERS or os.cpu_count() or 1, max(len(keys), 1))
+    started = time.perf_counter()
+    if workers <= 1:
+        models = [train_one(key, series_by_key[key], trainer, out_dir) for key in keys]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            models = list(
+                pool.map(
+                    train_one,
+                    keys,
+                    [series_by_key[key] for key in keys],
+                    [trainer] * len(keys),
+                    [out_dir] * len(keys),
+                    chunksize=max(1, len(keys) // (workers * 4)),
+                )
+            )
+
+    manifest = {
+        "version": version,
+        "trainer": trainer,
+        "group_by": group_by,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "workers": workers,
+        "total_seconds": round(time.perf_counter() - started, 4),
+        "trained": sum(m["status"] == "trained" for m in models),
+        "failed": sum(m["status"] == "failed" for m in models),
+        "models": {m["key"]: m for m in models},
+        "groups": {
+            str(product_id): str(group)
+            for product_id, group in (groups or {}).items()
+            if group is not None
+        },
+    }
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    latest = os.path.join(root, "LATEST")
+    with open(latest + ".tmp", "w") as f:
+        f.write(version)
+    os.replace(latest + ".tmp", latest)
+    logger.info(
+        f"Trained {manifest['trained']} {trainer} models "
+        f"({manifest['failed']} failed) in {manifest['total_seconds']}s"
+    )
+    return manifest
+
+
+def group_series(
+    series_by_product: Dict[str, List[float]], group_of: Dict[str, Any]
+) -> Dict[str, List[float]]:
+    """Sum product series into groups, e.g. categories; unmapped products are skipped."""
+    grouped: Dict[str, np.ndarray] = {}
+    for product_id, series in series_by_product.items():
+        group = group_of.get(product_id)
+        if group is None:
+            continue
+        values = np.asarray(series, dtype=float)
+        key = str(group)
+        grouped[key] = grouped[key] + values if key in grouped else values
+    return {key: values.tolist() for key, values in grouped.items()}
+
+
+def category_of(products: Optional[Sequence[Dict[str, Any]]]) -> Dict[str, Any]:
+    """Category of every product, by product id."""
+    return {str(p.get("id")): p.get("category") for p in products or []}
+
+
+def load_series(
+    group_by: str,
+    days: int = 365,
+    products: Optional[Sequence[Dict[str, Any]]] = None,
+    end=None,
+) -> Dict[str, List[float]]:
+    """
+    Daily sales series per product, store or category from the rollup.
+    Categories need the product documents to map products to them.
+    """
+    if group_by not in GROUPINGS:
+        raise ValueError(f"group_by must be one of {', '.join(GROUPINGS)}")
+    if group_by == "store":
+        return sales_rollup.grouped_history("store_id", days, end)
+    by_product = sales_rollup.grouped_history("product_id", days, end)
+    if group_by == "product":
+        return by_product
+    return group_series(by_product, category_of(products))
@@ -0,0 +1,111 @@
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+
+def _number(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _encode(values: Iterable[Any], table: Dict[Any, int]) -> np.ndarray:
+    codes = []
+    for value in values:
+        try:
+            codes.append(table.setdefault(value, len(table)))
+        except TypeError:  # unhashable values never match a preference
+            codes.append(-1)
+    return np.array(codes, dtype=np.int64)
+
+
+class ProductCatalog:
+    """
+    Column-oriented view of a product list.
+
+    Numeric fields are float arrays (missing values read as 0, unparseable
+    ones as NaN so they fail every comparison) and categorical fields are
+    integer codes, so scoring the whole catalogue is a few array operations.
+    The product dicts are kept as-is and only copied for selected rows.
+    """
+
+    NUMERIC = ("price", "rating", "review_count")
+    CODED = ("id", "category", "brand")
+
+    def __init__(self, products: Iterable[Dict[str, Any]]):
+        self.products: List[Dict[str, Any]] = list(products)
+        self.price = self._numeric("price")
+        self.rating = self._numeric("rating")
+        self.review_count = self._numeric("review_count")
+        self.codes: Dict[str, Dict[Any, int]] = {field: {} for field in self.CODED}
+        self.id = self._coded("id")
+        self.category = self._coded("category")
+        self.brand = self._coded("brand")
+        self._first_row: Optional[Dict[int, int]] = None
+
+    def _numeric(self, field: str) -> np.ndarray:
+        return np.fromiter(
+            (_number(p.get(field, 0)) for p in self.products), float, len(self.products)
+        )
+
+    def _coded(self, field: str) -> np.ndarray:
+        return _encode((p.get(field) for p in self.products), self.codes[field])
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def row_of(self, product_id: Any) -> Optional[int]:
+        """First catalogue row holding ``product_id``, or None."""
+        try:
+            code = self.codes["id"].get(product_id)
+        except TypeError:
+            return None
+        if code is None:
+            return None
+        if self._first_row is None:
+            codes, rows = np.unique(self.id, return_index=True)
+            self._first_row = dict(zip(codes.tolist(), rows.tolist()))
+        return self._first_row.get(code)
+
+    def isin(self, field: str, values: Optional[Iterable[Any]]) -> np.ndarray:
+        """Mask of rows whose ``field`` equals one of ``values``."""
+        table = self.codes[field]
+        wanted = []
+        for value in values or ():
+            try:
+                if value in table:
+                    wanted.append(table[value])
+            except TypeError:
+                continue
+        return np.isin(getattr(self, field), wanted)
+
+    def top_k(
+        self, scores: np.ndarray, k: int, mask: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Rows of the ``k`` highest scores, best first. Ties keep catalogue
+        order, matching a stable sort of the full list.
+        """
+        rows = np.arange(len(scores)) if mask is None else np.flatnonzero(mask)
+        if len(rows) > k > 0:
+            values = scores[rows]
+            cutoff = np.partition(values, len(values) - k)[len(values) - k]
+            above = rows[values > cutoff]
+            tied = rows[values == cutoff][: k - len(above)]
+            rows = np.concatenate([above, tied])
+        elif k <= 0:
+            rows = rows[:0]
+        return rows[np.lexsort((rows, -scores[rows]))]
+
+    def materialize(
+        self, rows: Iterable[int], **columns: np.ndarray
+    ) -> List[Dict[str, Any]]:
+        """Copies of the products at ``rows`` with extra per-row fields."""
+        results = []
+        for row in rows:
+            product = self.products[row].copy()
+            for field, values in columns.items():
+                product[field] = values[row].item()
+            results.append(product)
+        return results
@@ -0,0 +1,368 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import joblib
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_PATH = os.path.abspath(
+    os.path.join(
+        os.path.dirname(__file__), "..", "..", "data", "product_similarity.joblib"
+    )
+)
+TOP_N = int(os.getenv("PRODUCT_SIMILARITY_TOP_N", "50"))
+# Rows scored per block, bounding memory to CHUNK x category size
+CHUNK = 512
+# Product edits arriving within this window are folded into one index rewrite
+REFRESH_DEBOUNCE = int(os.getenv("PRODUCT_SIMILARITY_DEBOUNCE_MS", "500")) / 1000
+
+# Same weights as AIEngine._calculate_product_similarity
+PRICE_WEIGHT = 0.3
+BRAND_WEIGHT = 0.2
+RATING_WEIGHT = 0.2
+TEXT_WEIGHT = 0.3
+
+
+def _get_index_path() -> str:
+    return os.getenv("PRODUCT_SIMILARITY_PATH", DEFAULT_INDEX_PATH)
+
+
+def _product_text(product: Dict[str, Any]) -> str:
+    return f"{product.get('name', '')} {product.get('description', '')}"
+
+
+def _number(value: Any) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class ProductSimilarityIndex:
+    """
+    Top-N most similar products per product, within its category.
+
+    Similarity mixes TF-IDF cosine of name + description with price, brand
+    and rating closeness. Lookups are dictionary reads; ``update`` and
+    ``remove`` rescore only the touched category rows.
+    """
+
+    def __init__(self, top_n: int = TOP_N):
+        self.top_n = top_n
+        self.vectorizer: Optional[TfidfVectorizer] = None
+        self.ids: List[str] = []
+        self.pos: Dict[str, int] = {}
+        self.tfidf = sp.csr_matrix((0, 0))
+        self.price = np.zeros(0)
+        self.rating = np.zeros(0)
+        self.brand = np.zeros(0, dtype=np.int64)
+        self.category = np.zeros(0, dtype=np.int64)
+        self.active = np.zeros(0, dtype=bool)
+        self.codes: Dict[str, Dict[Any, int]] = {"brand": {}, "category": {}}
+        self.neighbors: Dict[str, List[Tuple[str, float]]] = {}
+
+    def __len__(self) -> int:
+        return int(self.active.sum())
+
+    def _code(self, field: str, value: Any) -> int:
+        table = self.codes[field]
+        return table.setdefault(value, len(table))
+
+    def _features(self, products: List[Dict[str, Any]]):
+        return (
+            np.array([_number(p.get("price")) for p in products]),
+            np.array([_number(p.get("rating")) for p in products]),
+            np.array([self._code("brand", p.get("brand")) for p in products]),
+            np.array([self._code("category", p.get("category")) for p in products]),
+        )
+
+    @classmethod
+    def build(
+        cls, products: List[Dict[str, Any]], top_n: int = TOP_N
+    ) -> "ProductSimilarityIndex":
+        index = cls(top_n)
+        products = [p for p in products if p.get("id") is not None]
+        index.vectorizer = TfidfVectorizer(stop_words="english", sublinear_tf=True)
+        if products:
+            index.tfidf = index.vectorizer.fit_transform(
+                [_product_text(p) for p in products]
+            ).tocsr()
+        index.ids = [p["id"] for p in products]
+        index.pos = {pid: i for i, pid in enumerate(index.ids)}
+        index.price, index.rating, index.brand, index.category = index._features(
+            products
+        )
+        index.active = np.ones(len(products), dtype=bool)
+        for code in np.unique(index.category):
+            rows = index._members(code)
+            index._rescore(rows, rows)
+        return index
+
+    def _members(self, category_code: int) -> np.ndarray:
+        return np.flatnonzero((self.category == category_code) & self.active)
+
+    def scores(self, rows: np.ndarray, others: np.ndarray) -> np.ndarray:
+        """Similarity of each product in ``rows`` to each in ``others``."""
+        text = (self.tfidf[rows] @ self.tfidf[others].T).toarray()
+
+        p1, p2 = self.price[rows][:, None], self.price[others][None, :]
+        priced = (p1 > 0) & (p2 > 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            diff = np.abs(p1 - p2) / np.maximum(p1, p2)
+        price = np.where(priced, 1 - np.minimum(diff, 1), 0.0)
+
+        r1, r2 = self.rating[rows][:, None], self.rating[others][None, :]
+        rated = (r1 > 0) & (r2 > 0)
+        rating = np.where(rated, 1 - np.abs(r1 - r2) / 5.0, 0.0)
+
+        brand = self.brand[rows][:, None] == self.brand[others][None, :]
+        total = (
+            PRICE_WEIGHT * price
+            + BRAND_WEIGHT * brand
+            + RATING_WEIGHT * rating
+            + TEXT_WEIGHT * text
+        )
+        return np.minimum(total, 1.0)
+
+    def _rescore(self, rows: np.ndarray, candidates: np.ndarray) -> None:
+        """Recompute the neighbour lists of ``rows`` against ``candidates``."""
+        k = min(self.top_n, len(candidates) - 1)
+        for start in range(0, len(rows), CHUNK):
+            block = rows[start : start + CHUNK]
+            scores = self.scores(block, candidates)
+            scores[block[:, None] == candidates[None, :]] = -np.inf
+            for i, row in enumerate(block):
+                if k <= 0:
+                    self.neighbors[self.ids[row]] = []
+                    continue
+                top = np.argpartition(-scores[i], k - 1)[:k]
+                top = top[np.argsort(-scores[i][top], kind="stable")]
+                self.neighbors[self.ids[row]] = [
+                    (self.ids[candidates[j]], round(float(scores[i][j]), 6))
+                    for j in top
+                ]
+
+    def neighbors_of(self, product_id: str) -> Optional[List[Tuple[str, float]]]:
+        """Precomputed (product id, similarity) list, best first, or None."""
+        return self.neighbors.get(product_id)
+
+    def update(self, products: List[Dict[str, Any]]) -> None:
+        """Add or refresh products, rescoring only the categories they touch."""
+        products = list(
+            {p["id"]: p for p in products if p.get("id") is not None}.values()
+        )
+        if not products or not hasattr(self.vectorizer, "vocabulary_"):
+            return
+        touched = set()
+        for p in products:
+            row = self.pos.get(p["id"])
+            if row is not None:
+                # Superseded rows stay in the arrays but drop out of scoring
+                self.active[row] = False
+                touched.add(int(self.category[row]))
+        price, rating, brand, category = self._features(products)
+        start = len(self.ids)
+        for offset, p in enumerate(products):
+            self.ids.append(p["id"])
+            self.pos[p["id"]] = start + offset
+        tfidf = self.vectorizer.transform([_product_text(p) for p in products])
+        self.tfidf = sp.vstack([self.tfidf, tfidf]).tocsr()
+        self.price = np.concatenate([self.price, price])
+        self.rating = np.concatenate([self.rating, rating])
+        self.brand = np.concatenate([self.brand, brand])
+        self.category = np.concatenate([self.category, category])
+        self.active = np.concatenate([self.active, np.ones(len(products), bool)])
+        touched.update(int(c) for c in category)
+        self._refresh_categories(touched, {p["id"] for p in products})
+
+    def remove(self, product_ids: Iterable[str]) -> None:
+        removed = {pid for pid in product_ids if pid in self.pos}
+        touched = set()
+        for pid in removed:
+            row = self.pos.pop(pid)
+            self.active[row] = False
+            touched.add(int(self.category[row]))
+            self.neighbors.pop(pid, None)
+        self._refresh_categories(touched, removed)
+
+    def _refresh_categories(self, categories: set, changed: set) -> None:
+        for code in categories:
+            members = self._members(code)
+            if not len(members):
+                continue
+            is_changed = np.array([self.ids[r] in changed for r in members])
+            incoming = members[is_changed]
+            # Changed products get full lists; everyone else only needs the
+            # changed products merged in, unless a changed product was already
+            # on their list (its score moved, so something else may now rank)
+            dirty = list(incoming)
+            incoming_scores = self.scores(members, incoming) if len(incoming) else None
+            for i, row in enumerate(members):
+                if is_changed[i]:
+                    continue
+                pid = self.ids[row]
+                current = self.neighbors.get(pid, [])
+                if any(other in changed for other, _ in current):
+                    dirty.append(row)
+                elif incoming_scores is not None:
+                    merged = current + [
+                        (self.ids[c], round(float(score), 6))
+                        for c, score in zip(incoming, incoming_scores[i])
+                    ]
+                    merged.sort(key=lambda item: -item[1])
+                    self.neighbors[pid] = merged[: self.top_n]
+            if dirty:
+                self._rescore(np.array(sorted(dirty), dtype=np.int64), members)
+
+    def compact(self) -> None:
+        """Drop superseded and removed rows so the arrays hold live products only."""
+        if self.active.all():
+            return
+        keep = np.flatnonzero(self.active)
+        self.ids = [self.ids[r] for r in keep]
+        self.pos = {pid: i for i, pid in enumerate(self.ids)}
+        self.tfidf = self.tfidf[keep]
+        self.price = self.price[keep]
+        self.rating = self.rating[keep]
+        self.brand = self.brand[keep]
+        self.category = self.category[keep]
+        self.active = np.ones(len(keep), dtype=bool)
+
+    def save(self, path: Optional[str] = None) -> None:
+        self.compact()
+        path = path or _get_index_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        joblib.dump(self.__dict__, tmp)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "ProductSimilarityIndex":
+        index = cls()
+        index.__dict__.update(joblib.load(path or _get_index_path()))
+        return index
+
+
+_lock = threading.Lock()
+_loaded: Dict[str, Any] = {"path": None, "mtime": None, "index": None}
+
+
+def get_similarity_index() -> Optional[ProductSimilarityIndex]:
+    """Process-wide index, reloaded when the builder rewrites the file."""
+    path = _get_index_path()
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    with _lock:
+        if _loaded["path"] != path or _loaded["mtime"] != mtime:
+            try:
+                _loaded.update(
+                    {
+                        "path": path,
+                        "mtime": mtime,
+                        "index": ProductSimilarityIndex.load(path),
+                    }
+                )
+            except Exception as e:
+                logger.error(f"Could not load product similarity index: {e}")
+                return None
+        return _loaded["index"]
+
+
+def rebuild_similarity_index(
+    products: List[Dict[str, Any]],
+) -> ProductSimilarityIndex:
+    index = ProductSimilarityIndex.build(products)
+    with _lock:
+        index.save()
+    return index
+
+
+def refresh_similarity_index(
+    products: Iterable[Dict[str, Any]] = (), removed_ids: Iterable[str] = ()
+) -> bool:
+    """Apply product changes to the persisted index, if one has been built."""
+    index = get_similarity_index()
+    if index is None:
+        return False
+    with _lock:
+        index.update(list(products))
+        index.remove(removed_ids)
+        index.save()
+        _loaded["mtime"] = os.stat(_get_index_path()).st_mtime_ns
+    return True
+
+
+class _RefreshQueue:
+    """
+    Coalesces product changes from request threads and applies them from a
+    single background thread, ``debounce`` seconds after the first change,
+    so a burst of edits costs one index rewrite.
+    """
+
+    def __init__(self, debounce: float = REFRESH_DEBOUNCE):
+        self.debounce = debounce
+        self._products: Dict[str, Dict[str, Any]] = {}
+        self._removed: set = set()
+        self._busy = False
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(
+        self, products: Iterable[Dict[str, Any]] = (), removed_ids: Iterable[str] = ()
+    ) -> None:
+        with self._cond:
+            for p in products:
+                if p.get("id") is not None:
+                    self._products[p["id"]] = p
+                    self._removed.discard(p["id"])
+            for pid in removed_ids:
+                self._products.pop(pid, None)
+                self._removed.add(pid)
+            # Started lazily so forked server workers each get their own thread
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every submitted change has been applied."""
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: not (self._products or self._removed or self._busy), timeout
+            )
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._products or self._removed)
+            time.sleep(self.debounce)
+            with self._cond:
+                products, removed = list(self._products.values()), self._removed
+                self._products, self._removed = {}, set()
+                self._busy = True
+            try:
+                refresh_similarity_index(products, removed)
+            except Exception as e:
+                logger.error(f"Error refreshing product similarity index: {str(e)}")
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+
+refresh_queue = _RefreshQueue()
+
+
+def queue_similarity_refresh(
+    products: Iterable[Dict[str, Any]] = (), removed_ids: Iterable[str] = ()
+) -> None:
+    """Fold product changes into the substitute index off the request path."""
+    refresh_queue.submit(products, removed_ids)
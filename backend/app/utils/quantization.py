@@ -0,0 +1,306 @@
+import os
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+QUANTIZATION_TYPES = ("none", "int8", "pq")
+
+# Cap on vectors used to train PQ codebooks; beyond this k-means gains nothing
+MAX_TRAINING_VECTORS = 20000
+# Retrain quantizer codebooks once this share of rows changed since training
+RETRAIN_FRACTION = 0.5
+
+
+def default_index_config() -> Dict[str, Any]:
+    """Index config used when a store has not been configured explicitly."""
+    return {
+        "quantization": os.getenv("VECTOR_QUANTIZATION", "none").lower(),
+        "pq_subvectors": int(os.getenv("VECTOR_PQ_SUBVECTORS", "0")) or None,
+        "rerank": int(os.getenv("VECTOR_RERANK", "0")),
+    }
+
+
+def normalize_config(config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    merged = default_index_config()
+    merged.update({k: v for k, v in (config or {}).items() if v is not None})
+    if merged["quantization"] not in QUANTIZATION_TYPES:
+        raise ValueError(f"Unknown quantization type: {merged['quantization']}")
+    merged["rerank"] = max(0, int(merged.get("rerank") or 0))
+    return merged
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize rows so inner product equals cosine similarity."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0.0] = 1.0
+    return vectors / norms
+
+
+class ScalarQuantizer:
+    """Per-dimension int8 quantization (4x smaller than float32)."""
+
+    kind = "int8"
+
+    def __init__(self):
+        self.offset: Optional[np.ndarray] = None
+        self.scale: Optional[np.ndarray] = None
+
+    @property
+    def dim(self) -> int:
+        return 0 if self.offset is None else len(self.offset)
+
+    def fit(self, vectors: np.ndarray) -> "ScalarQuantizer":
+        lo = vectors.min(axis=0)
+        hi = vectors.max(axis=0)
+        scale = (hi - lo) / 255.0
+        scale[scale == 0.0] = 1.0
+        self.offset = lo.astype(np.float32)
+        self.scale = scale.astype(np.float32)
+        return self
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        steps = np.rint((vectors - self.offset) / self.scale)
+        return (np.clip(steps, 0, 255) - 128).astype(np.int8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return (codes.astype(np.float32) + 128.0) * self.scale + self.offset
+
+    def score(self, query: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """Asymmetric inner product: float query against int8 codes."""
+        weights = query * self.scale
+        bias = float(query @ self.offset) + 128.0 * float(weights.sum())
+        return codes.astype(np.float32) @ weights + bias
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"offset": self.offset, "scale": self.scale}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, np.ndarray]) -> "ScalarQuantizer":
+        sq = cls()
+        sq.offset = np.asarray(state["offset"], dtype=np.float32)
+        sq.scale = np.asarray(state["scale"], dtype=np.float32)
+        return sq
+
+
+class ProductQuantizer:
+    """
+    Product quantization: split each vector into ``subvectors`` chunks and
+    store the id of the nearest of 256 k-means centroids per chunk (1 byte).
+    """
+
+    kind = "pq"
+
+    def __init__(self, subvectors: int, centroids: int = 256, iterations: int = 20):
+        self.subvectors = subvectors
+        self.centroids = min(centroids, 256)
+        self.iterations = iterations
+        self.dim = 0
+        self.codebooks: Optional[np.ndarray] = None  # (m, k, dsub)
+
+    def _split(self, vectors: np.ndarray) -> np.ndarray:
+        n = vectors.shape[0]
+        padded_dim = self.subvectors * self._dsub
+        if vectors.shape[1] < padded_dim:
+            pad = np.zeros((n, padded_dim - vectors.shape[1]), dtype=np.float32)
+            vectors = np.hstack([vectors, pad])
+        return vectors.reshape(n, self.subvectors, self._dsub)
+
+    @property
+    def _dsub(self) -> int:
+        return -(-self.dim // self.subvectors)
+
+    def fit(self, vectors: np.ndarray, seed: int = 0) -> "ProductQuantizer":
+        rng = np.random.default_rng(seed)
+        self.dim = vectors.shape[1]
+        if len(vectors) > MAX_TRAINING_VECTORS:
+            sample = rng.choice(len(vectors), MAX_TRAINING_VECTORS, replace=False)
+            vectors = vectors[sample]
+        chunks = self._split(vectors)
+        k = min(self.centroids, len(vectors))
+        codebooks = np.zeros(
+            (self.subvectors, self.centroids, self._dsub), dtype=np.float32
+        )
+        for j in range(self.subvectors):
+            codebooks[j, :k] = _kmeans(chunks[:, j, :], k, self.iterations, rng)
+            # Unused slots repeat the first centroid so codes never point at zeros
+            codebooks[j, k:] = codebooks[j, 0]
+        self.codebooks = codebooks
+        return self
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        chunks = self._split(vectors)
+        codes = np.empty((len(vectors), self.subvectors), dtype=np.uint8)
+        for j in range(self.subvectors):
+            codes[:, j] = _nearest(chunks[:, j, :], self.codebooks[j])
+        return codes
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        parts = self.codebooks[np.arange(self.subvectors), codes]  # (n, m, dsub)
+        return parts.reshape(len(codes), -1)[:, : self.dim]
+
+    def score(self, query: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """Asymmetric distance computation via a per-query lookup table."""
+        q_chunks = self._split(query.reshape(1, -1))[0]  # (m, dsub)
+        table = np.einsum("mkd,md->mk", self.codebooks, q_chunks)
+        return table[np.arange(self.subvectors), codes].sum(axis=1)
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {
+            "codebooks": self.codebooks,
+            "params": np.array(
+                [self.subvectors, self.centroids, self.iterations, self.dim]
+            ),
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, np.ndarray]) -> "ProductQuantizer":
+        subvectors, centroids, iterations, dim = (int(x) for x in state["params"])
+        pq = cls(subvectors, centroids, iterations)
+        pq.dim = dim
+        pq.codebooks = np.asarray(state["codebooks"], dtype=np.float32)
+        return pq
+
+
+def _nearest(points: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    dists = (centers * centers).sum(axis=1)[None, :] - 2.0 * points @ centers.T
+    return dists.argmin(axis=1)
+
+
+def _kmeans(
+    points: np.ndarray, k: int, iterations: int, rng: np.random.Generator
+) -> np.ndarray:
+    centers = points[rng.choice(len(points), k, replace=False)].copy()
+    for _ in range(iterations):
+        labels = _nearest(points, centers)
+        counts = np.bincount(labels, minlength=k).astype(np.float32)
+        sums = np.stack(
+            [
+                np.bincount(labels, weights=points[:, d], minlength=k)
+                for d in range(points.shape[1])
+            ],
+            axis=1,
+        )
+        filled = counts > 0
+        centers[filled] = sums[filled] / counts[filled, None]
+    return centers
+
+
+class QuantizedIndex:
+    """Compressed, scan-only view of a vector store used for candidate search."""
+
+    def __init__(self, quantizer, codes: np.ndarray, config: Dict[str, Any]):
+        self.quantizer = quantizer
+        self.codes = codes
+        self.config = config
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, config: Dict[str, Any]) -> "QuantizedIndex":
+        vectors = normalize_rows(vectors)
+        quantizer: Union[ScalarQuantizer, ProductQuantizer]
+        if config["quantization"] == "int8":
+            quantizer = ScalarQuantizer().fit(vectors)
+        else:
+            dim = vectors.shape[1]
+            subvectors = config.get("pq_subvectors") or max(1, dim // 8)
+            quantizer = ProductQuantizer(
+                subvectors, centroids=int(config.get("pq_centroids", 256))
+            ).fit(vectors)
+        return cls(quantizer, quantizer.encode(vectors), config)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def matches(self, config: Dict[str, Any]) -> bool:
+        """True if the quantizer was trained with the kind and shape ``config`` asks for."""
+        if self.quantizer.kind != config["quantization"]:
+            return False
+        if self.quantizer.kind == "pq":
+            subvectors = config.get("pq_subvectors") or max(1, self.quantizer.dim // 8)
+            centroids = min(int(config.get("pq_centroids", 256)), 256)
+            return (self.quantizer.subvectors, self.quantizer.centroids) == (
+                subvectors,
+                centroids,
+            )
+        return True
+
+    def scores(
+        self, query: List[float], rows: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        q = normalize_rows(np.asarray(query, dtype=np.float32).reshape(1, -1))[0]
+        return self.quantizer.score(q, self.codes if rows is None else self.codes[rows])
+
+    def search(
+        self,
+        query: List[float],
+        top_k: int,
+        mask: Optional[np.ndarray] = None,
+        rows: Optional[np.ndarray] = None,
+    ) -> List[Tuple[int, float]]:
+        """
+        Return (row, approximate score) for the best ``top_k`` rows.
+        ``rows`` restricts scoring to a partition, so cost scales with its size.
+        """
+        scores = self.scores(query, rows)
+        if mask is not None:
+            scores = np.where(mask, scores, -np.inf)
+        k = min(top_k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        ids = top if rows is None else rows[top]
+        return [
+            (int(i), float(scores[t]))
+            for i, t in zip(ids, top)
+            if np.isfinite(scores[t])
+        ]
+
+    def memory_report(self) -> Dict[str, Any]:
+        n = len(self.codes)
+        raw_bytes = n * self.quantizer.dim * 4
+        code_bytes = int(self.codes.nbytes)
+        aux_bytes = int(sum(v.nbytes for v in self.quantizer.state().values()))
+        return {
+            "vectors": n,
+            "float32_bytes": raw_bytes,
+            "code_bytes": code_bytes,
+            "codebook_bytes": aux_bytes,
+            "compression": round(raw_bytes / max(code_bytes, 1), 2),
+        }
+
+    def save(self, path: str, **extra: Any) -> None:
+        tmp = path + ".tmp.npz"
+        np.savez(
+            tmp,
+            kind=np.array(self.quantizer.kind),
+            codes=self.codes,
+            **{f"q_{k}": v for k, v in self.quantizer.state().items()},
+            **{f"x_{k}": np.array(v) for k, v in extra.items()},
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(
+        cls, path: str, config: Dict[str, Any]
+    ) -> Tuple["QuantizedIndex", Dict[str, Any]]:
+        with np.load(path, allow_pickle=False) as data:
+            kind = str(data["kind"])
+            state = {k[2:]: data[k] for k in data.files if k.startswith("q_")}
+            extra = {k[2:]: data[k].item() for k in data.files if k.startswith("x_")}
+            codes = data["codes"]
+        quantizer_cls = ScalarQuantizer if kind == "int8" else ProductQuantizer
+        return cls(quantizer_cls.from_state(state), codes, config), extra
+
+
+def rerank_exact(
+    query: List[float], candidates: List[Tuple[int, float]], vectors: List[List[float]]
+) -> List[Tuple[int, float]]:
+    """Re-score candidates with exact cosine similarity against full vectors."""
+    if not candidates:
+        return []
+    q = normalize_rows(np.asarray(query, dtype=np.float32).reshape(1, -1))[0]
+    exact = normalize_rows(np.asarray(vectors, dtype=np.float32)) @ q
+    rescored = [(row, float(s)) for (row, _), s in zip(candidates, exact)]
+    rescored.sort(key=lambda x: x[1], reverse=True)
+    return rescored
@@ -0,0 +1,178 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+# Dependency for results that can change with any product, in any category
+ALL = "*"
+
+CACHE_TTL = float(os.getenv("RECOMMENDATION_CACHE_TTL", "300"))
+CACHE_SIZE = int(os.getenv("RECOMMENDATION_CACHE_SIZE", "10000"))
+
+
+def fingerprint(value: Any) -> str:
+    """Stable key for a preference profile or product payload."""
+    encoded = json.dumps(value, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:32]
+
+
+def _dependency(category: Any) -> str:
+    # Vector metadata holds case-folded categories; products keep their own case
+    return str(category).lower()
+
+
+class _Call:
+    """One in-flight computation that identical misses wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class RecommendationCache:
+    """
+    TTL + LRU cache of recommendation results.
+
+    Each entry records the product categories its result was computed from
+    (or ``ALL``); ``invalidate`` drops only the entries depending on the
+    changed categories. Concurrent misses on one key share a single
+    computation. Invalidation is per process, so other workers see the
+    change once their entries expire.
+    """
+
+    def __init__(
+        self,
+        ttl: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl = CACHE_TTL if ttl is None else ttl
+        self.max_entries = max_entries or CACHE_SIZE
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, frozenset, Any]]" = (
+            OrderedDict()
+        )
+        self._by_dependency: Dict[str, set] = {}
+        self._inflight: Dict[Hashable, _Call] = {}
+        # Bumped on every invalidation; results computed across one are not stored
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _drop(self, key: Hashable) -> None:
+        _, dependencies, _ = self._entries.pop(key)
+        for dependency in dependencies:
+            keys = self._by_dependency.get(dependency)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_dependency[dependency]
+
+    def _store(self, key: Hashable, value: Any, dependencies: Iterable[str]) -> None:
+        if key in self._entries:
+            self._drop(key)
+        dependencies = frozenset(map(_dependency, dependencies)) or frozenset([ALL])
+        self._entries[key] = (self._clock() + self.ttl, dependencies, value)
+        for dependency in dependencies:
+            self._by_dependency.setdefault(dependency, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+    def get_or_compute(
+        self,
+        key: Hashable,
+        compute: Callable[[], Tuple[Any, Optional[Iterable[str]]]],
+    ) -> Tuple[Any, bool]:
+        """
+        Cached value for ``key``, or the result of ``compute()``.
+
+        ``compute`` returns ``(value, dependencies)``: the categories the
+        value depends on, or None to leave the value uncached (not-found
+        and error results). Returns ``(value, hit)``.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > self._clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[2], True
+                self._drop(key)
+            call = self._inflight.get(key)
+            owner = call is None
+            if owner:
+                call = self._inflight[key] = _Call()
+                epoch = self._epoch
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        if not owner:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+
+        dependencies = None
+        try:
+            value, dependencies = compute()
+            call.value = value
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+                if call.error is None and dependencies is not None:
+                    if epoch == self._epoch:
+                        self._store(key, call.value, dependencies)
+            call.done.set()
+        return value, False
+
+    def invalidate(self, categories: Iterable[Optional[str]]) -> int:
+        """
+        Drop entries that depend on any of ``categories``, plus entries
+        depending on every product. An unknown (None) category drops all.
+        """
+        with self._lock:
+            self._epoch += 1
+            categories = set(categories)
+            if None in categories:
+                dropped = len(self._entries)
+                self._entries.clear()
+                self._by_dependency.clear()
+                return dropped
+            keys = set(self._by_dependency.get(ALL, ()))
+            for category in categories:
+                keys.update(self._by_dependency.get(_dependency(category), ()))
+            for key in keys:
+                self._drop(key)
+            return len(keys)
+
+    def clear(self) -> None:
+        self.invalidate([None])
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+recommendation_cache = RecommendationCache()
+
+
+def invalidate_products(*products: Optional[Dict[str, Any]]) -> int:
+    """Invalidate cached recommendations touching these products' categories."""
+    return recommendation_cache.invalidate(
+        (product or {}).get("category") for product in products
+    )
@@ -0,0 +1,180 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils import sales_rollup
+from utils.store_sales import date_range
+
+# Firestore accepts at most 30 values in an "in" filter
+IN_QUERY_LIMIT = 30
+CONCURRENCY = int(os.getenv("GEO_INSIGHTS_CONCURRENCY", "8"))
+
+DAYS_PER_YEAR = 365
+
+# Weight of each alert kind in a store's health score
+ISSUE_WEIGHTS = {"out_of_stock": 3, "critical_low": 2, "low_stock": 1, "overstock": 0.5}
+
+
+def health_label(total_issues: float) -> str:
+    if total_issues == 0:
+        return "excellent"
+    elif total_issues <= 2:
+        return "good"
+    elif total_issues <= 5:
+        return "fair"
+    return "poor"
+
+
+def _number(value: Any) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def fetch_for_stores(
+    firebase,
+    collection: str,
+    store_ids: Sequence[str],
+    workers: Optional[int] = None,
+    conditions: Sequence[Tuple[str, str, Any]] = (),
+) -> List[Dict[str, Any]]:
+    """
+    Every document in ``collection`` belonging to one of ``store_ids`` and
+    matching the extra ``conditions``, if any.
+
+    Stores are queried ``IN_QUERY_LIMIT`` at a time, with the queries spread
+    over a bounded thread pool since each one is a remote round trip.
+    """
+    chunks = [
+        list(store_ids[i : i + IN_QUERY_LIMIT])
+        for i in range(0, len(store_ids), IN_QUERY_LIMIT)
+    ]
+    if not chunks:
+        return []
+
+    def query(chunk):
+        if conditions:
+            return firebase.query_where(
+                collection, [("store_id", "in", chunk), *conditions]
+            )
+        return firebase.query_documents(collection, "store_id", "in", chunk)
+
+    workers = max(1, min(workers or CONCURRENCY, len(chunks)))
+    if workers == 1:
+        results = [query(chunk) for chunk in chunks]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(query, chunks))
+    return [doc for docs in results for doc in docs]
+
+
+def _raw_entries(
+    sales: Iterable[Dict[str, Any]], start: str, end: str
+) -> Iterable[Tuple[str, str, str, float]]:
+    for sale in sales:
+        day = sales_rollup.sale_day(sale.get("date"))
+        if day is None or not start <= day <= end:
+            continue
+        yield (
+            str(sale.get("store_id") or ""),
+            str(sale.get("product_id")),
+            day,
+            _number(sale.get("quantity", 0)),
+        )
+
+
+def load_velocities(
+    firebase,
+    store_ids: Sequence[str],
+    days: int = 30,
+    end: Optional[date] = None,
+    collection: str = "sales",
+) -> Dict[Tuple[str, str], float]:
+    """
+    Average units sold per day for every (store, product) pair in the
+    stores, over the last ``days + 1`` days. One rollup query when the
+    rollup is backfilled, otherwise chunked queries for the raw sales in
+    the window.
+    """
+    dates = sales_rollup.window(days, end)
+    entries: Iterable[Tuple[str, str, str, float]]
+    if sales_rollup.is_ready():
+        entries = sales_rollup.stores_rows(store_ids, dates[0], dates[-1])
+    else:
+        sales = fetch_for_stores(
+            firebase, collection, store_ids, conditions=date_range(dates)
+        )
+        entries = _raw_entries(sales, dates[0], dates[-1])
+
+    totals: Dict[Tuple[str, str], float] = {}
+    for store_id, product_id, _, quantity in entries:
+        key = (store_id, product_id)
+        totals[key] = totals.get(key, 0) + quantity
+    return {key: total / len(dates) for key, total in totals.items()}
+
+
+def store_metrics(
+    store_ids: Sequence[str],
+    inventory: Sequence[Dict[str, Any]],
+    velocities: Dict[Tuple[str, str], float],
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Inventory value, stock health and turnover for every store in one pass
+    over the region's inventory, classifying items exactly as
+    ``get_stock_alerts``. Turnover is the cost of the units selling per day,
+    annualised, over the value of the stock on hand.
+    """
+    position = {str(store_id): i for i, store_id in enumerate(store_ids)}
+    items = [
+        (position[str(item.get("store_id"))], item)
+        for item in inventory
+        if str(item.get("store_id")) in position
+    ]
+    store = np.fromiter((i for i, _ in items), np.int64, len(items))
+    stock = np.fromiter(
+        (_number(item.get("current_stock", 0)) for _, item in items), float, len(items)
+    )
+    cost = np.fromiter(
+        (_number(item.get("unit_cost", 0)) for _, item in items), float, len(items)
+    )
+    velocity = np.fromiter(
+        (
+            velocities.get((str(store_ids[i]), str(item.get("product_id"))), 0.0)
+            for i, item in items
+        ),
+        float,
+        len(items),
+    )
+
+    issues = np.select(
+        [
+            stock == 0,
+            stock <= velocity * 3,
+            stock <= velocity * 7,
+            stock > velocity * 60,
+        ],
+        [
+            ISSUE_WEIGHTS["out_of_stock"],
+            ISSUE_WEIGHTS["critical_low"],
+            ISSUE_WEIGHTS["low_stock"],
+            ISSUE_WEIGHTS["overstock"],
+        ],
+        0,
+    )
+    n = len(store_ids)
+    values = np.bincount(store, weights=stock * cost, minlength=n)
+    totals = np.bincount(store, weights=issues, minlength=n)
+    sold = np.bincount(store, weights=velocity * cost, minlength=n) * DAYS_PER_YEAR
+    turnover = np.divide(sold, values, out=np.zeros(n), where=values > 0)
+    return {
+        str(store_id): {
+            "inventory_value": float(values[i]),
+            "turnover_rate": round(float(turnover[i]), 2),
+            "stock_health": health_label(totals[i]),
+        }
+        for i, store_id in enumerate(store_ids)
+    }
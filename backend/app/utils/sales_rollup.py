@@ -0,0 +1,207 @@
+import os
+import sqlite3
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from utils import sqlite_pool
+
+DEFAULT_DB_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "data", "sales_daily.sqlite")
+)
+
+UPSERT_SQL = """
+    INSERT INTO sales_daily (product_id, store_id, date, quantity) VALUES (?, ?, ?, ?)
+    ON CONFLICT(product_id, store_id, date) DO UPDATE SET
+      quantity = quantity + excluded.quantity
+    """
+HISTORY_SQL = """
+    SELECT date, SUM(quantity) FROM sales_daily
+    WHERE product_id = ? AND date BETWEEN ? AND ?
+    GROUP BY date
+    """
+
+
+def _create_schema(conn: sqlite3.Connection) -> None:
+    with conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS sales_daily (
+              product_id TEXT,
+              store_id TEXT, -- '' when the sale has no store
+              date TEXT, -- YYYY-MM-DD
+              quantity REAL,
+              PRIMARY KEY (product_id, store_id, date)
+            );
+            """)
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_sales_daily_store_date "
+            "ON sales_daily(store_id, date)"
+        )
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS rollup_meta (
+              key TEXT PRIMARY KEY,
+              value TEXT
+            );
+            """)
+
+
+_pool = sqlite_pool.SQLitePool("SALES_ROLLUP_DB_PATH", DEFAULT_DB_PATH, _create_schema)
+_connect = _pool.connect
+
+
+def sale_day(value: Any) -> Optional[str]:
+    """Calendar day of a sale's ``date`` (ISO string or datetime), or None."""
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).date().isoformat()
+    except ValueError:
+        return None
+
+
+def _aggregate(sales: Iterable[Dict[str, Any]]) -> List[Tuple[str, str, str, float]]:
+    totals: Dict[Tuple[str, str, str], float] = defaultdict(float)
+    for sale in sales:
+        day = sale_day(sale.get("date"))
+        product_id = sale.get("product_id")
+        if day is None or product_id is None:
+            continue
+        try:
+            quantity = float(sale.get("quantity", 0) or 0)
+        except (TypeError, ValueError):
+            continue
+        totals[str(product_id), str(sale.get("store_id") or ""), day] += quantity
+    return [(*key, quantity) for key, quantity in totals.items()]
+
+
+def record_sales(sales: Iterable[Dict[str, Any]]) -> int:
+    """Add sales to their daily rollup rows. Returns rows touched."""
+    rows = _aggregate(sales)
+    if rows:
+        with _connect() as conn:
+            conn.executemany(UPSERT_SQL, rows)
+    return len(rows)
+
+
+def backfill(sales: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Rebuild every rollup row from the raw sales and mark the rollup ready.
+    Sales recorded while the raw sales are being read may be missing until
+    the next run.
+    """
+    rows = _aggregate(sales)
+    finished = datetime.now(timezone.utc).isoformat()
+    with _connect() as conn:
+        conn.execute("DELETE FROM sales_daily")
+        conn.executemany(UPSERT_SQL, rows)
+        conn.execute(
+            "INSERT OR REPLACE INTO rollup_meta (key, value) VALUES ('backfilled_at', ?)",
+            (finished,),
+        )
+    return {"rows": len(rows), "backfilled_at": finished}
+
+
+def is_ready() -> bool:
+    """True once a backfill has run, so the rollup covers historical sales."""
+    with _connect() as conn:
+        row = conn.execute(
+            "SELECT value FROM rollup_meta WHERE key='backfilled_at'"
+        ).fetchone()
+    return row is not None
+
+
+def window(days: int, end: Optional[date] = None) -> List[str]:
+    """The ``days + 1`` calendar days ending at ``end`` (default today)."""
+    end = end or datetime.now().date()
+    return [(end - timedelta(days=days - i)).isoformat() for i in range(days + 1)]
+
+
+def daily_history(
+    product_id: str, days: int = 90, end: Optional[date] = None
+) -> List[float]:
+    """Units sold per day across all stores, oldest first, zero-filled."""
+    dates = window(days, end)
+    with _connect() as conn:
+        totals = dict(conn.execute(HISTORY_SQL, (str(product_id), dates[0], dates[-1])))
+    return [totals.get(day, 0) for day in dates]
+
+
+def store_rows(store_id: str, start: str, end: str) -> Iterator[Tuple[str, str, float]]:
+    """Stream (product_id, date, quantity) rollup rows for one store and window."""
+    conn = _connect()
+    yield from conn.execute(
+        "SELECT product_id, date, quantity FROM sales_daily "
+        "WHERE store_id = ? AND date BETWEEN ? AND ?",
+        (str(store_id), start, end),
+    )
+
+
+def store_last_sales(store_id: str) -> Dict[str, str]:
+    """Most recent sale day per product in one store."""
+    with _connect() as conn:
+        return dict(
+            conn.execute(
+                "SELECT product_id, MAX(date) FROM sales_daily "
+                "WHERE store_id = ? GROUP BY product_id",
+                (str(store_id),),
+            )
+        )
+
+
+def stores_rows(
+    store_ids: Iterable[str], start: str, end: str
+) -> Iterator[Tuple[str, str, str, float]]:
+    """Stream (store_id, product_id, date, quantity) rows for many stores."""
+    store_ids = [str(store_id) for store_id in store_ids]
+    conn = _connect()
+    for i in range(0, len(store_ids), sqlite_pool.IN_CHUNK):
+        chunk = store_ids[i : i + sqlite_pool.IN_CHUNK]
+        yield from conn.execute(
+            "SELECT store_id, product_id, date, quantity FROM sales_daily "
+            f"WHERE store_id IN ({', '.join('?' * len(chunk))}) "
+            "AND date BETWEEN ? AND ?",
+            (*chunk, start, end),
+        )
+
+
+def grouped_history(
+    group_by: str, days: int = 365, end: Optional[date] = None
+) -> Dict[str, List[float]]:
+    """
+    Units sold per day for every product or store, oldest first,
+    zero-filled, from one grouped query.
+    """
+    if group_by not in ("product_id", "store_id"):
+        raise ValueError("group_by must be product_id or store_id")
+    dates = window(days, end)
+    column = {day: i for i, day in enumerate(dates)}
+    series: Dict[str, List[float]] = {}
+    with _connect() as conn:
+        rows = conn.execute(
+            f"SELECT {group_by}, date, SUM(quantity) FROM sales_daily "
+            f"WHERE date BETWEEN ? AND ? GROUP BY {group_by}, date",
+            (dates[0], dates[-1]),
+        )
+        for key, day, quantity in rows:
+            series.setdefault(key, [0.0] * len(dates))[column[day]] = quantity
+    return series
+
+
+def demand_totals(
+    days: int = 30, end: Optional[date] = None
+) -> Iterator[Tuple[str, str, float, float]]:
+    """
+    Stream (store_id, product_id, sum, sum of squares) of daily quantities
+    over the last ``days + 1`` days, enough for each pair's mean and variance.
+    """
+    dates = window(days, end)
+    conn = _connect()
+    yield from conn.execute(
+        "SELECT store_id, product_id, SUM(quantity), SUM(quantity * quantity) "
+        "FROM sales_daily WHERE date BETWEEN ? AND ? GROUP BY store_id, product_id",
+        (dates[0], dates[-1]),
+    )
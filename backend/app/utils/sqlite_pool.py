@@ -0,0 +1,57 @@
+import os
+import sqlite3
+import threading
+from typing import Callable, Optional
+
+# SQLite's default limit on bound parameters is 999; IN lists are chunked
+# to this size so a query always stays well under it
+IN_CHUNK = 500
+
+
+class SQLitePool:
+    """
+    One long-lived connection per thread and database path, for the small
+    local SQLite stores.
+
+    The database path comes from ``path_env`` (falling back to
+    ``default_path``) on every call, so tests and tools can repoint a store
+    at runtime. Connections use WAL so readers never block the writer, and
+    sqlite3's statement cache means repeated SQL is prepared once per
+    connection. ``create_schema`` runs once per path per process.
+    """
+
+    def __init__(
+        self,
+        path_env: str,
+        default_path: str,
+        create_schema: Callable[[sqlite3.Connection], None],
+    ):
+        self.path_env = path_env
+        self.default_path = default_path
+        self.create_schema = create_schema
+        self._local = threading.local()
+        self._schema_ready: set = set()
+        self._schema_lock = threading.Lock()
+
+    def path(self) -> str:
+        return os.getenv(self.path_env, self.default_path)
+
+    def connect(self, path: Optional[str] = None) -> sqlite3.Connection:
+        """This thread's connection to ``path`` (default: the configured one)."""
+        path = path or self.path()
+        conns = getattr(self._local, "conns", None)
+        if conns is None:
+            conns = self._local.conns = {}
+        conn = conns.get(path)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            conn = sqlite3.connect(path, cached_statements=256)
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute("PRAGMA synchronous=NORMAL;")
+            conns[path] = conn
+        if path not in self._schema_ready:
+            with self._schema_lock:
+                if path not in self._schema_ready:
+                    self.create_schema(conn)
+                    self._schema_ready.add(path)
+        return conn
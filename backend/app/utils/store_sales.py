@@ -0,0 +1,145 @@
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from utils import sales_rollup
+
+NO_SALES = "No sales recorded"
+
+
+class StoreSales:
+    """
+    Units sold per (product x day) for one store over a window, loaded in a
+    single pass so every per-item metric reads from the same matrix.
+    """
+
+    def __init__(
+        self,
+        product_ids: List[str],
+        dates: List[str],
+        matrix: np.ndarray,
+        last_sale: Dict[str, str],
+        last_sale_lookup: Optional[Callable[[str], Optional[str]]] = None,
+    ):
+        self.product_ids = product_ids
+        self.dates = dates
+        self.matrix = matrix
+        self.last_sale = last_sale
+        # Finds the last sale of a product that did not sell in the window
+        self.last_sale_lookup = last_sale_lookup
+        self._row = {pid: i for i, pid in enumerate(product_ids)}
+
+    @classmethod
+    def empty(cls, days: int = 30, end: Optional[date] = None) -> "StoreSales":
+        dates = sales_rollup.window(days, end)
+        return cls([], dates, np.zeros((0, len(dates))), {})
+
+    def rows(self, product_ids: Iterable[Any]) -> np.ndarray:
+        """Daily history for each product, zeros for products with no sales."""
+        out = np.zeros((0, len(self.dates)))
+        product_ids = [str(pid) for pid in product_ids]
+        if product_ids:
+            index = np.array([self._row.get(pid, -1) for pid in product_ids])
+            padded = np.vstack([self.matrix, np.zeros((1, len(self.dates)))])
+            out = padded[index]  # -1 picks the zero row
+        return out
+
+    def velocity(self, product_ids: Iterable[Any]) -> np.ndarray:
+        """Average units sold per day over the window."""
+        rows = self.rows(product_ids)
+        return rows.mean(axis=1) if rows.shape[1] else np.zeros(len(rows))
+
+    def last_sale_date(self, product_id: Any) -> str:
+        product_id = str(product_id)
+        if product_id not in self.last_sale and self.last_sale_lookup:
+            self.last_sale[product_id] = self.last_sale_lookup(product_id) or NO_SALES
+        return self.last_sale.get(product_id, NO_SALES)
+
+
+def _build(
+    entries: Iterable[Tuple[str, str, float]], dates: List[str]
+) -> Tuple[List[str], np.ndarray]:
+    column = {day: j for j, day in enumerate(dates)}
+    row: Dict[str, int] = {}
+    rows, cols, values = [], [], []
+    for product_id, day, quantity in entries:
+        j = column.get(day)
+        if j is None:
+            continue
+        rows.append(row.setdefault(product_id, len(row)))
+        cols.append(j)
+        values.append(quantity)
+    matrix = np.zeros((len(row), len(dates)))
+    np.add.at(matrix, (rows, cols), values)
+    return list(row), matrix
+
+
+def _raw_entries(
+    sales: Iterable[Dict[str, Any]], last_sale: Dict[str, str]
+) -> Iterable[Tuple[str, str, float]]:
+    for sale in sales:
+        product_id = sale.get("product_id")
+        day = sales_rollup.sale_day(sale.get("date"))
+        if product_id is None or day is None:
+            continue
+        product_id = str(product_id)
+        if sale.get("date", "") > last_sale.get(product_id, ""):
+            last_sale[product_id] = sale["date"]
+        try:
+            yield product_id, day, float(sale.get("quantity", 0) or 0)
+        except (TypeError, ValueError):
+            continue
+
+
+def date_range(dates: List[str]) -> List[Tuple[str, str, Any]]:
+    """
+    Query conditions selecting sales dated within ``dates``. Sale dates are
+    ISO strings, so day prefixes compare in date order.
+    """
+    after_end = (date.fromisoformat(dates[-1]) + timedelta(days=1)).isoformat()
+    return [("date", ">=", dates[0]), ("date", "<", after_end)]
+
+
+def load_store_sales(
+    firebase,
+    store_id: str,
+    days: int = 30,
+    end: Optional[date] = None,
+    collection: str = "sales",
+) -> StoreSales:
+    """
+    All sales for ``store_id`` over the last ``days + 1`` days as a matrix.
+
+    Reads the daily rollup when it has been backfilled, otherwise makes one
+    query for the store's raw sales in the window instead of one per
+    product. Last sale dates older than the window are then looked up per
+    product, only when asked for.
+    """
+    dates = sales_rollup.window(days, end)
+    if sales_rollup.is_ready():
+        product_ids, matrix = _build(
+            sales_rollup.store_rows(store_id, dates[0], dates[-1]), dates
+        )
+        return StoreSales(
+            product_ids, dates, matrix, sales_rollup.store_last_sales(store_id)
+        )
+
+    last_sale: Dict[str, str] = {}
+    sales = firebase.query_where(
+        collection,
+        [("store_id", "==", store_id), *date_range(dates)],
+    )
+    product_ids, matrix = _build(_raw_entries(sales, last_sale), dates)
+
+    def lookup(product_id: str) -> Optional[str]:
+        latest = firebase.query_where(
+            collection,
+            [("store_id", "==", store_id), ("product_id", "==", product_id)],
+            order_by="date",
+            descending=True,
+            limit=1,
+        )
+        return latest[0].get("date") if latest else None
+
+    return StoreSales(product_ids, dates, matrix, last_sale, lookup)
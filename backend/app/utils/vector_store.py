@@ -1,36 +1,270 @@
 import hashlib
 import json
 import os
+import threading
+from contextlib import contextmanager
 from typing import Any, Dict, List, Optional, Tuple
 
-INDEX_PATH = os.path.abspath(
-    os.path.join(os.path.dirname(__file__), "..", "..", "data", "embeddings_index.json")
+import numpy as np
+
+from utils.quantization import (
+    RETRAIN_FRACTION,
+    QuantizedIndex,
+    normalize_config,
+    normalize_rows,
+    rerank_exact,
 )
 
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore
+
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data"))
+# Append-only log: one JSON record per line ({"op": "upsert" | "config" | "clear"})
+INDEX_PATH = os.path.join(DATA_DIR, "embeddings_index.ndjson")
+# Whole-file index written by earlier versions; migrated into the log on first load
+LEGACY_INDEX_PATH = os.path.join(DATA_DIR, "embeddings_index.json")
+CODES_PATH = os.path.join(DATA_DIR, "embeddings_index.codes.npz")
+
+# Rewrite the log once it holds this many records per live item
+COMPACT_RATIO = float(os.getenv("VECTOR_COMPACT_RATIO", "2.0"))
+COMPACT_MIN_RECORDS = int(os.getenv("VECTOR_COMPACT_MIN_RECORDS", "1000"))
+
+_lock = threading.RLock()
+# In-memory view of the log, refreshed incrementally from the last read offset
+_state: Dict[str, Any] = {}
+# Quantized codes for the current index generation, shared across queries
+_quantized: Dict[str, Any] = {"generation": None, "index": None, "rows": None}
+
 
 def _ensure_dir():
     os.makedirs(os.path.dirname(INDEX_PATH), exist_ok=True)
 
 
-def _load_index() -> Dict[str, Any]:
+def _reset_state() -> Dict[str, Any]:
+    _state.clear()
+    _state.update(
+        {
+            "path": INDEX_PATH,
+            "inode": None,
+            "offset": 0,
+            "stamp": None,
+            "items": {},
+            "rows": None,
+            "row_of": {},
+            "config": None,
+            "records": 0,
+            # (metadata field, value) -> ordered set of keys
+            "postings": {},
+            # Dense normalised matrices per partition, built on first query
+            "partitions": {},
+            # Product id -> key of its most recent record
+            "by_id": {},
+        }
+    )
+    return _state
+
+
+@contextmanager
+def _write_lock():
+    """Serialize appends and compaction across processes sharing the log."""
     _ensure_dir()
-    if not os.path.exists(INDEX_PATH):
-        return {"items": []}
+    with open(INDEX_PATH + ".lock", "a") as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _partition_keys(record: Dict[str, Any]) -> List[Tuple[str, Any]]:
+    keys = []
+    for field, value in (record.get("metadata") or {}).items():
+        try:
+            hash(value)
+        except TypeError:
+            continue
+        keys.append((field, value))
+    return keys
+
+
+def _set_row(part: Dict[str, Any], key: str, embedding: Optional[List[float]]) -> bool:
+    """
+    Write one normalised row into a cached partition matrix, appending new
+    keys into spare capacity. Returns False when the partition has to be
+    rebuilt instead (a vector wider than its matrix).
+    """
+    buffer = part["buffer"]
+    dim = buffer.shape[1]
+    embedding = embedding or []
+    if dim == 0 or len(embedding) > dim:
+        return False
+    row = np.zeros((1, dim), dtype=np.float32)
+    if len(embedding) == dim:
+        # Vectors of another dimension stay zero, as in _matrix
+        row = normalize_rows(np.asarray([embedding], dtype=np.float32))
+    i = part["row"].get(key)
+    if i is None:
+        i = part["row"][key] = len(part["keys"])
+        part["keys"].append(key)
+        if i == len(buffer):
+            grown = np.zeros((max(16, 2 * len(buffer)), dim), dtype=np.float32)
+            grown[:i] = buffer
+            buffer = part["buffer"] = grown
+        part["matrix"] = buffer[: i + 1]
+    buffer[i] = row[0]
+    return True
+
+
+def _apply(state: Dict[str, Any], record: Dict[str, Any]) -> None:
+    op = record.pop("op", "upsert")
+    postings, partitions = state["postings"], state["partitions"]
+    if op == "upsert":
+        key = record.get("key")
+        previous = state["items"].get(key)
+        partition_keys = _partition_keys(record)
+        if previous is not None:
+            for pk in _partition_keys(previous):
+                if pk not in partition_keys:
+                    # Leaving a partition is rare; it is rebuilt on next use
+                    postings.get(pk, {}).pop(key, None)
+                    partitions.pop(pk, None)
+        state["items"][key] = record
+        if record.get("id") is not None:
+            state["by_id"][record["id"]] = key
+        for pk in partition_keys:
+            postings.setdefault(pk, {})[key] = None
+        # Cached matrices and the row list take the record in place
+        for pk in partition_keys + [None]:
+            part = partitions.get(pk)
+            if part is not None and not _set_row(part, key, record.get("embedding")):
+                partitions.pop(pk, None)
+        if state["rows"] is not None:
+            row = state["row_of"].get(key)
+            if row is None:
+                state["row_of"][key] = len(state["rows"])
+                state["rows"].append(record)
+            else:
+                state["rows"][row] = record
+    elif op == "config":
+        state["config"] = record.get("config")
+    elif op == "clear":
+        state["items"] = {}
+        state["by_id"] = {}
+        state["rows"] = None
+        postings.clear()
+        partitions.clear()
+    state["records"] += 1
+
+
+def _migrate_legacy() -> None:
+    if os.path.exists(INDEX_PATH) or not os.path.exists(LEGACY_INDEX_PATH):
+        return
     try:
-        with open(INDEX_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
+        with open(LEGACY_INDEX_PATH, "r", encoding="utf-8") as f:
+            legacy = json.load(f)
     except Exception:
-        return {"items": []}
+        return
+    with _write_lock():
+        if not os.path.exists(INDEX_PATH):
+            _write_snapshot(legacy.get("items", []), legacy.get("config"))
+
+
+def _refresh() -> Dict[str, Any]:
+    """
+    Bring the in-memory index up to date with the log.
+    Unchanged files cost one stat(); appends are read from the last offset.
+    """
+    state = _state if _state.get("path") == INDEX_PATH else _reset_state()
+    try:
+        st = os.stat(INDEX_PATH)
+    except FileNotFoundError:
+        _migrate_legacy()
+        if not os.path.exists(INDEX_PATH):
+            if state["inode"] is not None:
+                _reset_state()
+            return _state
+        st = os.stat(INDEX_PATH)
+
+    if st.st_ino != state["inode"] or st.st_size < state["offset"]:
+        # Compacted or replaced by another process: reload from scratch
+        state = _reset_state()
+        state["inode"] = st.st_ino
+    if state["stamp"] == (st.st_mtime_ns, st.st_size):
+        return state
+
+    with open(INDEX_PATH, "rb") as f:
+        f.seek(state["offset"])
+        chunk = f.read()
+    # Leave a partially written trailing line for the next refresh
+    complete = chunk[: chunk.rfind(b"\n") + 1]
+    for line in complete.splitlines():
+        if not line.strip():
+            continue
+        try:
+            _apply(state, json.loads(line))
+        except ValueError:
+            continue
+    state["offset"] += len(complete)
+    state["stamp"] = (st.st_mtime_ns, state["offset"])
+    return state
 
 
-def _save_index(index: Dict[str, Any]) -> None:
+def _generation(state: Dict[str, Any]) -> str:
+    return f"{state['inode']}:{state['offset']}:{state['stamp']}"
+
+
+def _rows(state: Dict[str, Any]) -> List[Dict[str, Any]]:
+    if state["rows"] is None:
+        state["rows"] = list(state["items"].values())
+        state["row_of"] = {k: i for i, k in enumerate(state["items"])}
+    return state["rows"]
+
+
+def _append(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    payload = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+    with _write_lock():
+        with open(INDEX_PATH, "a", encoding="utf-8") as f:
+            f.write(payload)
+    return _refresh()
+
+
+def _write_snapshot(
+    items: List[Dict[str, Any]], config: Optional[Dict[str, Any]]
+) -> None:
+    """Atomically replace the log with one record per live item (lock held)."""
     _ensure_dir()
     tmp = INDEX_PATH + ".tmp"
     with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(index, f, ensure_ascii=False, indent=2)
+        if config:
+            f.write(json.dumps({"op": "config", "config": config}) + "\n")
+        for it in items:
+            f.write(json.dumps({"op": "upsert", **it}, ensure_ascii=False) + "\n")
     os.replace(tmp, INDEX_PATH)
 
 
+def compact_index() -> int:
+    """Rewrite the log without superseded records. Returns live item count."""
+    with _lock:
+        _refresh()
+        with _write_lock():
+            state = _refresh()
+            items = _rows(state)
+            _write_snapshot(items, state["config"])
+        _refresh()
+        return len(items)
+
+
+def _maybe_compact(state: Dict[str, Any]) -> None:
+    if state["records"] >= COMPACT_MIN_RECORDS and state["records"] > (
+        COMPACT_RATIO * max(1, len(state["items"]))
+    ):
+        compact_index()
+
+
 def _text_key(text: str) -> str:
     return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
@@ -41,66 +275,254 @@ def upsert_embeddings(items: List[Dict[str, Any]]) -> int:
     Each item: {id, text, embedding: List[float], metadata: {...}}
     Returns number of items written/updated.
     """
-    index = _load_index()
-    existing = {it.get("key"): it for it in index.get("items", [])}
-
-    written = 0
+    records = []
     for it in items:
         text = it.get("text", "")
-        key = _text_key(text)
-        payload = {
-            "key": key,
-            "id": it.get("id"),
-            "text": text,
-            "embedding": it.get("embedding", []),
-            "metadata": it.get("metadata", {}),
+        records.append(
+            {
+                "op": "upsert",
+                "key": _text_key(text),
+                "id": it.get("id"),
+                "text": text,
+                "embedding": it.get("embedding", []),
+                "metadata": it.get("metadata", {}),
+            }
+        )
+    if not records:
+        return 0
+    with _lock:
+        _maybe_compact(_append(records))
+    return len(records)
+
+
+def get_item(product_id: str) -> Optional[Dict[str, Any]]:
+    """Latest indexed record for a product id, or None."""
+    with _lock:
+        state = _refresh()
+        key = state["by_id"].get(product_id)
+        return state["items"].get(key) if key is not None else None
+
+
+def all_items() -> List[Dict[str, Any]]:
+    with _lock:
+        return list(_rows(_refresh()))
+
+
+def get_index_config() -> Dict[str, Any]:
+    with _lock:
+        return normalize_config(_refresh()["config"])
+
+
+def configure_index(
+    quantization: str = "none",
+    pq_subvectors: Optional[int] = None,
+    rerank: int = 0,
+) -> Dict[str, Any]:
+    """
+    Set the compression used for similarity search on this index.
+    quantization: "none" (exact float scan), "int8" or "pq".
+    rerank: number of approximate candidates re-scored with exact vectors.
+    """
+    config = normalize_config(
+        {"quantization": quantization, "pq_subvectors": pq_subvectors, "rerank": rerank}
+    )
+    with _lock:
+        _append([{"op": "config", "config": config}])
+    return config
+
+
+def _matrix(items: List[Dict[str, Any]], dim: Optional[int] = None) -> np.ndarray:
+    if dim is None:
+        dim = max((len(it.get("embedding") or []) for it in items), default=0)
+    matrix = np.zeros((len(items), dim), dtype=np.float32)
+    for row, it in enumerate(items):
+        emb = it.get("embedding") or []
+        if len(emb) == dim:
+            matrix[row] = emb
+    return matrix
+
+
+def _encode_incremental(
+    quantizer, prev_rows: List[Dict[str, Any]], prev_codes: np.ndarray, items
+) -> Tuple[np.ndarray, int]:
+    """Reuse codes of unchanged rows; encode only new or modified items."""
+    by_key = {it.get("key"): i for i, it in enumerate(prev_rows)}
+    codes = np.empty((len(items),) + prev_codes.shape[1:], dtype=prev_codes.dtype)
+    stale = []
+    for row, it in enumerate(items):
+        prev = by_key.get(it.get("key"))
+        if prev is not None and (
+            prev_rows[prev] is it
+            or prev_rows[prev].get("embedding") == it.get("embedding")
+        ):
+            codes[row] = prev_codes[prev]
+        else:
+            stale.append(row)
+    if stale:
+        vectors = normalize_rows(_matrix([items[r] for r in stale], quantizer.dim))
+        codes[stale] = quantizer.encode(vectors)
+    return codes, len(stale)
+
+
+def _get_quantized_index(state: Dict[str, Any]) -> Optional[QuantizedIndex]:
+    config = normalize_config(state["config"])
+    items = _rows(state)
+    if config["quantization"] == "none" or not items:
+        return None
+    generation = _generation(state)
+    prev = _quantized.get("index")
+    if _quantized["generation"] == generation and prev is not None:
+        return prev
+
+    qindex = None
+    if prev is not None and prev.matches(config):
+        codes, stale = _encode_incremental(
+            prev.quantizer, _quantized["rows"], prev.codes, items
+        )
+        if stale <= len(items) * RETRAIN_FRACTION:
+            qindex = QuantizedIndex(prev.quantizer, codes, config)
+    elif os.path.exists(CODES_PATH):
+        try:
+            loaded, extra = QuantizedIndex.load(CODES_PATH, config)
+            # Codebooks trained for another quantization are retrained below
+            if loaded.matches(config):
+                qindex = loaded
+                if extra.get("generation") != generation or len(qindex) != len(items):
+                    # Keep the trained codebooks, re-encode the current rows
+                    codes = qindex.quantizer.encode(
+                        normalize_rows(_matrix(items, qindex.quantizer.dim))
+                    )
+                    qindex = QuantizedIndex(qindex.quantizer, codes, config)
+        except Exception:
+            qindex = None
+    if qindex is None:
+        qindex = QuantizedIndex.build(_matrix(items), config)
+        qindex.save(CODES_PATH, generation=generation)
+
+    # A copy, since upserts update the row list in place
+    _quantized.update({"generation": generation, "index": qindex, "rows": list(items)})
+    return qindex
+
+
+def _filter_keys(
+    state: Dict[str, Any], filter_meta: Dict[str, Any]
+) -> Tuple[Optional[Tuple[str, Any]], List[str]]:
+    """
+    Resolve a metadata filter through the postings, smallest partition first.
+    Returns the partition the keys were drawn from and the matching keys.
+    """
+    wanted = list(filter_meta.items())
+    try:
+        postings = [state["postings"].get(pk, {}) for pk in wanted]
+    except TypeError:
+        postings = None
+    if postings is None or any(v is None for _, v in wanted):
+        # Unhashable values, or None (which also matches a missing field), scan
+        keys = [
+            it["key"]
+            for it in _rows(state)
+            if all(it.get("metadata", {}).get(k) == v for k, v in wanted)
+        ]
+        return None, keys
+    order = sorted(range(len(wanted)), key=lambda i: len(postings[i]))
+    others = [postings[i] for i in order[1:]]
+    keys = [k for k in postings[order[0]] if all(k in o for o in others)]
+    return wanted[order[0]], keys
+
+
+def _partition(state: Dict[str, Any], pk: Optional[Tuple[str, Any]]) -> Dict[str, Any]:
+    """Normalised matrix for one partition (``None`` is the whole index)."""
+    cached = state["partitions"].get(pk)
+    if cached is None:
+        if pk is None:
+            keys = list(state["items"])
+        else:
+            keys = list(state["postings"].get(pk, {}))
+        items = [state["items"][k] for k in keys]
+        matrix = normalize_rows(_matrix(items))
+        cached = {
+            "keys": keys,
+            "row": {k: i for i, k in enumerate(keys)},
+            # Rows appended by later upserts go into the buffer's spare capacity
+            "buffer": matrix,
+            "matrix": matrix,
         }
-        existing[key] = payload
-        written += 1
+        state["partitions"][pk] = cached
+    return cached
+
 
-    index["items"] = list(existing.values())
-    _save_index(index)
-    return written
+def _query_exact(
+    state: Dict[str, Any],
+    embedding: List[float],
+    top_k: int,
+    filter_meta: Optional[Dict[str, Any]],
+) -> List[Tuple[float, Dict[str, Any]]]:
+    pk, keys = _filter_keys(state, filter_meta) if filter_meta else (None, None)
+    part = _partition(state, pk)
+    matrix = part["matrix"]
+    if keys is not None and len(keys) != len(part["keys"]):
+        if not keys:
+            return []
+        rows = np.fromiter((part["row"][k] for k in keys), dtype=np.int64)
+        matrix = matrix[rows]
+    else:
+        keys = part["keys"]
+    if not keys or len(embedding) != matrix.shape[1]:
+        # A query of another dimension cannot be compared; rows come back unscored
+        return [(0.0, state["items"][k]) for k in keys[:top_k]]
 
+    q = normalize_rows(np.asarray(embedding, dtype=np.float32).reshape(1, -1))[0]
+    scores = matrix @ q
+    k = min(top_k, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top], kind="stable")]
+    return [(float(scores[i]), state["items"][keys[i]]) for i in top]
 
-def _cosine(a: List[float], b: List[float]) -> float:
-    if not a or not b or len(a) != len(b):
-        return 0.0
-    dot = 0.0
-    na = 0.0
-    nb = 0.0
-    for x, y in zip(a, b):
-        dot += x * y
-        na += x * x
-        nb += y * y
-    if na == 0.0 or nb == 0.0:
-        return 0.0
-    return dot / ((na**0.5) * (nb**0.5))
+
+def _query_quantized(
+    qindex: QuantizedIndex,
+    state: Dict[str, Any],
+    items: List[Dict[str, Any]],
+    embedding: List[float],
+    top_k: int,
+    filter_meta: Optional[Dict[str, Any]],
+) -> List[Tuple[float, Dict[str, Any]]]:
+    rows = None
+    if filter_meta:
+        _, keys = _filter_keys(state, filter_meta)
+        if not keys:
+            return []
+        _rows(state)
+        rows = np.fromiter((state["row_of"][k] for k in keys), dtype=np.int64)
+    rerank = qindex.config["rerank"]
+    candidates = qindex.search(embedding, max(top_k, rerank), rows=rows)
+    if rerank and candidates:
+        vectors = _matrix([items[row] for row, _ in candidates])
+        candidates = rerank_exact(embedding, candidates, vectors)
+    return [(score, items[row]) for row, score in candidates[:top_k]]
 
 
 def query_similar(
     embedding: List[float], top_k: int = 5, filter_meta: Optional[Dict[str, Any]] = None
 ) -> List[Dict[str, Any]]:
-    index = _load_index()
-    items = index.get("items", [])
-    results: List[Tuple[float, Dict[str, Any]]] = []
-    for it in items:
-        if filter_meta:
-            mismatch = False
-            for k, v in filter_meta.items():
-                if it.get("metadata", {}).get(k) != v:
-                    mismatch = True
-                    break
-            if mismatch:
-                continue
-        score = _cosine(embedding, it.get("embedding", []))
-        results.append((score, it))
-
-    results.sort(key=lambda x: x[0], reverse=True)
-    return [
-        {"score": round(score, 6), **item} for score, item in results[: max(1, top_k)]
-    ]
+    """
+    Cosine top-k over the index. Filters are resolved through per-metadata
+    postings, so only vectors in the matching partition are scored.
+    """
+    with _lock:
+        state = _refresh()
+        items = _rows(state)
+        qindex = _get_quantized_index(state)
+        if qindex is not None and len(embedding) == qindex.quantizer.dim:
+            results = _query_quantized(
+                qindex, state, items, embedding, max(1, top_k), filter_meta
+            )
+        else:
+            results = _query_exact(state, embedding, max(1, top_k), filter_meta)
+    return [{"score": round(score, 6), **item} for score, item in results]
 
 
 def clear_index():
-    _save_index({"items": []})
+    with _lock:
+        _append([{"op": "clear"}])
+        compact_index()
@@ -1,8 +1,20 @@
+import hashlib
 import json
 import os
 import sqlite3
 from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
+
+from utils import sqlite_pool
+from utils.quantization import (
+    RETRAIN_FRACTION,
+    QuantizedIndex,
+    normalize_config,
+    normalize_rows,
+    rerank_exact,
+)
+
 DEFAULT_DB_PATH = os.path.abspath(
     os.path.join(
         os.path.dirname(__file__), "..", "..", "data", "embeddings_index.sqlite"
@@ -10,21 +22,27 @@ DEFAULT_DB_PATH = os.path.abspath(
 )
 
 
-def _get_db_path() -> str:
-    return os.getenv("VECTOR_DB_PATH", DEFAULT_DB_PATH)
+# Metadata stored as indexed columns; filters on these read only their partition
+FILTER_COLUMNS = ("category", "name")
 
 
-def _connect() -> sqlite3.Connection:
-    path = _get_db_path()
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    conn = sqlite3.connect(path, check_same_thread=False)
-    conn.execute("PRAGMA journal_mode=WAL;")
-    conn.execute("PRAGMA synchronous=NORMAL;")
-    return conn
+UPSERT_SQL = """
+    INSERT INTO embeddings (key, id, text, embedding, category, name, generation)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(key) DO UPDATE SET
+      id=excluded.id,
+      text=excluded.text,
+      embedding=excluded.embedding,
+      category=excluded.category,
+      name=excluded.name,
+      generation=excluded.generation
+    """
+SELECT_COLUMNS = "SELECT key, id, text, embedding, category, name FROM embeddings"
+GET_ITEM_SQL = f"{SELECT_COLUMNS} WHERE id=? ORDER BY rowid DESC LIMIT 1"
 
 
-def init_db() -> None:
-    with _connect() as conn:
+def _create_schema(conn: sqlite3.Connection) -> None:
+    with conn:
         conn.execute("""
             CREATE TABLE IF NOT EXISTS embeddings (
               key TEXT PRIMARY KEY,
@@ -32,65 +50,342 @@ def init_db() -> None:
               text TEXT,
               embedding TEXT, -- JSON array for portability
               category TEXT,
-              name TEXT
+              name TEXT,
+              generation INTEGER DEFAULT 0 -- index generation of the last write
             );
             """)
-        conn.commit()
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(embeddings)")]
+        if "generation" not in columns:
+            conn.execute(
+                "ALTER TABLE embeddings ADD COLUMN generation INTEGER DEFAULT 0"
+            )
+        for column in ("id", "generation") + FILTER_COLUMNS:
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_embeddings_{column} "
+                f"ON embeddings({column})"
+            )
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS index_config (
+              key TEXT PRIMARY KEY,
+              value TEXT
+            );
+            """)
+
+
+_pool = sqlite_pool.SQLitePool("VECTOR_DB_PATH", DEFAULT_DB_PATH, _create_schema)
+_get_db_path = _pool.path
+_connect = _pool.connect
+
+
+def init_db() -> None:
+    """Create the schema if needed; runs once per process and database."""
+    _connect()
+
+
+# Quantized codes per database path, tagged with the generation they cover
+_quantized: Dict[str, Dict[str, Any]] = {}
+
+
+def _get_meta(conn: sqlite3.Connection, key: str, default: Any = None) -> Any:
+    row = conn.execute("SELECT value FROM index_config WHERE key=?", (key,)).fetchone()
+    return json.loads(row[0]) if row else default
+
+
+def _set_meta(conn: sqlite3.Connection, key: str, value: Any) -> None:
+    conn.execute(
+        "INSERT INTO index_config (key, value) VALUES (?, ?) "
+        "ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+        (key, json.dumps(value)),
+    )
+
+
+def _bump_generation(conn: sqlite3.Connection) -> int:
+    generation = int(_get_meta(conn, "generation", 0)) + 1
+    _set_meta(conn, "generation", generation)
+    return generation
+
+
+def get_index_config() -> Dict[str, Any]:
+    with _connect() as conn:
+        return normalize_config(_get_meta(conn, "config"))
+
+
+def configure_index(
+    quantization: str = "none",
+    pq_subvectors: Optional[int] = None,
+    rerank: int = 0,
+) -> Dict[str, Any]:
+    """
+    Set the compression used for similarity search on this index.
+    quantization: "none" (exact float scan), "int8" or "pq".
+    rerank: number of approximate candidates re-scored with exact vectors.
+    """
+    config = normalize_config(
+        {"quantization": quantization, "pq_subvectors": pq_subvectors, "rerank": rerank}
+    )
+    with _connect() as conn:
+        _set_meta(conn, "config", config)
+        _bump_generation(conn)
+    return config
 
 
 def _key_for(text: str) -> str:
-    return f"k:{abs(hash(text))}"
+    # Stable across processes, unlike hash(), so re-indexing updates in place
+    return "k:" + hashlib.sha256(text.encode("utf-8")).hexdigest()
 
 
 def upsert_embeddings(items: List[Dict[str, Any]]) -> int:
     """
-    Upsert items into sqlite store.
+    Upsert items into sqlite store in a single transaction.
     Each item: {id, text, embedding: List[float], metadata: {category, name}}
     Returns number of items written/updated.
     """
-    init_db()
+    rows = []
+    for it in items:
+        text = it.get("text", "")
+        meta = it.get("metadata", {})
+        rows.append(
+            [
+                _key_for(text),
+                it.get("id"),
+                text,
+                json.dumps(it.get("embedding", [])),
+                meta.get("category"),
+                meta.get("name"),
+            ]
+        )
+    if not rows:
+        return 0
     with _connect() as conn:
-        cur = conn.cursor()
-        written = 0
-        for it in items:
-            text = it.get("text", "")
-            key = _key_for(text)
-            pid = it.get("id")
-            emb_json = json.dumps(it.get("embedding", []))
-            meta = it.get("metadata", {})
-            category = meta.get("category")
-            name = meta.get("name")
-            cur.execute(
-                """
-                INSERT INTO embeddings (key, id, text, embedding, category, name)
-                VALUES (?, ?, ?, ?, ?, ?)
-                ON CONFLICT(key) DO UPDATE SET
-                  id=excluded.id,
-                  text=excluded.text,
-                  embedding=excluded.embedding,
-                  category=excluded.category,
-                  name=excluded.name
-                """,
-                (key, pid, text, emb_json, category, name),
-            )
-            written += 1
-        conn.commit()
-        return written
-
-
-def _cosine(a: List[float], b: List[float]) -> float:
-    if not a or not b or len(a) != len(b):
-        return 0.0
-    dot = 0.0
-    na = 0.0
-    nb = 0.0
-    for x, y in zip(a, b):
-        dot += x * y
-        na += x * x
-        nb += y * y
-    if na == 0.0 or nb == 0.0:
-        return 0.0
-    return dot / ((na**0.5) * (nb**0.5))
+        # Rows carry the generation they were written in, so quantized codes
+        # can be brought up to date by re-encoding only those rows
+        generation = _bump_generation(conn)
+        conn.executemany(UPSERT_SQL, [row + [generation] for row in rows])
+    return len(rows)
+
+
+def get_item(product_id: str) -> Optional[Dict[str, Any]]:
+    """Latest indexed record for a product id, or None."""
+    with _connect() as conn:
+        row = conn.execute(GET_ITEM_SQL, (product_id,)).fetchone()
+    if row is None:
+        return None
+    key, pid, text, emb_json, category, name = row
+    return {
+        "key": key,
+        "id": pid,
+        "text": text,
+        "embedding": json.loads(emb_json or "[]"),
+        "metadata": {"category": category, "name": name},
+    }
+
+
+def _vectors(rows: List[Tuple[Any, ...]], dim: Optional[int] = None) -> np.ndarray:
+    """(key, embedding JSON, ...) rows as a float matrix; other dims stay zero."""
+    vectors = [json.loads(row[1] or "[]") for row in rows]
+    if dim is None:
+        dim = max(len(v) for v in vectors)
+    matrix = np.zeros((len(rows), dim), dtype=np.float32)
+    for i, v in enumerate(vectors):
+        if len(v) == dim:
+            matrix[i] = v
+    return matrix
+
+
+def _build_quantized(
+    rows: List[Tuple[Any, ...]], config: Dict[str, Any], generation: int
+) -> Dict[str, Any]:
+    """Train a quantizer on every row and encode them."""
+    partitions: Dict[Tuple[str, Any], set] = {}
+    for i, row in enumerate(rows):
+        for column, value in zip(FILTER_COLUMNS, row[2:]):
+            partitions.setdefault((column, value), set()).add(i)
+    return {
+        "generation": generation,
+        "config": config,
+        "index": QuantizedIndex.build(_vectors(rows), config),
+        "keys": [row[0] for row in rows],
+        "row_of": {row[0]: i for i, row in enumerate(rows)},
+        "meta": [tuple(row[2:]) for row in rows],
+        "partitions": partitions,
+        "arrays": {},
+        # Rows re-encoded with the current codebooks since they were trained
+        "changed": 0,
+    }
+
+
+def _update_quantized(
+    cached: Dict[str, Any], rows: List[Tuple[Any, ...]], generation: int
+) -> Optional[Dict[str, Any]]:
+    """
+    Bring ``cached`` up to ``generation`` by encoding only the rows written
+    since, with the trained codebooks. Returns None when the codebooks
+    should be retrained: too many rows changed or a wider vector arrived.
+    The cached entry is copied, not modified, as other threads may be
+    querying it.
+    """
+    index: QuantizedIndex = cached["index"]
+    if any(len(json.loads(row[1] or "[]")) > index.quantizer.dim for row in rows):
+        return None
+    changed = cached["changed"] + len(rows)
+    if changed > RETRAIN_FRACTION * (len(cached["keys"]) + len(rows)):
+        return None
+
+    keys, meta = list(cached["keys"]), list(cached["meta"])
+    row_of = dict(cached["row_of"])
+    partitions = dict(cached["partitions"])
+    touched = set()
+    positions = []
+    for key, _, *values in rows:
+        i = row_of.get(key)
+        if i is None:
+            i = row_of[key] = len(keys)
+            keys.append(key)
+            meta.append(tuple(values))
+        else:
+            for pk in zip(FILTER_COLUMNS, meta[i]):
+                partitions[pk] = partitions[pk] - {i}
+                touched.add(pk)
+            meta[i] = tuple(values)
+        for pk in zip(FILTER_COLUMNS, values):
+            partitions[pk] = partitions.get(pk, set()) | {i}
+            touched.add(pk)
+        positions.append(i)
+
+    codes = np.empty((len(keys),) + index.codes.shape[1:], dtype=index.codes.dtype)
+    codes[: len(index.codes)] = index.codes
+    encoded = index.quantizer.encode(
+        normalize_rows(_vectors(rows, index.quantizer.dim))
+    )
+    codes[positions] = encoded
+    arrays = {pk: a for pk, a in cached["arrays"].items() if pk not in touched}
+    return {
+        **cached,
+        "generation": generation,
+        "index": QuantizedIndex(index.quantizer, codes, index.config),
+        "keys": keys,
+        "row_of": row_of,
+        "meta": meta,
+        "partitions": partitions,
+        "arrays": arrays,
+        "changed": changed,
+    }
+
+
+def _partition_rows(
+    cached: Dict[str, Any], pk: Tuple[str, Any]
+) -> Optional[np.ndarray]:
+    """Sorted rows of one filter partition, or None when it is empty."""
+    rows = cached["arrays"].get(pk)
+    if rows is None:
+        members = cached["partitions"].get(pk)
+        if not members:
+            return None
+        rows = cached["arrays"][pk] = np.array(sorted(members), dtype=np.int64)
+    return rows
+
+
+def _get_quantized_index(conn: sqlite3.Connection) -> Optional[Dict[str, Any]]:
+    """
+    Quantized codes for the current generation. Writes since the cached
+    generation are encoded with the trained codebooks; the codebooks are
+    retrained when the config changes or too many rows changed since.
+    """
+    config = normalize_config(_get_meta(conn, "config"))
+    if config["quantization"] == "none":
+        return None
+    path = _get_db_path()
+    generation = _get_meta(conn, "generation", 0)
+    cached = _quantized.get(path)
+    if cached and cached["generation"] == generation:
+        return cached
+
+    if cached and cached["config"] == config:
+        rows = conn.execute(
+            "SELECT key, embedding, category, name FROM embeddings "
+            "WHERE generation > ?",
+            (cached["generation"],),
+        ).fetchall()
+        updated = _update_quantized(cached, rows, generation)
+        if updated is not None:
+            _quantized[path] = updated
+            return updated
+
+    rows = conn.execute(
+        "SELECT key, embedding, category, name FROM embeddings"
+    ).fetchall()
+    if not rows:
+        return None
+    cached = _build_quantized(rows, config, generation)
+    _quantized[path] = cached
+    return cached
+
+
+def _query_quantized(
+    conn: sqlite3.Connection,
+    cached: Dict[str, Any],
+    embedding: List[float],
+    top_k: int,
+    filter_meta: Optional[Dict[str, Any]],
+) -> List[Dict[str, Any]]:
+    qindex: QuantizedIndex = cached["index"]
+    rows = None
+    for column, value in _column_filters(filter_meta):
+        part = _partition_rows(cached, (column, value))
+        if part is None:
+            return []
+        rows = part if rows is None else np.intersect1d(rows, part)
+    rerank = qindex.config["rerank"]
+    candidates = qindex.search(embedding, max(top_k, rerank), rows=rows)
+    if not candidates:
+        return []
+    keys = [cached["keys"][row] for row, _ in candidates]
+    placeholders = ",".join("?" * len(keys))
+    by_key = {
+        row[0]: row
+        for row in conn.execute(
+            f"{SELECT_COLUMNS} WHERE key IN ({placeholders})",
+            keys,
+        ).fetchall()
+    }
+    stored = [json.loads(by_key[k][3] or "[]") if k in by_key else [] for k in keys]
+    if rerank and candidates:
+        positions = {row: i for i, (row, _) in enumerate(candidates)}
+        dim = qindex.quantizer.dim
+        vectors = [v if len(v) == dim else [0.0] * dim for v in stored]
+        reranked = rerank_exact(embedding, candidates, vectors)
+        order = [positions[row] for row, _ in reranked]
+        candidates = reranked
+        keys = [keys[i] for i in order]
+        stored = [stored[i] for i in order]
+
+    results = []
+    for (_, score), key, emb in zip(candidates[:top_k], keys, stored):
+        if key not in by_key:
+            continue
+        _, pid, text, _, category, name = by_key[key]
+        results.append(
+            {
+                "score": round(score, 6),
+                "key": key,
+                "id": pid,
+                "text": text,
+                "embedding": emb,
+                "metadata": {"category": category, "name": name},
+            }
+        )
+    return results
+
+
+def _column_filters(
+    filter_meta: Optional[Dict[str, Any]],
+) -> List[Tuple[str, Any]]:
+    # Only stored columns can be filtered; other metadata keys are ignored
+    return [
+        (column, filter_meta[column])
+        for column in FILTER_COLUMNS
+        if filter_meta and filter_meta.get(column)
+    ]
 
 
 def query_similar(
@@ -98,40 +393,51 @@ def query_similar(
     top_k: int = 5,
     filter_meta: Optional[Dict[str, Any]] = None,
 ) -> List[Dict[str, Any]]:
-    init_db()
+    """
+    Cosine top-k. Category and name filters are applied through their
+    column indexes, so only the matching partition is read and scored.
+    """
     with _connect() as conn:
-        cur = conn.cursor()
-        if filter_meta and filter_meta.get("category"):
-            cur.execute(
-                "SELECT key, id, text, embedding, category, name FROM embeddings WHERE category=?",
-                (filter_meta.get("category"),),
-            )
-        else:
-            cur.execute(
-                "SELECT key, id, text, embedding, category, name FROM embeddings"
-            )
-            rows = cur.fetchall()
+        cached = _get_quantized_index(conn)
+        if cached and len(embedding) == cached["index"].quantizer.dim:
+            return _query_quantized(conn, cached, embedding, max(1, top_k), filter_meta)
+        filters = _column_filters(filter_meta)
+        where = " AND ".join(f"{column}=?" for column, _ in filters)
+        rows = conn.execute(
+            SELECT_COLUMNS + (f" WHERE {where}" if where else ""),
+            [value for _, value in filters],
+        ).fetchall()
 
-    results: List[Tuple[float, Dict[str, Any]]] = []
-    for key, pid, text, emb_json, category, name in rows:
+    if not rows:
+        return []
+    vectors = []
+    for row in rows:
         try:
-            emb = json.loads(emb_json or "[]")
+            vectors.append(json.loads(row[3] or "[]"))
         except Exception:
-            emb = []
-        score = _cosine(embedding, emb)
+            vectors.append([])
+    dim = len(embedding)
+    matrix = np.zeros((len(rows), dim), dtype=np.float32)
+    for i, v in enumerate(vectors):
+        # Vectors of another dimension are left as zeros and score zero
+        if len(v) == dim:
+            matrix[i] = v
+    q = normalize_rows(np.asarray(embedding, dtype=np.float32).reshape(1, -1))[0]
+    scores = normalize_rows(matrix) @ q if dim else np.zeros(len(rows))
+    k = min(max(1, top_k), len(rows))
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top], kind="stable")]
+    results = []
+    for i in top:
+        key, pid, text, _, category, name = rows[i]
         results.append(
-            (
-                score,
-                {
-                    "key": key,
-                    "id": pid,
-                    "text": text,
-                    "embedding": emb,
-                    "metadata": {"category": category, "name": name},
-                },
-            )
+            {
+                "score": round(float(scores[i]), 6),
+                "key": key,
+                "id": pid,
+                "text": text,
+                "embedding": vectors[i],
+                "metadata": {"category": category, "name": name},
+            }
         )
-    results.sort(key=lambda x: x[0], reverse=True)
-    return [
-        {"score": round(score, 6), **item} for score, item in results[: max(1, top_k)]
-    ]
+    return results
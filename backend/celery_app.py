@@ -43,6 +43,31 @@ def make_celery(app=None):
                 "schedule": timedelta(hours=6),
                 "args": (),
             },
+            "rebuild-product-similarity": {
+                "task": "celery_app.rebuild_product_similarity",
+                "schedule": timedelta(hours=24),
+                "args": (),
+            },
+            "rebuild-co-purchase": {
+                "task": "celery_app.rebuild_co_purchase",
+                "schedule": timedelta(hours=24),
+                "args": (),
+            },
+            "backfill-sales-rollup": {
+                "task": "celery_app.backfill_sales_rollup",
+                "schedule": timedelta(hours=24),
+                "args": (),
+            },
+            "train-forecast-models": {
+                "task": "celery_app.train_forecast_models",
+                "schedule": timedelta(hours=24),
+                "args": ("category",),
+            },
+            "plan-replenishment": {
+                "task": "celery_app.plan_replenishment",
+                "schedule": timedelta(hours=24),
+                "args": (),
+            },
         },
         # Task time limits
         "task_soft_time_limit": 300,  # 5 minutes
@@ -335,6 +360,181 @@ def generate_daily_report():
         raise
 
 
+@celery.task(name="celery_app.rebuild_product_similarity")
+def rebuild_product_similarity():
+    """Rebuild the precomputed product substitute index - periodic task"""
+    try:
+        import sys
+
+        sys.path.insert(0, os.path.join(os.path.dirname(__file__), "app"))
+        from utils.firebase_utils import FirebaseUtils
+        from utils.product_similarity import rebuild_similarity_index
+
+        print("🔗 Rebuilding product similarity index...")
+
+        products = FirebaseUtils().get_documents("products")
+        index = rebuild_similarity_index(products)
+
+        print(f"✅ Product similarity index rebuilt: {len(index)} products")
+
+        return {
+            "status": "SUCCESS",
+            "message": "Product similarity index rebuilt",
+            "products": len(index),
+        }
+
+    except Exception as e:
+        print(f"❌ Product similarity rebuild failed: {str(e)}")
+        raise
+
+
+@celery.task(name="celery_app.rebuild_co_purchase")
+def rebuild_co_purchase():
+    """Recount frequently-bought-together pairs from all orders - periodic task"""
+    try:
+        import sys
+
+        sys.path.insert(0, os.path.join(os.path.dirname(__file__), "app"))
+        from utils.co_purchase import rebuild
+        from utils.firebase_utils import FirebaseUtils
+
+        print("🛒 Rebuilding co-purchase counts...")
+
+        summary = rebuild(FirebaseUtils().get_documents("orders"))
+
+        print(
+            f"✅ Co-purchase counts rebuilt: {summary['baskets']} baskets, "
+            f"{summary['pairs']} pairs"
+        )
+
+        return {
+            "status": "SUCCESS",
+            "message": "Co-purchase counts rebuilt",
+            **summary,
+        }
+
+    except Exception as e:
+        print(f"❌ Co-purchase rebuild failed: {str(e)}")
+        raise
+
+
+@celery.task(name="celery_app.backfill_sales_rollup")
+def backfill_sales_rollup():
+    """
+    Rebuild daily sales rollups from the raw sales collection. Run once to
+    seed the rollup; the nightly run also picks up sales written elsewhere.
+    """
+    try:
+        import sys
+
+        sys.path.insert(0, os.path.join(os.path.dirname(__file__), "app"))
+        from utils.firebase_utils import FirebaseUtils
+        from utils.forecast_cache import forecast_cache
+        from utils.sales_rollup import backfill
+
+        print("📦 Backfilling daily sales rollups...")
+
+        summary = backfill(FirebaseUtils().get_documents("sales"))
+        # Histories may have changed for any product
+        forecast_cache.clear()
+
+        print(f"✅ Sales rollups rebuilt: {summary['rows']} daily rows")
+
+        return {
+            "status": "SUCCESS",
+            "message": "Sales rollups rebuilt",
+            **summary,
+        }
+
+    except Exception as e:
+        print(f"❌ Sales rollup backfill failed: {str(e)}")
+        raise
+
+
+@celery.task(name="celery_app.train_forecast_models")
+def train_forecast_models(group_by="category", trainer="holt_winters", days=365):
+    """
+    Train one forecasting model per product, store or category on the daily
+    sales rollup and publish them as a new model version - periodic task
+    """
+    try:
+        import sys
+
+        sys.path.insert(0, os.path.join(os.path.dirname(__file__), "app"))
+        from utils import sales_rollup
+        from utils.firebase_utils import FirebaseUtils
+        from utils.model_training import category_of, load_series, train_models
+
+        firebase = FirebaseUtils()
+        if not sales_rollup.is_ready():
+            sales_rollup.backfill(firebase.get_documents("sales"))
+
+        print(f"🧠 Training {trainer} models per {group_by}...")
+
+        products = (
+            firebase.get_documents("products") if group_by == "category" else None
+        )
+        series = load_series(group_by, days, products)
+        manifest = train_models(
+            series,
+            trainer,
+            group_by,
+            groups=category_of(products) if products else None,
+        )
+
+        print(
+            f"✅ Trained {manifest['trained']} models "
+            f"({manifest['failed']} failed) in {manifest['total_seconds']}s"
+        )
+
+        return {
+            "status": "SUCCESS",
+            "message": "Forecast models trained",
+            "version": manifest["version"],
+            "trained": manifest["trained"],
+            "failed": manifest["failed"],
+            "total_seconds": manifest["total_seconds"],
+        }
+
+    except Exception as e:
+        print(f"❌ Forecast model training failed: {str(e)}")
+        raise
+
+
+@celery.task(name="celery_app.plan_replenishment")
+def plan_replenishment(days=30):
+    """
+    Compute the replenishment plan of every store and product in one
+    vectorized pass and write it to Firestore - periodic task
+    """
+    try:
+        import sys
+
+        sys.path.insert(0, os.path.join(os.path.dirname(__file__), "app"))
+        from utils import replenishment
+        from utils.firebase_utils import FirebaseUtils
+
+        print("📦 Planning replenishment for all stores...")
+
+        summary = replenishment.run(FirebaseUtils(), days)
+
+        print(
+            f"✅ Planned {summary['items']} items across {summary['stores']} stores: "
+            f"{summary['reorder']} to reorder, {summary['overstock']} overstocked "
+            f"({summary['failed_batches']} failed batches) in {summary['total_seconds']}s"
+        )
+
+        return {
+            "status": "SUCCESS",
+            "message": "Replenishment plan written",
+            **summary,
+        }
+
+    except Exception as e:
+        print(f"❌ Replenishment planning failed: {str(e)}")
+        raise
+
+
 # Utility functions for task management
 def get_task_status(task_id):
     """Get status of a background task"""
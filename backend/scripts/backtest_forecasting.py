@@ -0,0 +1,91 @@
+import argparse
+import json
+import os
+import sys
+from datetime import datetime, timezone
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app"))
+)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Rolling-origin backtest of the demand forecasting models"
+    )
+    parser.add_argument("--models", default="smoothing,holt_winters,lstm")
+    parser.add_argument("--synthetic", type=int, default=50, help="0 to skip")
+    parser.add_argument("--days", type=int, default=180)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--recorded",
+        action="store_true",
+        help="also use product series from the sales rollup",
+    )
+    parser.add_argument("--series-file", help='JSON object of {"key": [daily sales]}')
+    parser.add_argument("--horizon", type=int, default=14)
+    parser.add_argument("--min-train", type=int, default=60)
+    parser.add_argument("--step", type=int, default=7)
+    parser.add_argument("--summary-only", action="store_true")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--baseline", help="fail on regressions against this report")
+    parser.add_argument("--error-tolerance", type=float, default=0.05)
+    parser.add_argument("--time-tolerance", type=float, default=0.5)
+    args = parser.parse_args()
+
+    from utils import backtest, sales_rollup
+
+    datasets = {}
+    if args.synthetic:
+        datasets["synthetic"] = backtest.synthetic_series(
+            args.synthetic, args.days, args.seed
+        )
+    if args.recorded:
+        datasets["recorded"] = sales_rollup.grouped_history("product_id", args.days)
+    if args.series_file:
+        with open(args.series_file) as f:
+            datasets[os.path.basename(args.series_file)] = json.load(f)
+
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "horizon": args.horizon,
+            "min_train": args.min_train,
+            "step": args.step,
+            "days": args.days,
+            "seed": args.seed,
+        },
+        "models": {},
+    }
+    for dataset, series in datasets.items():
+        for name in args.models.split(","):
+            result = backtest.backtest(
+                backtest.MODELS[name](),
+                series,
+                args.horizon,
+                args.min_train,
+                args.step,
+            )
+            if args.summary_only:
+                result.pop("per_series")
+            report["models"][f"{dataset}/{name}"] = result
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        report["regressions"] = backtest.compare(
+            report, baseline, args.error_tolerance, args.time_tolerance
+        )
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+    if report.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
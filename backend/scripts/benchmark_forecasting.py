@@ -0,0 +1,56 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app"))
+)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare matrix and per-series demand forecasting"
+    )
+    parser.add_argument("--series", type=int, default=10_000)
+    parser.add_argument("--days", type=int, default=91)
+    parser.add_argument("--horizon", type=int, default=30)
+    parser.add_argument("--loop-sample", type=int, default=500)
+    args = parser.parse_args()
+
+    from tests.test_forecasting import reference_forecast
+    from utils import forecasting
+
+    rng = np.random.default_rng(0)
+    rates = rng.uniform(0, 20, size=(args.series, 1))
+    history = rng.poisson(rates, size=(args.series, args.days)).astype(float)
+
+    started = time.perf_counter()
+    predicted = forecasting.forecast(history, args.horizon)
+    labels = forecasting.trend_labels(history)
+    matrix_s = time.perf_counter() - started
+
+    # The loop is slow, so time a sample and scale it up
+    sample = history[: args.loop_sample]
+    started = time.perf_counter()
+    expected = [reference_forecast(row, args.horizon) for row in sample]
+    loop_s = (time.perf_counter() - started) * args.series / len(sample)
+
+    report = {
+        "series": args.series,
+        "days": args.days,
+        "matrix_ms": round(matrix_s * 1000, 1),
+        "loop_ms_estimated": round(loop_s * 1000, 1),
+        "speedup": round(loop_s / matrix_s, 1),
+        "max_abs_diff": float(np.abs(predicted[: len(sample)] - expected).max()),
+        "trend_labels": len(labels),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
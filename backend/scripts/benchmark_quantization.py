@@ -0,0 +1,120 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app"))
+)
+
+from utils.quantization import (  # noqa: E402
+    QuantizedIndex,
+    normalize_rows,
+    rerank_exact,
+)
+
+
+def load_index_vectors(store: str) -> np.ndarray:
+    if store == "sqlite":
+        from utils.vector_store_sqlite import _connect, init_db
+
+        init_db()
+        with _connect() as conn:
+            rows = conn.execute("SELECT embedding FROM embeddings").fetchall()
+        vectors = [json.loads(r[0] or "[]") for r in rows]
+    else:
+        from utils.vector_store import all_items
+
+        vectors = [it.get("embedding") or [] for it in all_items()]
+    vectors = [v for v in vectors if v and any(v)]
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def synthetic_catalogue(n: int, dim: int, categories: int, seed: int) -> np.ndarray:
+    """Clustered vectors shaped like product embeddings (one cluster per category)."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(categories, dim)).astype(np.float32)
+    labels = rng.integers(0, categories, size=n)
+    noise = rng.normal(scale=0.8, size=(n, dim)).astype(np.float32)
+    return centers[labels] + noise
+
+
+def recall_at_k(vectors: np.ndarray, queries: np.ndarray, config: dict, k: int):
+    exact = normalize_rows(vectors)
+    started = time.perf_counter()
+    qindex = QuantizedIndex.build(vectors, config)
+    build_s = time.perf_counter() - started
+
+    truths = [set(np.argsort(-(exact @ q))[:k]) for q in normalize_rows(queries)]
+    hits = 0
+    started = time.perf_counter()
+    for q, truth in zip(queries, truths):
+        candidates = qindex.search(q.tolist(), max(k, config["rerank"]))
+        if config["rerank"]:
+            candidates = rerank_exact(
+                q.tolist(), candidates, exact[[row for row, _ in candidates]]
+            )
+        hits += len(truth & {row for row, _ in candidates[:k]})
+    query_ms = (time.perf_counter() - started) * 1000 / len(queries)
+
+    return {
+        **qindex.memory_report(),
+        "recall_at_k": round(hits / (k * len(queries)), 4),
+        "build_seconds": round(build_s, 2),
+        "query_ms": round(query_ms, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure memory reduction and recall loss of vector quantization"
+    )
+    parser.add_argument("--store", choices=["sqlite", "json", "synthetic"])
+    parser.add_argument("--size", type=int, default=5000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--rerank", type=int, default=100)
+    args = parser.parse_args()
+
+    store = args.store or os.getenv("VECTOR_STORE", "sqlite")
+    vectors = np.empty((0, 0))
+    if store != "synthetic":
+        vectors = load_index_vectors(store)
+    if len(vectors) < args.k * 5:
+        store = "synthetic"
+        vectors = synthetic_catalogue(args.size, args.dim, categories=40, seed=7)
+
+    rng = np.random.default_rng(11)
+    picks = rng.choice(len(vectors), min(args.queries, len(vectors)), replace=False)
+    queries = vectors[picks] + rng.normal(scale=0.3, size=vectors[picks].shape)
+
+    dim = vectors.shape[1]
+    configs = {
+        "int8": {"quantization": "int8", "rerank": 0},
+        "int8+rerank": {"quantization": "int8", "rerank": args.rerank},
+        "pq": {"quantization": "pq", "pq_subvectors": dim // 8, "rerank": 0},
+        "pq+rerank": {
+            "quantization": "pq",
+            "pq_subvectors": dim // 8,
+            "rerank": args.rerank,
+        },
+    }
+    report = {
+        "source": store,
+        "vectors": int(len(vectors)),
+        "dim": int(dim),
+        "k": args.k,
+        "results": {
+            name: recall_at_k(vectors, queries, config, args.k)
+            for name, config in configs.items()
+        },
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
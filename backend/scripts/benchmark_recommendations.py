@@ -0,0 +1,92 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app"))
+)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def _products(size: int, categories: int, brands: int):
+    rng = np.random.default_rng(0)
+    price = rng.uniform(1, 100, size).round(2)
+    rating = rng.uniform(0, 5, size).round(1)
+    reviews = rng.integers(0, 200, size)
+    category = rng.integers(0, categories, size)
+    brand = rng.integers(0, brands, size)
+    return [
+        {
+            "id": f"p{i}",
+            "name": f"Product {i}",
+            "category": f"c{category[i]}",
+            "brand": f"b{brand[i]}",
+            "price": float(price[i]),
+            "rating": float(rating[i]),
+            "review_count": int(reviews[i]),
+        }
+        for i in range(size)
+    ]
+
+
+def _seconds(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare columnar and per-product recommendation scoring"
+    )
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--brands", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from controllers.ai_engine import AIEngine
+    from tests.test_recommendations import reference_recommendations
+    from utils.product_catalog import ProductCatalog
+
+    products = _products(args.size, args.categories, args.brands)
+    preferences = {
+        "categories": ["c1", "c7"],
+        "price_range": {"min": 10, "max": 60},
+        "purchase_history": [f"p{i}" for i in range(0, args.size, 997)],
+        "brands": ["b3", "b11", "b42"],
+    }
+    engine = AIEngine()
+
+    expected, loop_s = _seconds(
+        lambda: reference_recommendations(preferences, products)
+    )
+    catalog, build_s = _seconds(lambda: ProductCatalog(products))
+    timings = []
+    for _ in range(args.repeat):
+        result, seconds = _seconds(
+            lambda: engine.generate_recommendations(preferences, catalog)
+        )
+        timings.append(seconds)
+    from_list, list_s = _seconds(
+        lambda: engine.generate_recommendations(preferences, products)
+    )
+
+    report = {
+        "size": args.size,
+        "loop_ms": round(loop_s * 1000, 1),
+        "catalog_build_ms": round(build_s * 1000, 1),
+        "columnar_score_ms": round(min(timings) * 1000, 1),
+        "columnar_from_list_ms": round(list_s * 1000, 1),
+        "speedup_prebuilt": round(loop_s / min(timings), 1),
+        "identical": result == expected and from_list == expected,
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
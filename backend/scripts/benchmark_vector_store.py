@@ -0,0 +1,89 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app"))
+)
+
+
+def _items(vectors: np.ndarray, offset: int, categories: int):
+    return [
+        {
+            "id": f"p{offset + i}",
+            "text": f"product {offset + i}",
+            "embedding": v.tolist(),
+            "metadata": {
+                "category": f"c{(offset + i) % categories}",
+                "name": f"P{offset + i}",
+            },
+        }
+        for i, v in enumerate(vectors)
+    ]
+
+
+def _per_call_ms(fn, calls: int) -> float:
+    started = time.perf_counter()
+    for i in range(calls):
+        fn(i)
+    return round((time.perf_counter() - started) / calls * 1000, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure per-call overhead of the sqlite vector store"
+    )
+    parser.add_argument("--size", type=int, default=2000)
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--batch", type=int, default=200)
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--categories", type=int, default=20)
+    args = parser.parse_args()
+
+    # Point the store at a scratch database before importing it
+    tmp = tempfile.mkdtemp()
+    os.environ["VECTOR_DB_PATH"] = os.path.join(tmp, "bench.sqlite")
+    from utils import vector_store_sqlite as store
+
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(args.size, args.dim)).astype(np.float32)
+
+    started = time.perf_counter()
+    for start in range(0, args.size, args.batch):
+        store.upsert_embeddings(
+            _items(vectors[start : start + args.batch], start, args.categories)
+        )
+    bulk_s = time.perf_counter() - started
+
+    single = _items(vectors[:1], 0, args.categories)
+    queries = rng.normal(size=(args.calls, args.dim)).astype(np.float32)
+    report = {
+        "size": args.size,
+        "dim": args.dim,
+        "bulk_upsert_items_per_s": round(args.size / bulk_s),
+        "single_upsert_ms": _per_call_ms(
+            lambda i: store.upsert_embeddings(single), args.calls
+        ),
+        "config_read_ms": _per_call_ms(lambda i: store.get_index_config(), args.calls),
+        "get_item_ms": _per_call_ms(
+            lambda i: store.get_item(f"p{i % args.size}"), args.calls
+        ),
+        "filtered_query_ms": _per_call_ms(
+            lambda i: store.query_similar(
+                queries[i].tolist(),
+                top_k=5,
+                filter_meta={"category": f"c{i % args.categories}"},
+            ),
+            args.calls,
+        ),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
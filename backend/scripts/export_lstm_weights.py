@@ -0,0 +1,32 @@
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app"))
+)
+
+ML_MODELS = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "ml_models")
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export demand_model.h5 and its scaler to a NumPy .npz "
+        "(needs h5py and joblib, not TensorFlow)"
+    )
+    parser.add_argument("--model", default=os.path.join(ML_MODELS, "demand_model.h5"))
+    parser.add_argument("--scaler", default=os.path.join(ML_MODELS, "scaler.save"))
+    parser.add_argument("--out", default=os.path.join(ML_MODELS, "demand_model.npz"))
+    args = parser.parse_args()
+
+    from utils import lstm_inference
+
+    shapes = lstm_inference.export(args.model, args.scaler, args.out)
+    print(json.dumps({"out": args.out, "arrays": shapes}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
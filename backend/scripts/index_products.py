@@ -1,14 +1,25 @@
 import argparse
 import json
 import os
-from typing import Any, Dict, List
+import sys
+from typing import Any, Dict, List, Optional
 
 try:
     from openai import OpenAI  # SDK v1.x
 except Exception:  # pragma: no cover
     OpenAI = None  # type: ignore
 
-from utils.vector_store import upsert_embeddings as upsert_json
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app"))
+)
+
+from utils.embedding_cache import embed_with_cache, text_hash  # noqa: E402
+from utils.embedding_pipeline import EmbeddingPipeline, openai_embedder  # noqa: E402
+from utils.local_embeddings import (  # noqa: E402
+    get_local_embedder,
+    remote_embeddings_enabled,
+)
+from utils.vector_store import upsert_embeddings as upsert_json  # noqa: E402
 
 try:
     from utils.vector_store_sqlite import upsert_embeddings as upsert_sqlite
@@ -21,7 +32,7 @@ except Exception:
 
 def get_embeddings_client():
     api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key or not OpenAI:
+    if not api_key or not OpenAI or not remote_embeddings_enabled():
         return None
     try:
         return OpenAI(api_key=api_key)
@@ -29,19 +40,19 @@ def get_embeddings_client():
         return None
 
 
-def embed_texts(client, texts: List[str]) -> List[List[float]]:
+def get_pipeline(client, concurrency: Optional[int] = None) -> EmbeddingPipeline:
+    model = os.getenv("EMBEDDINGS_MODEL", "text-embedding-3-small")
+    return EmbeddingPipeline(
+        openai_embedder(client, model), model=model, concurrency=concurrency
+    )
+
+
+def embed_texts(client, texts: List[str]) -> List[Optional[List[float]]]:
     if not texts:
         return []
-    model = os.getenv("EMBEDDINGS_MODEL", "text-embedding-3-small")
     if not client:
-        dim = 1536
-        return [[0.0] * dim for _ in texts]
-    try:
-        resp = client.embeddings.create(model=model, input=texts)
-        return [d.embedding for d in resp.data]
-    except Exception:  # pragma: no cover
-        dim = 1536
-        return [[0.0] * dim for _ in texts]
+        return get_local_embedder().embed(texts)
+    return get_pipeline(client).embed(texts)
 
 
 def build_items(products: List[Dict[str, Any]], embeddings: List[List[float]]):
@@ -80,6 +91,17 @@ def main():
         default=os.getenv("VECTOR_STORE", "sqlite"),
         help="Vector store backend",
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Re-embed every product instead of reusing cached embeddings",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=None,
+        help="Parallel embedding requests (default: EMBEDDINGS_CONCURRENCY or 4)",
+    )
     args = parser.parse_args()
 
     path = args.file
@@ -92,19 +114,77 @@ def main():
             products = products["products"]
 
     client = get_embeddings_client()
+    if args.store == "sqlite" and SQLITE_AVAILABLE and upsert_sqlite:
+        upsert, backend = upsert_sqlite, "sqlite"
+    else:
+        upsert, backend = upsert_json, "json"
+
     texts = [
         f"Name: {p.get('name','')}\nCategory: {p.get('category','Unknown')}\nDescription: {p.get('description','')}"
         for p in products
     ]
-    embs = embed_texts(client, texts)
-    items = build_items(products, embs)
-    if args.store == "sqlite" and SQLITE_AVAILABLE and upsert_sqlite:
-        written = upsert_sqlite(items)
-        backend = "sqlite"
+    stats = None
+    written = 0
+    if not client:
+        embedder = get_local_embedder()
+        embedder.fit(texts)
+        written = upsert(build_items(products, embedder.embed(texts)))
+        print(f"Embedded locally with {embedder.model}")
     else:
-        written = upsert_json(items)
-        backend = "json"
+        # Finished batches are upserted as they arrive; with the cache enabled
+        # a rerun after an interruption only embeds what is still missing.
+        by_hash: Dict[str, List[Dict[str, Any]]] = {}
+        for p, text in zip(products, texts):
+            by_hash.setdefault(text_hash(text), []).append(p)
+
+        def write_items(batch: List[Dict[str, Any]], vectors: List[List[float]]):
+            nonlocal written
+            written += upsert(build_items(batch, vectors))
+
+        def write_batch(hashes: List[str], embeddings: List[List[float]]) -> None:
+            write_items(
+                [p for h in hashes for p in by_hash[h]],
+                [emb for h, emb in zip(hashes, embeddings) for _ in by_hash[h]],
+            )
+
+        pipeline = get_pipeline(client, args.concurrency)
+        if args.no_cache:
+            pipeline.embed(
+                texts,
+                on_batch=lambda positions, embs: write_items(
+                    [products[i] for i in positions], embs
+                ),
+            )
+            failed = pipeline.stats["failed_texts"]
+            if failed:
+                print(f"{failed} products were not indexed: embedding failed")
+        else:
+            model = os.getenv("EMBEDDINGS_MODEL", "text-embedding-3-small")
+            _, stats = embed_with_cache(texts, model, pipeline, on_batch=write_batch)
     print(f"Indexed {written} items into vector store ({backend})")
+    if stats:
+        report_cache_stats(stats)
+
+
+def report_cache_stats(stats: Dict[str, Any]) -> None:
+    line = (
+        f"Embedding cache: {stats['hits']}/{stats['texts']} hits "
+        f"({stats['hit_rate']:.1%}), {stats['embedded']} texts embedded in "
+        f"{stats['embed_seconds']}s, ~{stats['time_saved_seconds']}s saved"
+    )
+    if stats.get("failed"):
+        line += f"; {stats['failed']} texts failed and were not indexed"
+    if "pipeline" in stats:
+        p = stats["pipeline"]
+        line += (
+            f"; {p['batches']} batches, {p['retries']} retries "
+            f"({p['rate_limited']} rate limited), {p['failed_batches']} failed"
+        )
+    print(line)
+    summary_path = os.getenv("GITHUB_STEP_SUMMARY")
+    if summary_path:
+        with open(summary_path, "a", encoding="utf-8") as f:
+            f.write(f"### Embeddings reindex\n\n{line}\n")
 
 
 if __name__ == "__main__":
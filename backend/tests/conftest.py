@@ -1,8 +1,23 @@
 import os
+from datetime import date, datetime, timedelta
 from unittest.mock import Mock, patch
 
 import pytest
 
+# Reference day for sales built with sale()
+TODAY = date(2024, 3, 31)
+
+
+def sale(days_ago, quantity, product="p1", store="s1"):
+    """A sale document ``days_ago`` days before TODAY, mid-morning."""
+    day = datetime.combine(TODAY - timedelta(days=days_ago), datetime.min.time())
+    return {
+        "product_id": product,
+        "store_id": store,
+        "date": (day + timedelta(hours=10)).isoformat(),
+        "quantity": quantity,
+    }
+
 
 @pytest.fixture(scope="session")
 def app():
@@ -28,6 +43,45 @@ def app():
         yield app
 
 
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Cached recommendations and forecasts must not leak between tests' mocks."""
+    from utils.forecast_cache import forecast_cache
+    from utils.recommendation_cache import recommendation_cache
+
+    recommendation_cache.clear()
+    forecast_cache.clear()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def local_stores(tmp_path, monkeypatch):
+    """
+    Point every local store at this test's tmp_path, so no test reads or
+    writes backend/data (a backfilled rollup there changes forecasts).
+    """
+    stores = {
+        "SALES_ROLLUP_DB_PATH": "sales.sqlite",
+        "HOLT_WINTERS_DB_PATH": "hw.sqlite",
+        "CO_PURCHASE_DB_PATH": "co.sqlite",
+        "VECTOR_DB_PATH": "index.sqlite",
+        "EMBEDDING_CACHE_PATH": "embeddings.sqlite",
+        "LOCAL_EMBEDDINGS_PATH": "idf.npz",
+        "PRODUCT_SIMILARITY_PATH": "sim.joblib",
+        "FORECAST_MODEL_DIR": "forecast_models",
+    }
+    for env, name in stores.items():
+        monkeypatch.setenv(env, str(tmp_path / name))
+
+
+@pytest.fixture
+def rollup():
+    """The daily sales rollup, on this test's fresh database."""
+    from utils import sales_rollup
+
+    return sales_rollup
+
+
 @pytest.fixture
 def client(app):
     """Test client for the Flask application."""
@@ -0,0 +1,110 @@
+"""
+Local stand-in for the OpenAI embeddings endpoint.
+
+Point the SDK at it with ``OPENAI_BASE_URL=http://127.0.0.1:<port>/v1`` to
+exercise the indexing pipeline offline:
+
+    python -m tests.embeddings_stub --port 8089 --rate-limit-every 5
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def stub_embedding(text, dim):
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    return [(digest[i % len(digest)] - 127.5) / 127.5 for i in range(dim)]
+
+
+class StubEmbeddingsServer(ThreadingHTTPServer):
+    """Deterministic embeddings; every Nth request is answered with a 429."""
+
+    daemon_threads = True
+
+    def __init__(self, port=0, dim=8, rate_limit_every=0, retry_after="0"):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.dim = dim
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.requests = 0
+        self.batch_sizes = []
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, headers=None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+
+        with server.lock:
+            server.requests += 1
+            limited = (
+                server.rate_limit_every
+                and server.requests % server.rate_limit_every == 0
+            )
+            if not limited:
+                server.batch_sizes.append(len(inputs))
+        if limited:
+            self._send(
+                429,
+                {"error": {"message": "Rate limit reached", "type": "requests"}},
+                {"retry-after": server.retry_after},
+            )
+            return
+
+        self._send(
+            200,
+            {
+                "object": "list",
+                "model": body.get("model"),
+                "data": [
+                    {
+                        "object": "embedding",
+                        "index": i,
+                        "embedding": stub_embedding(text, server.dim),
+                    }
+                    for i, text in enumerate(inputs)
+                ],
+                "usage": {"prompt_tokens": 0, "total_tokens": 0},
+            },
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub embeddings server")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--rate-limit-every", type=int, default=0)
+    args = parser.parse_args()
+    server = StubEmbeddingsServer(args.port, args.dim, args.rate_limit_every)
+    print(f"Stub embeddings server on {server.base_url}")
+    server.serve_forever()
@@ -351,13 +351,17 @@ class TestAdminEndpoints:
         """Test database initialization."""
         mock_firebase.create_document.side_effect = ["prod-1", "prod-2", "prod-3"]
 
-        response = client.post("/api/admin/init-db")
+        with patch("routes.admin_routes.queue_similarity_refresh") as refresh:
+            response = client.post("/api/admin/init-db")
         assert response.status_code == 201
 
         data = json.loads(response.data)
         assert data["message"] == "Database initialized successfully"
         assert data["products_created"] == 3
         assert len(data["products"]) == 3
+        # The new products are queued for the substitute index
+        (queued,), _ = refresh.call_args
+        assert [p["id"] for p in queued] == ["prod-1", "prod-2", "prod-3"]
 
 
 class TestErrorHandlers:
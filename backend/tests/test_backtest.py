@@ -0,0 +1,77 @@
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+from utils import backtest
+
+SCRIPT = os.path.join(
+    os.path.dirname(__file__), "..", "scripts", "backtest_forecasting.py"
+)
+
+
+def test_rolling_origin_scores_only_unseen_days():
+    seen = []
+
+    def last_value(history, horizon):
+        seen.append(len(history))
+        return [history[-1]] * horizon
+
+    series = {"flat": [5.0] * 40, "ramp": list(range(1, 41)), "short": [1.0] * 10}
+    result = backtest.backtest(last_value, series, horizon=5, min_train=20, step=5)
+
+    assert backtest.origins(40, 5, 20, 5) == [20, 25, 30, 35]
+    assert result["skipped"] == ["short"]
+    assert result["windows"] == 8
+    assert set(seen) == {20, 25, 30, 35}
+    assert result["per_series"]["flat"]["rmse"] == 0
+    # Forecasting the last seen value of 1..40 is 1..5 days behind
+    ramp = result["per_series"]["ramp"]
+    assert np.isclose(ramp["rmse"], np.sqrt(np.mean(np.arange(1, 6) ** 2)))
+    assert result["total_seconds"] >= 0 and result["peak_memory_bytes"] >= 0
+
+
+def test_compare_flags_only_regressions():
+    baseline = {
+        "models": {"synthetic/a": {"mape": 0.2, "rmse": 10, "total_seconds": 1}}
+    }
+    report = {
+        "models": {
+            "synthetic/a": {"mape": 0.3, "rmse": 9, "total_seconds": 1.2},
+            "synthetic/new": {"mape": 9, "rmse": 9, "total_seconds": 9},
+        }
+    }
+    regressions = backtest.compare(report, baseline)
+    assert len(regressions) == 1 and regressions[0].startswith("synthetic/a.mape")
+
+
+def test_cli_writes_json_and_fails_on_regression(tmp_path):
+    out = tmp_path / "report.json"
+    args = [
+        sys.executable,
+        SCRIPT,
+        "--models",
+        "smoothing,holt_winters",
+        "--synthetic",
+        "3",
+        "--days",
+        "90",
+        "--summary-only",
+        "--output",
+        str(out),
+    ]
+    subprocess.run(args, check=True, capture_output=True)
+    report = json.loads(out.read_text())
+    assert set(report["models"]) == {"synthetic/smoothing", "synthetic/holt_winters"}
+    assert report["models"]["synthetic/smoothing"]["windows"] == 3 * 3
+
+    report["models"]["synthetic/smoothing"]["rmse"] /= 2
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps(report))
+    run = subprocess.run(
+        args + ["--baseline", str(baseline)], capture_output=True, text=True
+    )
+    assert run.returncode == 1
+    assert "synthetic/smoothing.rmse" in json.loads(run.stdout)["regressions"][0]
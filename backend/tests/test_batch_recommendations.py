@@ -0,0 +1,79 @@
+import json
+
+from utils.batch_recommendations import batch_recommendations, similar_products
+from utils.product_catalog import ProductCatalog
+
+from tests.test_recommendations import _catalogue, reference_recommendations
+
+
+def reference_similar(product, products, k=5):
+    """The per-product loop of /api/v2/recommendations/<id>."""
+    scored = []
+    for p in products:
+        if p.get("id") != product["id"]:
+            score = 0
+            if p.get("category") == product.get("category"):
+                score += 5
+            price_diff = abs(p.get("price", 0) - product.get("price", 0))
+            if price_diff <= product.get("price", 0) * 0.2:
+                score += 3
+            if score > 0:
+                scored.append(dict(p, recommendation_score=score))
+    scored.sort(key=lambda x: x["recommendation_score"], reverse=True)
+    return scored[:k]
+
+
+def test_vectorized_lists_match_per_product_loop(monkeypatch):
+    products = _catalogue(300)
+    catalog = ProductCatalog(products)
+    # Small blocks exercise the chunked scoring path
+    monkeypatch.setattr("utils.batch_recommendations.BLOCK_CELLS", 1000)
+
+    ids = ["p3", "missing", "p120", "p299"]
+    results = similar_products(catalog, ids, k=7)
+
+    assert results[1] == {"product_id": "missing", "error": "Product not found"}
+    for pid, result in zip(ids, results):
+        if pid != "missing":
+            product = products[int(pid[1:])]
+            assert result["recommendations"] == reference_similar(product, products, 7)
+
+
+def test_process_pool_yields_same_results_in_order():
+    products = _catalogue(200)
+    catalog = ProductCatalog(products)
+    ids = [f"p{i}" for i in range(0, 200, 2)]
+    profiles = [{"categories": ["c1"]}, {"brands": ["b2"], "purchase_history": ["p1"]}]
+
+    inline = list(batch_recommendations(catalog, ids, profiles, k=3))
+    pooled = list(batch_recommendations(catalog, ids, profiles, k=3, workers=2))
+
+    assert pooled == inline
+    assert [r["product_id"] for r in inline[: len(ids)]] == ids
+    assert inline[-1]["recommendations"] == reference_recommendations(
+        profiles[1], products
+    )
+
+
+def test_batch_endpoint_streams_ndjson(client, mock_firebase):
+    products = _catalogue(50)
+    mock_firebase.get_documents.return_value = products
+
+    resp = client.post(
+        "/api/products/recommendations/batch",
+        json={"product_ids": ["p1", "p2", "nope"], "profiles": [{}], "limit": 2},
+    )
+    assert resp.status_code == 200
+    assert resp.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+    assert [line.get("product_id", line.get("profile")) for line in lines] == [
+        "p1",
+        "p2",
+        "nope",
+        0,
+    ]
+    assert len(lines[0]["recommendations"]) == 2
+    assert mock_firebase.get_documents.call_count == 1
+
+    resp = client.post("/api/products/recommendations/batch", json={})
+    assert resp.status_code == 400
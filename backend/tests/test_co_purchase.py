@@ -0,0 +1,100 @@
+import pytest
+
+from utils import co_purchase
+
+BASKETS = [
+    ["milk", "bread", "butter"],
+    ["milk", "bread"],
+    ["milk", "cereal"],
+    ["bread", "butter"],
+    ["milk", "bread", "butter", "jam"],
+    ["cereal"],
+]
+
+
+@pytest.fixture
+def co_db(tmp_path, monkeypatch):
+    monkeypatch.setenv("CO_PURCHASE_DB_PATH", str(tmp_path / "co.sqlite"))
+    return co_purchase
+
+
+def test_incremental_counts_match_nightly_rebuild(co_db):
+    for basket in BASKETS:
+        co_db.record_order({"items": [{"product_id": p} for p in basket]})
+    incremental = co_db.frequently_bought_together("milk", min_count=1)
+
+    co_db.rebuild([{"items": [{"product_id": p} for p in b]} for b in BASKETS])
+    assert co_db.frequently_bought_together("milk", min_count=1) == incremental
+
+
+def test_confidence_and_lift(co_db):
+    for basket in BASKETS:
+        co_db.record_basket(basket)
+
+    by_id = {
+        r["product_id"]: r
+        for r in co_db.frequently_bought_together("butter", min_count=1)
+    }
+    # butter is in 3 of 6 baskets, all with bread; bread is in 4 of 6
+    assert by_id["bread"]["count"] == 3
+    assert by_id["bread"]["confidence"] == 1.0
+    assert by_id["bread"]["lift"] == 1.5
+    assert by_id["jam"]["lift"] == 2.0
+
+    ranked = co_db.frequently_bought_together("butter", min_count=2)
+    assert [r["product_id"] for r in ranked] == ["bread", "milk"]
+    with pytest.raises(ValueError):
+        co_db.frequently_bought_together("butter", metric="support")
+
+
+def test_partner_lists_stay_bounded(co_db):
+    for i in range(20):
+        co_db.record_basket(["anchor", f"p{i}"], max_pairs=5)
+    for _ in range(3):
+        co_db.record_basket(["anchor", "p19"], max_pairs=5)
+
+    partners = co_db.frequently_bought_together("anchor", top_k=50, min_count=1)
+    assert len(partners) == 5
+    assert partners[0]["product_id"] == "p19"
+    assert partners[0]["count"] == 4
+
+
+def test_recommendations_endpoint_serves_bought_together(co_db, client, mock_firebase):
+    for basket in BASKETS:
+        co_db.record_basket(basket)
+    mock_firebase.get_document.side_effect = lambda collection, pid: {
+        "name": pid.title(),
+        "category": "Grocery",
+    }
+
+    resp = client.get("/api/recommendations/butter?limit=1&metric=confidence")
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert [p["id"] for p in data] == ["bread"]
+    assert data[0]["bought_together"]["confidence"] == 1.0
+
+    resp = client.get("/api/recommendations/butter?metric=support")
+    assert resp.status_code == 400
+
+
+def test_unknown_product_falls_back_to_every_other_product(client, mock_firebase):
+    mock_firebase.get_document.return_value = None
+    mock_firebase.get_documents.return_value = [{"id": f"p{i}"} for i in range(12)]
+
+    resp = client.get("/api/recommendations/missing")
+    assert resp.status_code == 200
+    assert len(resp.get_json()) == 12
+
+
+def test_orders_are_recorded_inline(co_db, app, monkeypatch):
+    from routes import order_routes
+
+    order_routes._record_basket({"items": [{"product_id": p} for p in BASKETS[0]]})
+    order_routes._record_basket({"items": [{"product_id": p} for p in BASKETS[0]]})
+    assert co_db.frequently_bought_together("milk")[0]["count"] == 2
+
+    def fail(order):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(order_routes, "record_order", fail)
+    order_routes._record_basket({"items": [{"product_id": "milk"}]})
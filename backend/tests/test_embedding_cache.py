@@ -0,0 +1,122 @@
+from utils.embedding_cache import EmbeddingCache, embed_with_cache, text_hash
+
+
+class FakeEmbedder:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(t)), 1.0, 0.5] for t in texts]
+
+
+def test_only_new_or_changed_texts_are_embedded(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"))
+    embedder = FakeEmbedder()
+
+    first, stats = embed_with_cache(["a", "bb"], "m1", embedder, cache)
+    assert stats["hits"] == 0 and stats["embedded"] == 2
+
+    second, stats = embed_with_cache(["a", "bb", "ccc"], "m1", embedder, cache)
+    assert embedder.calls[-1] == ["ccc"]
+    assert stats["hits"] == 2
+    assert stats["hit_rate"] == round(2 / 3, 4)
+    assert second[:2] == first
+
+    # A different model never reuses another model's vectors
+    embed_with_cache(["a"], "m2", embedder, cache)
+    assert embedder.calls[-1] == ["a"]
+
+
+def test_zero_vector_fallbacks_are_not_cached(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"))
+
+    embed_with_cache(["a"], "m1", lambda texts: [[0.0, 0.0] for _ in texts], cache)
+
+    assert cache.size() == 0
+
+
+def test_query_cache_normalises_text_and_evicts_lru(tmp_path):
+    from utils.embedding_cache import QueryEmbeddingCache
+
+    cache = QueryEmbeddingCache(max_entries=2, persist=False)
+    calls = []
+
+    def embed(text):
+        calls.append(text)
+        return [float(len(calls)), 1.0]
+
+    first = cache.get_or_embed("Red  Shoes", "m1", embed)
+    assert cache.get_or_embed("red shoes ", "m1", embed) == first
+    cache.get_or_embed("blue hat", "m1", embed)
+    cache.get_or_embed("green scarf", "m1", embed)  # evicts "red shoes"
+    cache.get_or_embed("red shoes", "m1", embed)
+
+    assert len(calls) == 4
+    assert cache.stats()["hits"] == 1
+
+
+def test_query_cache_persists_to_disk(tmp_path):
+    from utils.embedding_cache import QueryEmbeddingCache
+
+    store = EmbeddingCache(str(tmp_path / "cache.sqlite"))
+    QueryEmbeddingCache(persist=True, store=store).get_or_embed(
+        "laptop stand", "m1", lambda t: [0.5, 0.5]
+    )
+
+    restarted = QueryEmbeddingCache(persist=True, store=store)
+    assert restarted.get_or_embed("Laptop Stand", "m1", lambda t: [9.0]) == [0.5, 0.5]
+
+
+def test_query_keys_do_not_collide_with_product_texts(tmp_path):
+    from utils.embedding_cache import QueryEmbeddingCache
+
+    store = EmbeddingCache(str(tmp_path / "cache.sqlite"))
+    store.put_many("m1", [text_hash("laptop stand")], [[0.5, 0.5]])
+
+    cache = QueryEmbeddingCache(persist=True, store=store)
+    assert cache.get_or_embed("laptop stand", "m1", lambda t: [0.1, 0.9]) == [0.1, 0.9]
+    assert store.get_many("m1", [text_hash("laptop stand")]) == {
+        text_hash("laptop stand"): [0.5, 0.5]
+    }
+
+
+def test_recommendations_reuse_the_stored_product_vector(
+    client, mock_firebase, tmp_path, monkeypatch
+):
+    from unittest.mock import patch
+
+    from utils import vector_store_sqlite
+
+    monkeypatch.setenv("VECTOR_STORE", "sqlite")
+    monkeypatch.setenv("VECTOR_DB_PATH", str(tmp_path / "index.sqlite"))
+    vector_store_sqlite.upsert_embeddings(
+        [
+            {
+                "id": "p1",
+                "text": "a",
+                "embedding": [1.0, 0.0],
+                "metadata": {"category": "shoes", "name": "A"},
+            },
+            {
+                "id": "p2",
+                "text": "b",
+                "embedding": [0.9, 0.1],
+                "metadata": {"category": "shoes", "name": "B"},
+            },
+            {
+                "id": "p3",
+                "text": "c",
+                "embedding": [1.0, 0.0],
+                "metadata": {"category": "hats", "name": "C"},
+            },
+        ]
+    )
+
+    with patch(
+        "routes.ai_routes._embed_texts", side_effect=AssertionError("no embedding call")
+    ):
+        resp = client.post("/ai/recommendations", json={"product_id": "p1"})
+
+    assert [r["id"] for r in resp.get_json()["recommendations"]] == ["p2"]
+    mock_firebase.get_document.assert_not_called()
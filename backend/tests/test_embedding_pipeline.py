@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+
+from tests.embeddings_stub import StubEmbeddingsServer, stub_embedding
+from utils.embedding_cache import EmbeddingCache, embed_with_cache
+from utils.embedding_pipeline import EmbeddingPipeline, make_batches, openai_embedder
+
+openai = pytest.importorskip("openai")
+
+
+@pytest.fixture
+def stub_server():
+    server = StubEmbeddingsServer(dim=8, rate_limit_every=3).start()
+    yield server
+    server.stop()
+
+
+def _texts(n):
+    return [
+        f"Name: Product {i}\nCategory: Test\nDescription: item {i}" for i in range(n)
+    ]
+
+
+def test_batches_are_bounded_by_tokens_and_items():
+    texts = ["x" * 400] * 10  # ~100 tokens each
+
+    assert [len(b) for b in make_batches(texts, max_tokens=250)] == [2] * 5
+    assert [len(b) for b in make_batches(texts, max_tokens=10_000, max_items=4)] == [
+        4,
+        4,
+        2,
+    ]
+    # An oversized text still gets a batch of its own
+    assert make_batches(["x" * 4000], max_tokens=10) == [[0]]
+
+
+def test_concurrent_batches_survive_rate_limits(stub_server):
+    client = openai.OpenAI(api_key="test", base_url=stub_server.base_url)
+    pipeline = EmbeddingPipeline(
+        openai_embedder(client, "stub"),
+        model="stub",
+        batch_tokens=60,
+        concurrency=3,
+    )
+    texts = _texts(40)
+    finished = []
+
+    embeddings = pipeline.embed(texts, on_batch=lambda pos, _: finished.append(pos))
+
+    assert embeddings == [stub_embedding(t, 8) for t in texts]
+    assert pipeline.stats["rate_limited"] > 0
+    assert pipeline.stats["failed_batches"] == 0
+    assert sorted(p for batch in finished for p in batch) == list(range(40))
+    assert sum(stub_server.batch_sizes) == 40
+
+
+class _Interrupted(Exception):
+    status_code = 400
+
+
+def test_interrupted_run_resumes_from_cache(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"))
+    texts = _texts(12)
+    calls = []
+
+    def flaky(batch):
+        calls.append(batch)
+        if len(calls) > 2:
+            raise _Interrupted("connection dropped")
+        return [stub_embedding(t, 8) for t in batch]
+
+    pipeline = EmbeddingPipeline(flaky, batch_items=3, concurrency=1)
+    stored = []
+    embeddings, stats = embed_with_cache(
+        texts,
+        "stub",
+        pipeline,
+        cache,
+        on_batch=lambda _, vectors: stored.extend(vectors),
+    )
+    assert cache.size() == 6
+    # Failed batches are reported, never handed on as placeholder vectors
+    assert embeddings[6:] == [None] * 6
+    assert stats["failed"] == 6 and pipeline.stats["failed_texts"] == 6
+    assert len(stored) == 6 and all(any(v) for v in stored)
+
+    resumed = []
+
+    def healthy(batch):
+        resumed.extend(batch)
+        return [stub_embedding(t, 8) for t in batch]
+
+    written = []
+    embeddings, stats = embed_with_cache(
+        texts,
+        "stub",
+        EmbeddingPipeline(healthy, batch_items=3, concurrency=2),
+        cache,
+        on_batch=lambda hashes, _: written.extend(hashes),
+    )
+
+    assert sorted(resumed) == sorted(texts[6:])
+    assert stats["hits"] == 6 and stats["pipeline"]["batches"] == 2
+    assert len(written) == 12
+    np.testing.assert_allclose(
+        embeddings, [stub_embedding(t, 8) for t in texts], rtol=1e-6
+    )
@@ -181,3 +181,37 @@ class TestFirebaseUtils:
         assert results[0]["name"] == "Filtered Product"
         assert results[0]["category"] == "Electronics"
         mock_collection.where.assert_called_with("category", "==", "Electronics")
+
+    @patch("firebase_admin.initialize_app")
+    @patch("firebase_admin.firestore.client")
+    def test_query_where(self, mock_firestore, mock_init):
+        """Test compound querying."""
+        mock_db = Mock()
+        mock_query = Mock()
+        mock_doc = Mock()
+
+        mock_db.collection.return_value = mock_query
+        mock_query.where.return_value = mock_query
+        mock_query.order_by.return_value = mock_query
+        mock_query.limit.return_value = mock_query
+        mock_query.stream.return_value = [mock_doc]
+
+        mock_doc.to_dict.return_value = {"store_id": "s1", "date": "2024-03-02"}
+        mock_doc.id = "sale-doc"
+
+        mock_firestore.return_value = mock_db
+
+        firebase = FirebaseUtils()
+        results = firebase.query_where(
+            "sales",
+            [("store_id", "==", "s1"), ("date", ">=", "2024-03-01")],
+            order_by="date",
+            limit=5,
+        )
+
+        assert results == [{"store_id": "s1", "date": "2024-03-02", "id": "sale-doc"}]
+        assert [c.args for c in mock_query.where.call_args_list] == [
+            ("store_id", "==", "s1"),
+            ("date", ">=", "2024-03-01"),
+        ]
+        mock_query.limit.assert_called_once_with(5)
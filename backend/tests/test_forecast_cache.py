@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+
+import pytest
+
+from utils.forecast_cache import ForecastCache, make_key
+
+
+def test_lru_invalidation_and_shared_disk(tmp_path, monkeypatch):
+    cache = ForecastCache(max_entries=2)
+    a, b, c = (make_key(pid, "m-1", [1.0, 2.0], 7) for pid in ("a", "b", "c"))
+    cache.put_many({a: {"v": 1}, b: {"v": 2}})
+    cache.get_many([a])
+    cache.put_many({c: {"v": 3}})
+    assert set(cache.get_many([a, b, c])) == {a, c}  # b was least recent
+
+    assert make_key("a", "m-1", [1.0, 2.5], 7) != a
+    assert cache.invalidate_products(["a"]) == 1
+    assert cache.get_many([a]) == {}
+
+    monkeypatch.setenv("FORECAST_CACHE_PATH", str(tmp_path / "forecasts.sqlite"))
+    writer, reader = ForecastCache(), ForecastCache()
+    writer.put_many({a: {"v": 1}, b: {"v": 2}})
+    assert reader.get_many([a, b]) == {a: {"v": 1}, b: {"v": 2}}
+    writer.invalidate_products(["b"])
+    assert ForecastCache().get_many([a, b]) == {a: {"v": 1}}
+
+
+def test_forecasts_report_cached_and_refresh_on_sale(rollup, app):
+    from controllers.inventory_controller import InventoryController
+
+    controller = InventoryController()
+    controller.firebase = Mock()
+    today = datetime.now()
+    sales = [
+        {
+            "product_id": "p1",
+            "date": (today - timedelta(days=d)).isoformat(),
+            "quantity": 4,
+        }
+        for d in range(20)
+    ]
+    controller.firebase.query_documents.return_value = sales
+
+    first = controller.forecast_demand(["p1"], 7)["p1"]
+    second = controller.forecast_demand(["p1"], 7)["p1"]
+    assert not first["cached"] and second["cached"]
+    assert second["forecast"] == first["forecast"]
+    assert not controller.forecast_demand(["p1"], 14)["p1"]["cached"]
+
+    controller.firebase.create_document.return_value = "sale-1"
+    controller.record_sale({"product_id": "p1", "quantity": 9})
+    sales.append({"product_id": "p1", "date": today.isoformat(), "quantity": 9})
+    refreshed = controller.forecast_demand(["p1"], 7)["p1"]
+    assert not refreshed["cached"]
+    assert refreshed["forecast"] != first["forecast"]
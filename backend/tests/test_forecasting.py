@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+from utils import forecasting
+
+
+def reference_forecast(values, days_ahead, alpha=0.3):
+    """The original per-series smoothing and horizon loops."""
+    data = pd.Series(values)
+    level = data.iloc[0]
+    for i in range(1, len(data)):
+        level = alpha * data.iloc[i] + (1 - alpha) * level
+    recent = data.tail(10)
+    slope = np.polyfit(np.arange(len(recent)), recent.values, 1)[0]
+    trend = slope / max(np.mean(recent.values), 1) * 0.01
+    out = []
+    for _ in range(days_ahead):
+        level = level * (1 + trend)
+        out.append(max(0, level))
+    return out
+
+
+def reference_trend(sales):
+    recent_avg = np.mean(sales[-10:])
+    older_avg = np.mean(sales[-30:-20]) if len(sales) >= 30 else np.mean(sales[:-10])
+    if recent_avg > older_avg * 1.1:
+        return "increasing"
+    if recent_avg < older_avg * 0.9:
+        return "decreasing"
+    return "stable"
+
+
+def test_matrix_forecast_matches_per_series_loop():
+    rng = np.random.default_rng(0)
+    history = rng.poisson(rng.uniform(0, 20, size=(50, 1)), size=(50, 91)).astype(float)
+    # A steep decline exercises the floor at zero
+    history[0] = np.linspace(100, 0, 91)
+
+    predicted = forecasting.forecast(history, 30)
+
+    assert predicted.shape == (50, 30)
+    for row, values in zip(predicted, history):
+        np.testing.assert_allclose(row, reference_forecast(values, 30), atol=1e-9)
+    assert forecasting.trend_labels(history) == [reference_trend(h) for h in history]
+
+
+def test_inventory_forecast_endpoint(client, mock_firebase):
+    today = pd.Timestamp.now().normalize()
+    sales = [
+        {
+            "product_id": "p1",
+            "date": (today - pd.Timedelta(days=d)).isoformat(),
+            "quantity": 5,
+        }
+        for d in range(15)
+    ]
+    mock_firebase.query_documents.side_effect = lambda coll, field, op, pid: (
+        sales if pid == "p1" else []
+    )
+
+    resp = client.post(
+        "/api/inventory/forecast", json={"product_ids": ["p1", "p2"], "days_ahead": 7}
+    )
+    assert resp.status_code == 200
+    data = resp.get_json()["data"]
+    assert len(data["p1"]["forecast"]) == 7
+    assert data["p1"]["confidence"] == "high"
+    assert data["p1"]["trend"] == "increasing"
+    assert data["p2"]["trend"] == "stable"
+    assert data["p2"]["forecast"] == [0.0] * 7
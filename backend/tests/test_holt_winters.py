@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from controllers.ai_engine import AIEngine
+from utils import forecasting, holt_winters
+
+WEEK = np.array([1.0, 1.0, 1.1, 1.2, 1.5, 2.0, 1.8])
+
+
+def _seasonal(n, days=120, seed=1):
+    rng = np.random.default_rng(seed)
+    t = np.arange(days)
+    return (20 + 0.1 * t) * WEEK[t % 7] + rng.normal(0, 1, (n, days))
+
+
+@pytest.fixture
+def params_db(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOLT_WINTERS_DB_PATH", str(tmp_path / "hw.sqlite"))
+    return holt_winters
+
+
+def test_fit_captures_weekly_seasonality():
+    history = _seasonal(20)
+    history[0] -= 30  # negative values rule out multiplicative seasonality
+    train, test = history[:, :-14], history[:, -14:]
+
+    params = holt_winters.fit(train)
+    assert params == [holt_winters.fit(row)[0] for row in train]
+    assert params[0]["mode"] == "additive"
+
+    predicted, _ = holt_winters.forecast(train, params, 14)
+    smoothed = forecasting.forecast(train, 14)
+    assert np.abs(predicted[1:] - test[1:]).mean() < 2
+    assert np.abs(smoothed[1:] - test[1:]).mean() > 5
+
+
+def test_parameters_are_reused_until_drift(params_db, monkeypatch):
+    engine = AIEngine()
+    history = _seasonal(3)
+    fits = []
+    fit = holt_winters.fit
+    monkeypatch.setattr(holt_winters, "fit", lambda h: fits.append(len(h)) or fit(h))
+
+    first = engine.holt_winters_forecast(history, 7, ["a", "b", "c"])
+    assert fits == [3]
+    assert set(params_db.load_params(["a", "b", "c"])) == {"a", "b", "c"}
+
+    again = engine.holt_winters_forecast(history, 7, ["a", "b", "c"])
+    np.testing.assert_allclose(again, first)
+    assert fits == [3]
+
+    # A level shift in one product's recent sales triggers its refit only
+    shifted = history.copy()
+    shifted[1, -10:] *= 3
+    engine.holt_winters_forecast(shifted, 7, ["a", "b", "c"])
+    assert fits == [3, 1]
+
+    with pytest.raises(ValueError):
+        engine.holt_winters_forecast(history[:, :10], 7)
+
+
+def test_forecast_endpoint_model_choice(params_db, client, mock_firebase):
+    today = pd.Timestamp.now().normalize()
+    sales = [
+        {
+            "product_id": "p1",
+            "date": (today - pd.Timedelta(days=d)).isoformat(),
+            "quantity": 5 + d % 7,
+        }
+        for d in range(60)
+    ]
+    mock_firebase.query_documents.side_effect = lambda coll, field, op, pid: sales
+
+    resp = client.post(
+        "/api/inventory/forecast",
+        json={"product_ids": ["p1"], "days_ahead": 7, "model": "holt_winters"},
+    )
+    assert resp.status_code == 200
+    assert resp.get_json()["data"]["p1"]["model"] == "holt_winters"
+
+    resp = client.post(
+        "/api/inventory/forecast", json={"product_ids": ["p1"], "model": "arima"}
+    )
+    assert resp.status_code == 400
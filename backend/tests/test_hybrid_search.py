@@ -0,0 +1,144 @@
+from unittest.mock import patch
+
+import pytest
+
+from controllers.ai_engine import AIEngine
+from utils.hybrid_search import (
+    apply_filters,
+    category_key,
+    hybrid_search,
+    reciprocal_rank_fusion,
+)
+
+CATALOGUE = [
+    {
+        "id": "p1",
+        "name": "Trail Running Shoe",
+        "category": "Shoes",
+        "price": 120.0,
+        "description": "lightweight runner for trails",
+    },
+    {
+        "id": "p2",
+        "name": "Road Running Shoe",
+        "category": "Shoes",
+        "price": 90.0,
+        "description": "cushioned daily trainer",
+    },
+    {
+        "id": "p3",
+        "name": "Hiking Boot",
+        "category": "Shoes",
+        "price": 150.0,
+        "description": "waterproof boot for rough trails",
+    },
+    {
+        "id": "p4",
+        "name": "Running Socks",
+        "category": "Apparel",
+        "price": 12.0,
+        "description": "moisture wicking",
+    },
+]
+
+
+def _semantic(hits):
+    calls = []
+
+    def search(query, top_k, filters):
+        calls.append(filters)
+        return [
+            h
+            for h in hits
+            if not filters or h["metadata"]["category"] == filters["category"]
+        ][:top_k]
+
+    search.calls = calls
+    return search
+
+
+def _hit(pid, score):
+    product = next(p for p in CATALOGUE if p["id"] == pid)
+    # Indexed metadata holds the case-folded category
+    metadata = {"category": category_key(product["category"])}
+    return {"id": pid, "score": score, "metadata": metadata}
+
+
+def test_rrf_rewards_documents_ranked_by_both_retrievers():
+    fused = reciprocal_rank_fusion({"lexical": ["a", "b"], "semantic": ["b", "c"]})
+    assert max(fused, key=fused.get) == "b"
+
+
+def test_filters_apply_before_either_retriever_scores():
+    semantic = _semantic([_hit("p3", 0.9), _hit("p1", 0.8), _hit("p4", 0.7)])
+    scored = []
+
+    def lexical(query, products):
+        scored.extend(p["id"] for p in products)
+        return AIEngine().search_products(query, products)
+
+    out = hybrid_search(
+        "trail", lambda: CATALOGUE, lexical, semantic, category="Shoes", max_price=130
+    )
+
+    assert sorted(scored) == ["p1", "p2"]
+    assert semantic.calls == [{"category": "shoes"}]
+    assert [r["id"] for r in out["results"]] == ["p1"]
+
+
+def test_category_filter_ignores_case_on_both_retrievers():
+    semantic = _semantic([_hit("p3", 0.9), _hit("p1", 0.8), _hit("p4", 0.7)])
+
+    out = hybrid_search(
+        "trail",
+        lambda: CATALOGUE,
+        AIEngine().search_products,
+        semantic,
+        category="SHOES",
+    )
+
+    assert semantic.calls == [{"category": "shoes"}]
+    assert out["candidates"]["semantic"] == 2
+    assert {r["id"] for r in out["results"]} == {"p1", "p3"}
+
+
+@pytest.mark.parametrize("mode", ["rrf", "weighted"])
+def test_hybrid_ranks_items_found_by_both_first(mode):
+    # Lexically p1 and p2 both match "running shoe"; semantically p3 and p1
+    semantic = _semantic([_hit("p3", 0.92), _hit("p1", 0.9)])
+
+    out = hybrid_search(
+        "running shoe",
+        lambda: CATALOGUE,
+        AIEngine().search_products,
+        semantic,
+        top_k=3,
+        mode=mode,
+    )
+
+    assert out["results"][0]["id"] == "p1"
+    assert out["results"][0]["lexical_rank"] and out["results"][0]["semantic_rank"]
+    assert {r["id"] for r in out["results"]} == {"p1", "p2", "p3"}
+
+
+def test_hybrid_search_endpoint(client, mock_firebase):
+    mock_firebase.get_documents.return_value = CATALOGUE
+    with patch("routes.ai_routes._get_embeddings_client", return_value=object()), patch(
+        "routes.ai_routes._embed_texts", return_value=[[1.0, 0.0]]
+    ), patch(
+        "routes.ai_routes._query_store",
+        side_effect=lambda emb, k, filters: [_hit("p3", 0.9), _hit("p2", 0.8)],
+    ):
+        resp = client.post(
+            "/ai/hybrid-search", json={"query": "trail", "min_price": 100}
+        )
+
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body["retrievers"] == ["lexical", "semantic"]
+    assert [r["id"] for r in body["results"]] == ["p3", "p1"]
+
+    assert (
+        client.post("/ai/hybrid-search", json={"query": "x", "mode": "max"}).status_code
+        == 400
+    )
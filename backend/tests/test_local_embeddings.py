@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+from utils.local_embeddings import LocalEmbedder
+
+CATALOGUE = [
+    "Name: Wireless Headphones\nCategory: Electronics\nDescription: noise cancelling bluetooth over-ear headphones",
+    "Name: Bluetooth Earbuds\nCategory: Electronics\nDescription: wireless in-ear earbuds with charging case",
+    "Name: Cast Iron Skillet\nCategory: Kitchen\nDescription: pre-seasoned 12 inch frying pan",
+    "Name: Chef Knife\nCategory: Kitchen\nDescription: 8 inch stainless steel kitchen knife",
+    "Name: Yoga Mat\nCategory: Fitness\nDescription: non-slip exercise mat for yoga and pilates",
+]
+
+
+@pytest.mark.parametrize("method", ["hashing", "projection"])
+def test_related_products_embed_closer_than_unrelated(tmp_path, method):
+    embedder = LocalEmbedder(method, dim=256, state_path=str(tmp_path / "idf.npz"))
+    embedder.fit(CATALOGUE)
+    vectors = np.array(embedder.embed(CATALOGUE))
+    query = np.array(embedder.embed(["wireless bluetooth headphones"])[0])
+
+    assert vectors.shape == (5, 256)
+    np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), 1.0, rtol=1e-5)
+    assert set(np.argsort(-(vectors @ query))[:2]) == {0, 1}
+    assert embedder.embed(CATALOGUE[:1]) == embedder.embed(CATALOGUE[:1])
+
+
+def test_idf_weights_persist_across_instances(tmp_path):
+    path = str(tmp_path / "idf.npz")
+    fitted = LocalEmbedder("hashing", dim=128, state_path=path).fit(CATALOGUE)
+
+    reloaded = LocalEmbedder("hashing", dim=128, state_path=path)
+    assert reloaded.fitted
+    assert reloaded.embed(["yoga mat"]) == fitted.embed(["yoga mat"])
+    # Weights for another configuration are not reused
+    assert not LocalEmbedder("hashing", dim=64, state_path=path).fitted
+
+
+def test_semantic_search_without_api_key_uses_local_vectors(
+    client, mock_firebase, tmp_path, monkeypatch
+):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setenv("VECTOR_STORE", "sqlite")
+    monkeypatch.setenv("VECTOR_DB_PATH", str(tmp_path / "index.sqlite"))
+    monkeypatch.setenv("LOCAL_EMBEDDINGS_PATH", str(tmp_path / "idf.npz"))
+    products = [
+        {
+            "id": f"p{i}",
+            "name": t.split("\n")[0][6:],
+            "category": t.split("\n")[1][10:],
+            "description": t.split("\n")[2][13:],
+        }
+        for i, t in enumerate(CATALOGUE)
+    ]
+    mock_firebase.get_documents.return_value = products
+
+    resp = client.post("/ai/index-products", json={})
+    assert resp.get_json()["embeddings_model"] == "local-hashing-384"
+
+    resp = client.post("/ai/semantic-search", json={"query": "frying pan", "top_k": 1})
+    assert resp.get_json()["results"][0]["id"] == "p2"
+
+
+def test_other_instances_pick_up_a_refit(tmp_path):
+    path = str(tmp_path / "idf.npz")
+    serving = LocalEmbedder("hashing", dim=128, state_path=path)
+    assert not serving.fitted
+
+    LocalEmbedder("hashing", dim=128, state_path=path).fit(CATALOGUE[:2])
+    assert serving.fitted
+    refit = LocalEmbedder("hashing", dim=128, state_path=path).fit(CATALOGUE)
+    assert serving.embed(["yoga mat"]) == refit.embed(["yoga mat"])
+
+
+def test_partial_upload_fits_idf_on_full_catalogue(
+    client, mock_firebase, tmp_path, monkeypatch
+):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setenv("VECTOR_STORE", "sqlite")
+    monkeypatch.setenv("VECTOR_DB_PATH", str(tmp_path / "index.sqlite"))
+    monkeypatch.setenv("LOCAL_EMBEDDINGS_PATH", str(tmp_path / "idf.npz"))
+    products = [
+        {
+            "id": f"p{i}",
+            "name": t.split("\n")[0][6:],
+            "category": t.split("\n")[1][10:],
+            "description": t.split("\n")[2][13:],
+        }
+        for i, t in enumerate(CATALOGUE)
+    ]
+
+    mock_firebase.get_documents.return_value = []
+    resp = client.post("/ai/index-products", json={"products": products[:1]})
+    assert resp.status_code == 409
+
+    mock_firebase.get_documents.return_value = products
+    resp = client.post("/ai/index-products", json={"products": products[:1]})
+    assert resp.status_code == 200
+    full = LocalEmbedder("hashing", dim=384, state_path=str(tmp_path / "full.npz"))
+    full.fit(CATALOGUE)
+    served = LocalEmbedder("hashing", dim=384, state_path=str(tmp_path / "idf.npz"))
+    np.testing.assert_array_equal(served.idf, full.idf)
@@ -0,0 +1,70 @@
+import os
+
+import numpy as np
+import pytest
+from sklearn.preprocessing import MinMaxScaler
+
+from utils import lstm_inference
+
+ML_MODELS = os.path.join(os.path.dirname(__file__), "..", "..", "ml_models")
+
+
+def test_scaler_matches_sklearn():
+    rng = np.random.default_rng(0)
+    fitted = MinMaxScaler().fit(rng.uniform(50, 200, size=(100, 1)))
+    params = lstm_inference.MinMaxScalerParams(fitted.scale_, fitted.min_)
+    values = rng.uniform(0, 300, size=(10, 1))
+
+    np.testing.assert_allclose(params.transform(values), fitted.transform(values))
+    np.testing.assert_allclose(
+        params.inverse_transform(values), fitted.inverse_transform(values)
+    )
+
+
+def test_matches_keras_forward_pass():
+    tf = pytest.importorskip("tensorflow")
+
+    keras_model = tf.keras.Sequential(
+        [tf.keras.Input((10, 1)), tf.keras.layers.LSTM(8), tf.keras.layers.Dense(1)]
+    )
+    rng = np.random.default_rng(1)
+    weights = [rng.normal(0, 0.5, w.shape) for w in keras_model.get_weights()]
+    keras_model.set_weights(weights)
+    model = lstm_inference.NumpyLSTM(*weights)
+
+    x = rng.uniform(0, 1, size=(32, 10, 1))
+    np.testing.assert_allclose(
+        model.predict(x), keras_model.predict(x, verbose=0), atol=1e-5
+    )
+
+
+def test_exported_model_serves_predict_demand(client):
+    model, scaler = lstm_inference.load(os.path.join(ML_MODELS, "demand_model.npz"))
+    series = np.random.default_rng(2).uniform(50, 200, size=(16, 10))
+
+    batch = model.predict(scaler.transform(series.reshape(-1, 1)).reshape(16, 10))
+    single = [model.predict(scaler.transform(row.reshape(-1, 1)).T) for row in series]
+    np.testing.assert_allclose(batch, np.vstack(single))
+
+    resp = client.post("/predict-demand", json={"last_10_days": series[0].tolist()})
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert "note" not in body  # the model, not the heuristic fallback
+    expected = scaler.inverse_transform(batch[:1])[0, 0]
+    assert body["predicted_demand"] == round(float(expected), 2)
+
+
+def test_export_round_trip(tmp_path):
+    pytest.importorskip("h5py")
+
+    out = tmp_path / "model.npz"
+    lstm_inference.export(
+        os.path.join(ML_MODELS, "demand_model.h5"),
+        os.path.join(ML_MODELS, "scaler.save"),
+        str(out),
+    )
+    with np.load(out) as exported, np.load(
+        os.path.join(ML_MODELS, "demand_model.npz")
+    ) as shipped:
+        for name in shipped.files:
+            np.testing.assert_array_equal(exported[name], shipped[name])
@@ -0,0 +1,124 @@
+import json
+import os
+from datetime import date, timedelta
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+
+from utils import holt_winters, model_registry, model_training
+from utils.model_registry import ModelRegistry
+
+WEEK = np.array([1.0, 1.0, 1.1, 1.2, 1.5, 2.0, 1.8])
+
+
+def _series(n, days=90):
+    rng = np.random.default_rng(4)
+    t = np.arange(days)
+    levels = rng.uniform(5, 50, size=(n, 1))
+    return levels * WEEK[t % 7] + rng.normal(0, 1, (n, days))
+
+
+def test_parallel_training_publishes_versions(tmp_path):
+    series = {f"cat-{i}": row.tolist() for i, row in enumerate(_series(6))}
+    series["Home & Garden/too-short"] = [1.0] * 20
+
+    manifest = model_training.train_models(
+        series, group_by="category", workers=2, model_dir=str(tmp_path)
+    )
+    assert (manifest["trained"], manifest["failed"], manifest["workers"]) == (6, 1, 2)
+    short = manifest["models"]["Home & Garden/too-short"]
+    assert short["status"] == "failed" and "needs at least" in short["error"]
+    meta = manifest["models"]["cat-0"]
+    assert meta["validation"]["rmse"] < 3 and meta["validation"]["mape"] < 0.2
+    assert meta["train_seconds"] >= 0
+
+    root = tmp_path / "holt_winters"
+    assert (root / "LATEST").read_text() == manifest["version"]
+    on_disk = json.loads((root / manifest["version"] / "manifest.json").read_text())
+    assert on_disk["models"].keys() == series.keys()
+
+    registry = ModelRegistry(model_dir=str(tmp_path))
+    assert registry.metadata("cat-1")["status"] == "trained"
+    assert registry._models == {}  # nothing loaded until asked for
+    predicted = registry.forecast("cat-1", series["cat-1"], 7)
+    params = registry.get("cat-1")
+    expected = holt_winters.forecast(series["cat-1"], [params], 7)[0][0]
+    np.testing.assert_allclose(predicted, expected)
+    assert list(registry._models) == ["cat-1"]
+    assert registry.forecast("Home & Garden/too-short", [1.0] * 20, 7) is None
+
+    newer = model_training.train_models(
+        {"cat-9": series["cat-0"]}, workers=1, model_dir=str(tmp_path)
+    )
+    assert registry.get("cat-9") is not None and registry.get("cat-1") is None
+    assert registry.version == newer["version"]
+    assert len(os.listdir(root)) == 3  # both versions plus the pointer
+
+
+def test_load_series_by_category(rollup):
+    end = date(2024, 3, 31)
+    rollup.backfill(
+        [
+            {"product_id": "a", "store_id": "s1", "date": "2024-03-31", "quantity": 2},
+            {"product_id": "b", "store_id": "s2", "date": "2024-03-31", "quantity": 3},
+            {"product_id": "c", "store_id": "s1", "date": "2024-03-30", "quantity": 5},
+        ]
+    )
+    products = [
+        {"id": "a", "category": "Toys"},
+        {"id": "b", "category": "Toys"},
+        {"id": "c", "category": "Books"},
+    ]
+
+    by_category = model_training.load_series("category", 3, products, end)
+    assert by_category == {"Toys": [0, 0, 0, 5], "Books": [0, 0, 5, 0]}
+    by_store = model_training.load_series("store", 3, end=end)
+    assert by_store == {"s1": [0, 0, 5, 2], "s2": [0, 0, 0, 3]}
+    with pytest.raises(ValueError):
+        model_training.load_series("region")
+
+
+def test_forecast_serves_published_models(tmp_path, monkeypatch, app):
+    from controllers.inventory_controller import InventoryController
+
+    monkeypatch.setenv("FORECAST_MODEL_DIR", str(tmp_path))
+    monkeypatch.setattr(model_registry, "_registries", {})
+    history = _series(3)
+    controller = InventoryController()
+    controller.firebase = Mock()
+    monkeypatch.setattr(
+        controller, "_get_historical_sales", lambda pid: history["abc".index(pid)]
+    )
+    model_training.train_models(
+        {"Toys": history[0].tolist()},
+        group_by="category",
+        workers=1,
+        groups={"a": "Toys", "b": "Toys", "c": None},
+    )
+    fits = []
+    fit = holt_winters.fit
+    monkeypatch.setattr(holt_winters, "fit", lambda h: fits.append(len(h)) or fit(h))
+
+    result = controller.forecast_demand(["a", "b", "c"], 7, "holt_winters")
+
+    registry = model_registry.get_registry()
+    for i, product_id in enumerate("ab"):
+        np.testing.assert_allclose(
+            result[product_id]["forecast"], registry.forecast("Toys", history[i], 7)
+        )
+    assert fits == [1]  # only the product without a model is fitted on the spot
+    assert len(result["c"]["forecast"]) == 7
+    assert controller.forecast_demand(["a"], 7, "holt_winters")["a"]["cached"]
+
+    # A newly published version is served instead of cached forecasts
+    model_training.train_models(
+        {"a": history[2].tolist()}, workers=1, model_dir=str(tmp_path)
+    )
+    fits.clear()
+    again = controller.forecast_demand(["a", "b"], 7, "holt_winters")
+    assert not again["a"]["cached"]
+    np.testing.assert_allclose(
+        again["a"]["forecast"], registry.forecast("a", history[0], 7)
+    )
+    assert fits == [1]  # per-product models leave "b" without one
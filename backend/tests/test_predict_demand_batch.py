@@ -0,0 +1,94 @@
+import threading
+
+import numpy as np
+import pytest
+
+from utils.micro_batcher import MicroBatcher
+
+
+def _series(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(50, 200, size=(n, 10)).round(1).tolist()
+
+
+def test_batch_matches_single_requests(client):
+    series = _series(25)
+
+    resp = client.post("/predict-demand/batch", json={"series": series})
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body["count"] == 25
+
+    single = [
+        client.post("/predict-demand", json={"last_10_days": s}).get_json()
+        for s in series[:5]
+    ]
+    assert body["predicted_demand"][:5] == [r["predicted_demand"] for r in single]
+
+    resp = client.post(
+        "/predict-demand/batch", json={"series": [series[0], [1, 2], ["x"] * 10]}
+    )
+    assert resp.status_code == 400
+    assert resp.get_json()["invalid_indexes"] == [1, 2]
+    assert client.post("/predict-demand/batch", json={}).status_code == 400
+
+
+def test_micro_batcher_coalesces_concurrent_submits():
+    sizes = []
+
+    def run(items):
+        sizes.append(len(items))
+        return [sum(item) for item in items]
+
+    batcher = MicroBatcher(run, max_wait=0.05, max_batch=8)
+    results = {}
+    start = threading.Barrier(20)
+
+    def call(i):
+        start.wait()
+        results[i] = batcher.submit([i, 1])
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == {i: i + 1 for i in range(20)}
+    assert sum(sizes) == 20 and max(sizes) <= 8
+    assert len(sizes) < 20
+    assert batcher.batches == len(sizes) and batcher.items == 20
+
+
+def test_micro_batcher_propagates_errors():
+    def fail(items):
+        raise ValueError("model unavailable")
+
+    batcher = MicroBatcher(fail, max_wait=0.001)
+    with pytest.raises(ValueError):
+        batcher.submit([1] * 10, timeout=5)
+
+
+def test_single_endpoint_uses_micro_batcher(client, monkeypatch):
+    from routes import predict_demand_routes
+
+    batcher = MicroBatcher(predict_demand_routes._run_micro_batch, max_wait=0.05)
+    monkeypatch.setattr(predict_demand_routes, "batcher", batcher)
+    series = _series(6, seed=1)
+    expected = predict_demand_routes.predict_series(series)[0]
+    results = [None] * len(series)
+
+    def call(i):
+        resp = client.application.test_client().post(
+            "/predict-demand", json={"last_10_days": series[i]}
+        )
+        results[i] = resp.get_json()["predicted_demand"]
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(series))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == expected
+    assert batcher.items == len(series) and batcher.batches < len(series)
@@ -0,0 +1,140 @@
+import numpy as np
+
+from controllers.ai_engine import AIEngine
+from utils.product_similarity import (
+    ProductSimilarityIndex,
+    get_similarity_index,
+    rebuild_similarity_index,
+    refresh_similarity_index,
+)
+
+WORDS = ["organic", "milk", "whole", "bread", "rye", "cheese", "aged", "fresh"]
+
+
+def _catalogue(n=60, categories=3, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "id": f"p{i}",
+            "name": " ".join(rng.choice(WORDS, size=2)),
+            "description": " ".join(rng.choice(WORDS, size=4)),
+            "price": float(rng.integers(1, 20)),
+            "rating": float(rng.integers(0, 6)),
+            "brand": f"b{rng.integers(0, 4)}",
+            "category": f"c{i % categories}",
+        }
+        for i in range(n)
+    ]
+
+
+def _neighbor_ids(index, product_id):
+    return [pid for pid, _ in index.neighbors_of(product_id)]
+
+
+def test_neighbors_are_best_scoring_products_in_category():
+    products = _catalogue()
+    index = ProductSimilarityIndex.build(products, top_n=5)
+
+    rows = np.flatnonzero(index.category == index.category[0])
+    scores = index.scores(np.array([0]), rows)[0]
+    expected = sorted(
+        ((index.ids[r], s) for r, s in zip(rows, scores) if r != 0),
+        key=lambda item: -item[1],
+    )[:5]
+    got = index.neighbors_of("p0")
+    assert [round(s, 6) for _, s in got] == [round(s, 6) for _, s in expected]
+    assert all(products[int(pid[1:])]["category"] == "c0" for pid, _ in got)
+
+
+def test_incremental_update_matches_full_rebuild():
+    products = _catalogue()
+    index = ProductSimilarityIndex.build(products[:50], top_n=5)
+
+    changed = dict(products[3], price=99.0, brand="b9")
+    index.update(products[50:] + [changed])
+    index.remove(["p7"])
+
+    final = [changed if p["id"] == "p3" else p for p in products if p["id"] != "p7"]
+    rebuilt = ProductSimilarityIndex.build(final, top_n=5)
+    # Score with the original vocabulary so text similarities are comparable
+    rebuilt.tfidf = index.vectorizer.transform(
+        [f"{p['name']} {p['description']}" for p in final]
+    ).tocsr()
+    for code in np.unique(rebuilt.category):
+        rows = rebuilt._members(code)
+        rebuilt._rescore(rows, rows)
+
+    assert index.neighbors_of("p7") is None
+    for p in final:
+        got = [s for _, s in index.neighbors_of(p["id"])]
+        want = [s for _, s in rebuilt.neighbors_of(p["id"])]
+        assert got == want
+
+
+def test_substitutes_use_persisted_index(tmp_path, monkeypatch):
+    monkeypatch.setenv("PRODUCT_SIMILARITY_PATH", str(tmp_path / "sim.joblib"))
+    products = _catalogue(n=30)
+    assert refresh_similarity_index(products) is False
+
+    rebuild_similarity_index(products)
+    index = get_similarity_index()
+    assert len(index) == 30
+
+    subs = AIEngine().find_product_substitutes(products[0], products)
+    assert [s["id"] for s in subs] == [
+        s["id"] for s in sorted(subs, key=lambda s: s["final_score"], reverse=True)
+    ]
+    assert {s["id"] for s in subs} <= set(_neighbor_ids(index, "p0"))
+
+    refresh_similarity_index(removed_ids=["p3"])
+    assert get_similarity_index().neighbors_of("p3") is None
+
+
+def test_save_compacts_superseded_rows(tmp_path):
+    products = _catalogue(n=30)
+    index = ProductSimilarityIndex.build(products, top_n=5)
+    for price in (5.0, 6.0, 7.0):
+        index.update([dict(products[3], price=price)])
+    index.remove(["p7"])
+    before = {p["id"]: index.neighbors_of(p["id"]) for p in products}
+    assert len(index.ids) == 33
+
+    path = str(tmp_path / "sim.joblib")
+    index.save(path)
+    loaded = ProductSimilarityIndex.load(path)
+
+    assert len(loaded.ids) == loaded.tfidf.shape[0] == len(loaded.price) == 29
+    assert loaded.active.all() and len(loaded) == 29
+    assert {p["id"]: loaded.neighbors_of(p["id"]) for p in products} == before
+    assert loaded.price[loaded.pos["p3"]] == 7.0
+
+    loaded.update([dict(products[4], price=1.0)])
+    assert loaded.price[loaded.pos["p4"]] == 1.0
+
+
+def test_refresh_queue_coalesces_edits(tmp_path, monkeypatch):
+    from utils import product_similarity
+
+    monkeypatch.setenv("PRODUCT_SIMILARITY_PATH", str(tmp_path / "sim.joblib"))
+    products = _catalogue(n=30)
+    rebuild_similarity_index(products)
+    calls = []
+    refresh = product_similarity.refresh_similarity_index
+    monkeypatch.setattr(
+        product_similarity,
+        "refresh_similarity_index",
+        lambda changed, removed: calls.append(1) or refresh(changed, removed),
+    )
+
+    queue = product_similarity._RefreshQueue(debounce=0.05)
+    for price in (5.0, 6.0, 7.0):
+        queue.submit([dict(products[3], price=price)])
+    queue.submit(removed_ids=["p7"])
+    queue.submit([products[8]], removed_ids=["p8"])
+    assert queue.flush(timeout=5)
+
+    index = get_similarity_index()
+    assert len(calls) == 1
+    assert index.price[index.pos["p3"]] == 7.0
+    assert "p7" not in index.pos and "p8" not in index.pos
+    assert len(index.ids) == len(index) == 28
@@ -0,0 +1,120 @@
+import threading
+import time
+
+import pytest
+
+from utils.recommendation_cache import ALL, RecommendationCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_ttl():
+    clock = Clock()
+    cache = RecommendationCache(ttl=10, clock=clock)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return len(calls), ["Dairy"]
+
+    assert cache.get_or_compute("k", compute) == (1, False)
+    clock.now = 9
+    assert cache.get_or_compute("k", compute) == (1, True)
+    clock.now = 11
+    assert cache.get_or_compute("k", compute) == (2, False)
+
+
+def test_invalidation_only_drops_dependent_entries():
+    cache = RecommendationCache(ttl=60)
+    cache.get_or_compute("dairy", lambda: ("d", ["Dairy"]))
+    cache.get_or_compute("bakery", lambda: ("b", ["Bakery"]))
+    cache.get_or_compute("prefs", lambda: ("p", [ALL]))
+    cache.get_or_compute("missing", lambda: (None, None))
+
+    assert cache.invalidate(["Dairy"]) == 2
+    assert cache.get_or_compute("bakery", lambda: ("new", ["Bakery"])) == ("b", True)
+    assert cache.get_or_compute("dairy", lambda: ("new", ["Dairy"])) == ("new", False)
+    assert cache.stats()["entries"] == 2
+
+    cache.invalidate([None])
+    assert cache.stats()["entries"] == 0
+
+
+def test_invalidation_ignores_category_case():
+    cache = RecommendationCache(ttl=60)
+    cache.get_or_compute("dairy", lambda: ("d", ["dairy"]))
+
+    assert cache.invalidate(["Dairy"]) == 1
+
+
+def test_concurrent_misses_share_one_computation():
+    cache = RecommendationCache(ttl=60)
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "value", ["Dairy"]
+
+    results = []
+    workers = [
+        threading.Thread(
+            target=lambda: results.append(cache.get_or_compute("k", compute))
+        )
+        for _ in range(8)
+    ]
+    workers[0].start()
+    started.wait(5)
+    for worker in workers[1:]:
+        worker.start()
+    while cache.stats()["coalesced"] < 7:
+        time.sleep(0.001)
+    release.set()
+    for worker in workers:
+        worker.join(5)
+
+    assert len(calls) == 1
+    assert sorted(hit for _, hit in results) == [False] + [True] * 7
+    assert {value for value, _ in results} == {"value"}
+
+
+def test_failed_computation_is_shared_and_not_cached():
+    cache = RecommendationCache(ttl=60)
+
+    def boom():
+        raise RuntimeError("firebase down")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("k", boom)
+    assert cache.get_or_compute("k", lambda: ("ok", ["Dairy"])) == ("ok", False)
+
+
+def test_product_update_invalidates_cached_recommendations(client, mock_firebase):
+    product = {"id": "p1", "name": "Milk", "category": "Dairy", "price": 2.0}
+    mock_firebase.get_document.return_value = product
+    mock_firebase.get_documents.return_value = [
+        product,
+        {"id": "p2", "name": "Cheese", "category": "Dairy", "price": 2.2},
+    ]
+
+    body = {"preferences": {"categories": ["Dairy"]}}
+    first = client.post("/api/products/recommendations", json=body)
+    second = client.post("/api/products/recommendations", json=body)
+    assert first.get_json() == second.get_json()
+    assert mock_firebase.get_documents.call_count == 1
+
+    mock_firebase.update_document.return_value = True
+    resp = client.put("/api/products/p1", json={"price": 3.0})
+    assert resp.status_code == 200
+
+    client.post("/api/products/recommendations", json=body)
+    assert mock_firebase.get_documents.call_count == 2
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from controllers.ai_engine import AIEngine
+from utils.product_catalog import ProductCatalog
+
+
+def reference_recommendations(user_preferences, products):
+    """The original per-product scoring loop."""
+    preferred_categories = user_preferences.get("categories", [])
+    price_range = user_preferences.get("price_range", {})
+    previous_purchases = user_preferences.get("purchase_history", [])
+    favorite_brands = user_preferences.get("brands", [])
+    scored = []
+    for product in products:
+        score = 0
+        if product.get("category") in preferred_categories:
+            score += 15
+        price = product.get("price", 0)
+        if price_range.get("min", 0) <= price <= price_range.get("max", float("inf")):
+            score += 10
+        if product.get("brand") in favorite_brands:
+            score += 12
+        if product.get("id") not in previous_purchases:
+            score += 5
+        rating = product.get("rating", 0)
+        if rating >= 4.0:
+            score += 8
+        elif rating >= 3.5:
+            score += 5
+        review_count = product.get("review_count", 0)
+        if review_count > 100:
+            score += 6
+        elif review_count > 50:
+            score += 3
+        if score > 0:
+            scored.append(dict(product, recommendation_score=score))
+    scored.sort(key=lambda x: x["recommendation_score"], reverse=True)
+    return scored[:15]
+
+
+def _catalogue(n, seed=0):
+    rng = np.random.default_rng(seed)
+    products = []
+    for i in range(n):
+        product = {
+            "id": f"p{i}",
+            "category": f"c{rng.integers(0, 5)}",
+            "brand": f"b{rng.integers(0, 8)}",
+            "price": round(float(rng.uniform(1, 100)), 2),
+            "rating": round(float(rng.uniform(0, 5)), 1),
+            "review_count": int(rng.integers(0, 200)),
+        }
+        # Sparse catalogues leave fields out entirely
+        for field in ("brand", "rating", "review_count"):
+            if rng.random() < 0.1:
+                del product[field]
+        products.append(product)
+    return products
+
+
+@pytest.mark.parametrize(
+    "preferences",
+    [
+        {},
+        {"categories": ["c1", "c3"], "brands": ["b2"]},
+        {
+            "categories": ["c0"],
+            "price_range": {"min": 20, "max": 40},
+            "purchase_history": ["p1", "p2", "p5"],
+            "brands": ["b1", "b7"],
+        },
+    ],
+)
+def test_columnar_scoring_matches_reference_loop(preferences):
+    products = _catalogue(500)
+    expected = reference_recommendations(preferences, products)
+
+    assert AIEngine().generate_recommendations(preferences, products) == expected
+    catalog = ProductCatalog(products)
+    assert AIEngine().generate_recommendations(preferences, catalog) == expected
+
+
+def test_top_k_breaks_ties_by_catalogue_order():
+    catalog = ProductCatalog([{"id": i} for i in range(6)])
+    scores = np.array([1, 3, 3, 2, 3, 0])
+
+    assert catalog.top_k(scores, 3).tolist() == [1, 2, 4]
+    assert catalog.top_k(scores, 4, mask=scores > 1).tolist() == [1, 2, 4, 3]
+    assert catalog.top_k(scores, 10, mask=scores > 0).tolist() == [1, 2, 4, 3, 0]
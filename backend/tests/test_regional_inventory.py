@@ -0,0 +1,133 @@
+import random
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+
+import pytest
+
+from utils import regional_inventory
+
+
+def _region(n_stores=65, seed=3):
+    rng = random.Random(seed)
+    now = datetime.now()
+    stores = [
+        {"id": f"s{i}", "name": f"Store {i}", "region": "north"}
+        for i in range(n_stores)
+    ]
+    inventory, sales = [], []
+    for store in stores:
+        for p in range(6):
+            inventory.append(
+                {
+                    "store_id": store["id"],
+                    "product_id": f"p{p}",
+                    "current_stock": rng.choice([0, 1, 4, 20, 500]),
+                    "unit_cost": rng.randint(1, 9),
+                }
+            )
+            for _ in range(rng.randint(0, 40)):
+                day = now - timedelta(days=rng.randint(0, 45))
+                sales.append(
+                    {
+                        "store_id": store["id"],
+                        "product_id": f"p{p}",
+                        "date": day.isoformat(),
+                        "quantity": rng.randint(1, 5),
+                    }
+                )
+    return stores, inventory, sales
+
+
+def _firebase(stores, inventory, sales):
+    collections = {"stores": stores, "inventory": inventory, "sales": sales}
+
+    def matches(doc, field, operator, value):
+        if operator == "in":
+            return doc.get(field) in value
+        if operator == ">=":
+            return doc.get(field, "") >= value
+        if operator == "<":
+            return doc.get(field, "") < value
+        return doc.get(field) == value
+
+    def query(collection, field, operator, value):
+        return [
+            d for d in collections[collection] if matches(d, field, operator, value)
+        ]
+
+    def where(collection, conditions, order_by=None, descending=False, limit=None):
+        docs = [
+            d
+            for d in collections[collection]
+            if all(matches(d, *condition) for condition in conditions)
+        ]
+        if order_by:
+            docs.sort(key=lambda d: d.get(order_by, ""), reverse=descending)
+        return docs[:limit]
+
+    firebase = Mock()
+    firebase.query_documents.side_effect = query
+    firebase.query_where.side_effect = where
+    firebase.get_documents.side_effect = lambda collection, filters: query(
+        collection, "store_id", "==", filters["store_id"]
+    )
+    return firebase
+
+
+def test_geo_insights_match_per_store_health(rollup, app):
+    from controllers.inventory_controller import InventoryController
+
+    stores, inventory, sales = _region()
+    controller = InventoryController()
+    controller.firebase = _firebase(stores, inventory, sales)
+
+    insights = controller.get_geo_insights("north")
+    # One store lookup, then 3 chunks of stores each for inventory and sales
+    assert controller.firebase.query_documents.call_count == 1 + 3
+    assert controller.firebase.query_where.call_count == 3
+    assert not controller.firebase.get_documents.called
+    start = (datetime.now().date() - timedelta(days=30)).isoformat()
+    for call in controller.firebase.query_where.call_args_list:
+        assert ("date", ">=", start) in call.args[1]
+
+    for row in insights["performance_by_store"]:
+        store_id = row["store_id"]
+        assert row["stock_health"] == controller._assess_stock_health(store_id)
+        assert row["inventory_value"] == sum(
+            i["current_stock"] * i["unit_cost"]
+            for i in inventory
+            if i["store_id"] == store_id
+        )
+    assert len({row["stock_health"] for row in insights["performance_by_store"]}) > 1
+
+    rollup.backfill(sales)
+    controller.firebase.query_documents.reset_mock()
+    controller.firebase.query_where.reset_mock()
+    assert controller.get_geo_insights("north") == insights
+    assert controller.firebase.query_documents.call_count == 1 + 3
+    assert not controller.firebase.query_where.called
+
+
+def test_turnover_annualises_cost_of_sales():
+    inventory = [
+        {"store_id": "s1", "product_id": "p1", "current_stock": 10, "unit_cost": 2},
+        {"store_id": "s1", "product_id": "p2", "current_stock": 30, "unit_cost": 1},
+        {"store_id": "s2", "product_id": "p1", "current_stock": 0, "unit_cost": 2},
+    ]
+    velocities = {("s1", "p1"): 0.5, ("s1", "p2"): 0.1, ("s2", "p1"): 3.0}
+
+    metrics = regional_inventory.store_metrics(["s1", "s2"], inventory, velocities)
+
+    assert metrics["s1"]["turnover_rate"] == round((1 + 0.1) * 365 / 50, 2)
+    assert metrics["s2"]["turnover_rate"] == 0.0
+
+
+def test_fetch_for_stores_bounds_workers():
+    stores, inventory, sales = _region(n_stores=100)
+    firebase = _firebase(stores, inventory, sales)
+    store_ids = [s["id"] for s in stores]
+
+    docs = regional_inventory.fetch_for_stores(firebase, "inventory", store_ids, 2)
+    assert sorted(map(id, docs)) == sorted(map(id, inventory))
+    assert firebase.query_documents.call_count == 4
+    assert regional_inventory.fetch_for_stores(firebase, "inventory", []) == []
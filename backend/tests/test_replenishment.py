@@ -0,0 +1,146 @@
+import math
+import random
+import statistics
+from datetime import date, timedelta
+from unittest.mock import Mock
+
+import pytest
+
+from utils import replenishment, sales_rollup
+
+END = date(2024, 6, 30)
+
+
+def _stores(n_stores=12, n_products=8, seed=5):
+    rng = random.Random(seed)
+    inventory, sales = [], []
+    for s in range(n_stores):
+        for p in range(n_products):
+            inventory.append(
+                {
+                    "store_id": f"s{s}",
+                    "product_id": f"p{p}",
+                    "current_stock": rng.choice([0, 3, 15, 60, 400, 2000]),
+                    "lead_time": rng.choice([2, 7, 14]),
+                    "unit_cost": rng.randint(1, 20),
+                }
+            )
+            if p == 0:
+                continue  # never sold
+            for _ in range(rng.randint(1, 80)):
+                day = END - timedelta(days=rng.randint(0, 40))
+                sales.append(
+                    {
+                        "store_id": f"s{s}",
+                        "product_id": f"p{p}",
+                        "date": day.isoformat(),
+                        "quantity": rng.randint(1, 6),
+                    }
+                )
+    return inventory, sales
+
+
+def _expected(item, sales, days=30):
+    """The plan of one item, computed directly from its daily sales."""
+    dates = sales_rollup.window(days, END)
+    daily = dict.fromkeys(dates, 0)
+    for sale in sales:
+        if (sale["store_id"], sale["product_id"]) == (
+            item["store_id"],
+            item["product_id"],
+        ) and sale["date"] in daily:
+            daily[sale["date"]] += sale["quantity"]
+    velocity = statistics.mean(daily.values())
+    z = statistics.NormalDist().inv_cdf(replenishment.SERVICE_LEVEL)
+    safety = z * statistics.stdev(daily.values()) * math.sqrt(item["lead_time"])
+    reorder_point = velocity * item["lead_time"] + safety
+    stock = item["current_stock"]
+    if stock <= reorder_point:
+        status = "reorder"
+        quantity = max(math.ceil(reorder_point + velocity * 30 - stock), 10)
+    else:
+        status = "overstock" if stock > velocity * 60 else "ok"
+        quantity = 0
+    return velocity, safety, reorder_point, status, quantity
+
+
+def test_plan_matches_per_item_formulas(rollup):
+    inventory, sales = _stores()
+    firebase = Mock()
+    firebase.get_documents.return_value = sales
+
+    demand = replenishment.load_demand(firebase, 30, END)
+    frame = replenishment.plan(replenishment.inventory_frame(inventory), demand)
+
+    assert len(frame) == len(inventory)
+    statuses = set()
+    for item, row in zip(inventory, frame.itertuples()):
+        velocity, safety, reorder_point, status, quantity = _expected(item, sales)
+        assert row.velocity == pytest.approx(velocity)
+        assert row.safety_stock == pytest.approx(safety, abs=0.01)
+        assert row.reorder_point == pytest.approx(reorder_point, abs=0.01)
+        assert row.status == status
+        assert row.order_quantity == quantity
+        statuses.add(status)
+    assert statuses == {"reorder", "overstock", "ok"}
+
+    # The rollup's grouped sums give the same demand as the raw sales
+    rollup.backfill(sales)
+    from_rollup = replenishment.load_demand(None, 30, END)
+    keys = ["store_id", "product_id"]
+    merged = demand.merge(from_rollup, on=keys, suffixes=("", "_rollup"))
+    assert len(merged) == len(demand) == len(from_rollup)
+    assert merged["velocity"].tolist() == pytest.approx(
+        merged["velocity_rollup"].tolist()
+    )
+    assert merged["demand_std"].tolist() == pytest.approx(
+        merged["demand_std_rollup"].tolist()
+    )
+
+
+def test_safety_stock_follows_demand_variance():
+    inventory = replenishment.inventory_frame(
+        [
+            {"store_id": "s1", "product_id": "steady", "current_stock": 50},
+            {"store_id": "s1", "product_id": "spiky", "current_stock": 50},
+            {"store_id": "s1", "product_id": "unsold", "current_stock": 50},
+        ]
+    )
+    # 31 days averaging 5 units: every day, or 31 units on 5 days
+    demand = replenishment._demand_frame(
+        [("s1", "steady", 155, 31 * 25), ("s1", "spiky", 155, 5 * 31**2)], 30
+    )
+
+    frame = replenishment.plan(inventory, demand).set_index("product_id")
+    assert frame.loc["steady", "velocity"] == frame.loc["spiky", "velocity"] == 5
+    assert frame.loc["steady", "safety_stock"] == 0
+    assert frame.loc["steady", "reorder_point"] == 35
+    assert frame.loc["spiky", "safety_stock"] > 20
+    assert frame.loc["spiky", "status"] == "reorder"
+    assert frame.loc["steady", "status"] == "ok"
+    assert frame.loc["unsold", "lead_time"] == replenishment.DEFAULT_LEAD_TIME
+    assert frame.loc["unsold", "suggested_action"] == "promotion"
+
+
+def test_run_writes_plans_in_chunks(rollup):
+    inventory, sales = _stores(n_stores=30, n_products=40)
+    rollup.backfill(sales)
+    firebase = Mock()
+    firebase.get_documents.return_value = inventory
+    firebase.batch_write.side_effect = lambda ops: ops[0]["document_id"] != "s12_p20"
+
+    summary = replenishment.run(firebase, 30, END)
+
+    assert summary["items"] == 1200
+    assert summary["stores"] == 30
+    assert summary["batches"] == 3
+    assert summary["failed_batches"] == 1
+    assert summary["written"] == 700
+    firebase.get_documents.assert_called_once_with("inventory")
+    chunks = [c.args[0] for c in firebase.batch_write.call_args_list]
+    assert [len(chunk) for chunk in chunks] == [500, 500, 200]
+    op = chunks[2][-1]
+    assert op["collection"] == replenishment.PLAN_COLLECTION
+    assert op["document_id"] == "s29_p39"
+    assert op["data"]["store_id"] == "s29"
+    assert set(replenishment.PLAN_FIELDS) < set(op["data"])
@@ -0,0 +1,71 @@
+from datetime import date, datetime, timedelta
+from unittest.mock import Mock
+
+import pytest
+
+from tests.conftest import TODAY, sale
+from utils import sales_rollup
+
+SALES = [
+    sale(0, 2),
+    sale(0, 3, store="s2"),
+    sale(1, 1),
+    sale(5, 4),
+    sale(5, 1, product="p2"),
+    sale(200, 9),
+]
+
+
+def test_incremental_rows_match_backfill(rollup):
+    for item in SALES:
+        rollup.record_sales([item])
+    incremental = rollup.daily_history("p1", 10, end=TODAY)
+
+    rollup.backfill(SALES)
+    assert rollup.daily_history("p1", 10, end=TODAY) == incremental
+    assert len(incremental) == 11
+    assert incremental[-1] == 5  # both stores on the same day
+    assert incremental[-2] == 1
+    assert incremental[-6] == 4
+    assert sum(incremental) == 10  # the 200-day-old sale is outside the window
+
+
+def test_history_reads_rollup_once_backfilled(rollup, monkeypatch, app):
+    from controllers.inventory_controller import InventoryController
+
+    controller = InventoryController()
+    controller.firebase = Mock()
+    monkeypatch.setattr(
+        sales_rollup,
+        "window",
+        lambda days, end=None: [
+            (TODAY - timedelta(days=days - i)).isoformat() for i in range(days + 1)
+        ],
+    )
+    controller.firebase.query_documents.return_value = []
+
+    assert not rollup.is_ready()
+    controller._get_historical_sales("p1")
+    assert controller.firebase.query_documents.called
+
+    rollup.backfill(SALES)
+    controller.firebase.query_documents.reset_mock()
+    history = controller._get_historical_sales("p1", 30)
+    assert not controller.firebase.query_documents.called
+    assert len(history) == 31 and sum(history) == 10
+
+
+def test_record_sale_endpoint(rollup, client):
+    rollup.backfill([])
+    today = datetime.now().isoformat()
+
+    resp = client.post(
+        "/api/inventory/sales",
+        json={"product_id": "p9", "store_id": "s1", "quantity": 3, "date": today},
+    )
+    assert resp.status_code == 201
+    assert resp.get_json()["data"]["id"]
+    assert rollup.daily_history("p9", 7)[-1] == 3
+
+    resp = client.post("/api/inventory/sales", json={"quantity": 3})
+    assert resp.status_code == 400
@@ -0,0 +1,107 @@
+from datetime import date, datetime, timedelta
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+
+from tests.conftest import TODAY, sale
+from utils import sales_rollup
+from utils.store_sales import NO_SALES, load_store_sales
+
+STORE_SALES = [
+    sale(0, 6),
+    sale(0, 2),
+    sale(3, 4),
+    sale(29, 9, product="p2"),
+    sale(45, 7, product="p2"),  # outside the 30-day window
+    sale(2, 5, product="p3"),
+]
+OTHER_STORE = [sale(0, 50, store="s2")]
+
+
+def test_raw_and_rollup_loads_agree(rollup):
+    firebase = Mock()
+    firebase.query_where.return_value = STORE_SALES
+    raw = load_store_sales(firebase, "s1", end=TODAY)
+    assert firebase.query_where.call_count == 1
+    firebase.query_where.assert_called_with(
+        "sales",
+        [
+            ("store_id", "==", "s1"),
+            ("date", ">=", (TODAY - timedelta(days=30)).isoformat()),
+            ("date", "<", (TODAY + timedelta(days=1)).isoformat()),
+        ],
+    )
+
+    np.testing.assert_allclose(
+        raw.velocity(["p1", "p2", "p3", "missing"]), [12 / 31, 9 / 31, 5 / 31, 0]
+    )
+    assert raw.last_sale_date("p2") == STORE_SALES[3]["date"]
+    firebase.query_where.return_value = []
+    assert raw.last_sale_date("missing") == NO_SALES
+
+    rollup.backfill(STORE_SALES + OTHER_STORE)
+    firebase.reset_mock()
+    rolled = load_store_sales(firebase, "s1", end=TODAY)
+    assert not firebase.query_where.called
+    np.testing.assert_allclose(
+        rolled.velocity(["p1", "p2", "p3", "missing"]),
+        raw.velocity(["p1", "p2", "p3", "missing"]),
+    )
+    assert rolled.last_sale_date("p1") == TODAY.isoformat()
+
+
+def test_last_sale_before_window_is_looked_up():
+    firebase = Mock()
+    firebase.query_where.return_value = STORE_SALES[:4]
+    sales = load_store_sales(firebase, "s1", end=TODAY)
+    assert sales.last_sale_date("p1") == STORE_SALES[0]["date"]
+    assert firebase.query_where.call_count == 1
+
+    firebase.query_where.return_value = [STORE_SALES[4]]
+    assert sales.last_sale_date("p5") == STORE_SALES[4]["date"]
+    assert sales.last_sale_date("p5") == STORE_SALES[4]["date"]
+    assert firebase.query_where.call_count == 2
+    firebase.query_where.assert_called_with(
+        "sales",
+        [("store_id", "==", "s1"), ("product_id", "==", "p5")],
+        order_by="date",
+        descending=True,
+        limit=1,
+    )
+
+    firebase.query_where.return_value = []
+    assert sales.last_sale_date("never") == NO_SALES
+
+
+def test_stock_alerts_query_sales_once(rollup, monkeypatch, app):
+    from controllers.inventory_controller import InventoryController
+
+    controller = InventoryController()
+    controller.firebase = Mock()
+    monkeypatch.setattr(
+        sales_rollup,
+        "window",
+        lambda days, end=None: [
+            (TODAY - timedelta(days=days - i)).isoformat() for i in range(days + 1)
+        ],
+    )
+    controller.firebase.get_documents.return_value = [
+        {"product_id": "p1", "current_stock": 0},
+        {"product_id": "p2", "current_stock": 1},
+        {"product_id": "p3", "current_stock": 100},
+        {"product_id": "p4", "current_stock": 5},
+    ]
+    controller.firebase.query_where.return_value = STORE_SALES
+
+    alerts = controller.get_stock_alerts("s1")
+    recommendations = controller.get_optimization_recommendations("s1")
+
+    assert controller.firebase.query_where.call_count == 2  # once per call
+    assert alerts["out_of_stock"] == [
+        {"product_id": "p1", "last_sale": STORE_SALES[0]["date"], "priority": "medium"}
+    ]
+    assert [a["product_id"] for a in alerts["low_stock"]] == ["p2"]
+    assert [a["product_id"] for a in alerts["overstock"]] == ["p3", "p4"]
+    assert recommendations["slow_moving"] == ["p1", "p2", "p3", "p4"]
+    assert [r["product_id"] for r in recommendations["reorder_needed"]] == ["p1", "p2"]
@@ -0,0 +1,353 @@
+import json
+
+import numpy as np
+import pytest
+
+from utils import vector_store, vector_store_sqlite
+from utils.quantization import ProductQuantizer, QuantizedIndex, normalize_rows
+
+
+def _catalogue(n=400, dim=64, seed=3):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(8, dim))
+    labels = rng.integers(0, 8, size=n)
+    return (centers[labels] + rng.normal(scale=0.5, size=(n, dim))).astype(np.float32)
+
+
+def _items(vectors):
+    return [
+        {
+            "id": f"p{i}",
+            "text": f"product {i}",
+            "embedding": v.tolist(),
+            "metadata": {"category": "even" if i % 2 == 0 else "odd", "name": f"P{i}"},
+        }
+        for i, v in enumerate(vectors)
+    ]
+
+
+@pytest.fixture
+def json_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_store, "INDEX_PATH", str(tmp_path / "index.ndjson"))
+    monkeypatch.setattr(vector_store, "LEGACY_INDEX_PATH", str(tmp_path / "index.json"))
+    monkeypatch.setattr(vector_store, "CODES_PATH", str(tmp_path / "index.codes.npz"))
+    monkeypatch.setattr(
+        vector_store,
+        "_quantized",
+        {"generation": None, "index": None, "rows": None},
+    )
+    return vector_store
+
+
+@pytest.fixture
+def sqlite_store(tmp_path, monkeypatch):
+    monkeypatch.setenv("VECTOR_DB_PATH", str(tmp_path / "index.sqlite"))
+    return vector_store_sqlite
+
+
+class TestQuantization:
+    """Quantized indexes keep top-k recall while shrinking memory."""
+
+    @pytest.mark.parametrize(
+        "config,min_recall,compression",
+        [
+            ({"quantization": "int8", "rerank": 0}, 0.9, 4.0),
+            ({"quantization": "pq", "pq_subvectors": 8, "rerank": 0}, 0.4, 32.0),
+        ],
+    )
+    def test_recall_and_compression(self, config, min_recall, compression):
+        vectors = _catalogue()
+        qindex = QuantizedIndex.build(vectors, config)
+        exact = normalize_rows(vectors)
+
+        hits = 0
+        for q in vectors[:20]:
+            truth = set(np.argsort(-(exact @ normalize_rows(q[None, :])[0]))[:10])
+            hits += len(truth & {row for row, _ in qindex.search(q.tolist(), 10)})
+
+        assert hits / 200 >= min_recall
+        assert qindex.memory_report()["compression"] == compression
+
+    def test_save_and_load_round_trip(self, tmp_path):
+        vectors = _catalogue(n=100)
+        config = {"quantization": "pq", "pq_subvectors": 8, "rerank": 0}
+        qindex = QuantizedIndex.build(vectors, config)
+        path = str(tmp_path / "codes.npz")
+        qindex.save(path, generation=7)
+
+        loaded, extra = QuantizedIndex.load(path, config)
+        assert extra["generation"] == 7
+        np.testing.assert_allclose(
+            loaded.scores(vectors[0].tolist()), qindex.scores(vectors[0].tolist())
+        )
+
+    def test_json_store_rerank_matches_exact(self, json_store):
+        vectors = _catalogue(n=200)
+        json_store.upsert_embeddings(_items(vectors))
+        exact = json_store.query_similar(vectors[5].tolist(), top_k=5)
+
+        json_store.configure_index(quantization="pq", pq_subvectors=8, rerank=50)
+        approx = json_store.query_similar(vectors[5].tolist(), top_k=5)
+
+        assert [h["id"] for h in approx] == [h["id"] for h in exact]
+        assert json_store.get_index_config()["quantization"] == "pq"
+
+    def test_changing_quantization_retrains_the_quantizer(self, json_store):
+        vectors = _catalogue(n=200)
+        json_store.upsert_embeddings(_items(vectors))
+        json_store.configure_index(quantization="int8")
+        json_store.query_similar(vectors[0].tolist(), top_k=5)
+        assert json_store._quantized["index"].quantizer.kind == "int8"
+
+        json_store.configure_index(quantization="pq", pq_subvectors=8)
+        json_store.query_similar(vectors[0].tolist(), top_k=5)
+        quantizer = json_store._quantized["index"].quantizer
+        assert isinstance(quantizer, ProductQuantizer)
+        assert quantizer.subvectors == 8
+
+        # A fresh process loads the rewritten codes, not the int8 ones
+        json_store._quantized.update({"generation": None, "index": None})
+        json_store.configure_index(quantization="pq", pq_subvectors=16)
+        json_store.query_similar(vectors[0].tolist(), top_k=5)
+        assert json_store._quantized["index"].quantizer.subvectors == 16
+        loaded, _ = QuantizedIndex.load(
+            json_store.CODES_PATH, json_store.get_index_config()
+        )
+        assert isinstance(loaded.quantizer, ProductQuantizer)
+        assert loaded.quantizer.subvectors == 16
+
+    def test_sqlite_store_quantized_category_filter(self, sqlite_store):
+        vectors = _catalogue(n=200)
+        sqlite_store.upsert_embeddings(_items(vectors))
+        sqlite_store.configure_index(quantization="int8", rerank=20)
+
+        hits = sqlite_store.query_similar(
+            vectors[4].tolist(), top_k=5, filter_meta={"category": "even"}
+        )
+        assert hits[0]["id"] == "p4"
+        assert all(h["metadata"]["category"] == "even" for h in hits)
+
+    def test_sqlite_writes_reuse_trained_codebooks(self, sqlite_store):
+        vectors = _catalogue(n=200)
+        items = _items(vectors)
+        sqlite_store.upsert_embeddings(items)
+        sqlite_store.configure_index(quantization="pq", rerank=20)
+        sqlite_store.query_similar(vectors[0].tolist(), top_k=1)
+        cached = sqlite_store._quantized[sqlite_store._get_db_path()]
+        quantizer = cached["index"].quantizer
+
+        # A new product and a recategorised one are encoded with the same codebooks
+        items[4]["metadata"]["category"] = "odd"
+        extra = _items(_catalogue(n=201, seed=9))[200:]
+        extra[0].update(id="new", text="new product")
+        sqlite_store.upsert_embeddings([items[4]] + extra)
+        hits = sqlite_store.query_similar(extra[0]["embedding"], top_k=3)
+        cached = sqlite_store._quantized[sqlite_store._get_db_path()]
+        assert cached["index"].quantizer is quantizer
+        assert len(cached["index"]) == 201 and cached["changed"] == 2
+        assert hits[0]["id"] == "new"
+        odd = sqlite_store.query_similar(
+            vectors[4].tolist(), top_k=1, filter_meta={"category": "odd"}
+        )
+        assert odd[0]["id"] == "p4"
+        even = sqlite_store.query_similar(
+            vectors[4].tolist(), top_k=1, filter_meta={"category": "even"}
+        )
+        assert even[0]["id"] != "p4"
+
+        # Rewriting most rows retrains
+        sqlite_store.upsert_embeddings(_items(_catalogue(n=200, seed=5)))
+        sqlite_store.query_similar(vectors[0].tolist(), top_k=1)
+        cached = sqlite_store._quantized[sqlite_store._get_db_path()]
+        assert cached["index"].quantizer is not quantizer
+        assert cached["changed"] == 0
+
+
+class TestAppendOnlyJsonStore:
+    """The JSON backend appends records and serves queries from memory."""
+
+    def _lines(self, store):
+        with open(store.INDEX_PATH, encoding="utf-8") as f:
+            return f.read().splitlines()
+
+    def test_upsert_appends_only_new_records(self, json_store):
+        vectors = _catalogue(n=50)
+        json_store.upsert_embeddings(_items(vectors))
+        before = self._lines(json_store)
+
+        json_store.upsert_embeddings(_items(vectors[:3]))
+        after = self._lines(json_store)
+
+        assert after[: len(before)] == before
+        assert len(after) == len(before) + 3
+        assert len(json_store.all_items()) == 50
+
+    def test_picks_up_appends_from_other_writers(self, json_store):
+        vectors = _catalogue(n=10)
+        json_store.upsert_embeddings(_items(vectors[:5]))
+        assert len(json_store.all_items()) == 5
+
+        with open(json_store.INDEX_PATH, "a", encoding="utf-8") as f:
+            for item in _items(vectors)[5:]:
+                item["key"] = json_store._text_key(item["text"])
+                f.write(json.dumps(item) + "\n")
+
+        hits = json_store.query_similar(vectors[7].tolist(), top_k=1)
+        assert hits[0]["id"] == "p7"
+
+    def test_compaction_drops_superseded_records(self, json_store, monkeypatch):
+        monkeypatch.setattr(json_store, "COMPACT_MIN_RECORDS", 10)
+        items = _items(_catalogue(n=5))
+        for _ in range(3):
+            json_store.upsert_embeddings(items)
+
+        assert len(self._lines(json_store)) == 5
+        assert len(json_store.all_items()) == 5
+
+    def test_migrates_legacy_whole_file_index(self, json_store):
+        legacy = {"items": _items(_catalogue(n=4))}
+        for it in legacy["items"]:
+            it["key"] = json_store._text_key(it["text"])
+        with open(json_store.LEGACY_INDEX_PATH, "w", encoding="utf-8") as f:
+            json.dump(legacy, f)
+
+        assert [it["id"] for it in json_store.all_items()] == ["p0", "p1", "p2", "p3"]
+
+
+class TestMetadataPartitions:
+    """Filtered queries only score vectors in the matching partition."""
+
+    def _brute_force(self, vectors, query, allowed, k):
+        exact = normalize_rows(vectors) @ normalize_rows(query[None, :])[0]
+        order = [i for i in np.argsort(-exact) if i in allowed]
+        return [f"p{i}" for i in order[:k]]
+
+    def test_json_filter_scores_only_the_partition(self, json_store):
+        vectors = _catalogue(n=200)
+        json_store.upsert_embeddings(_items(vectors))
+
+        hits = json_store.query_similar(
+            vectors[3].tolist(), top_k=5, filter_meta={"category": "odd"}
+        )
+
+        odd = set(range(1, 200, 2))
+        assert [h["id"] for h in hits] == self._brute_force(vectors, vectors[3], odd, 5)
+        partitions = json_store._state["partitions"]
+        assert list(partitions) == [("category", "odd")]
+        assert len(partitions[("category", "odd")]["keys"]) == 100
+
+    def test_json_postings_follow_updates_and_combined_filters(self, json_store):
+        vectors = _catalogue(n=20)
+        items = _items(vectors)
+        json_store.upsert_embeddings(items)
+
+        items[2]["metadata"]["category"] = "odd"
+        json_store.upsert_embeddings([items[2]])
+
+        even = json_store.query_similar(
+            vectors[2].tolist(), top_k=20, filter_meta={"category": "even"}
+        )
+        assert "p2" not in {h["id"] for h in even}
+        both = json_store.query_similar(
+            vectors[2].tolist(),
+            top_k=5,
+            filter_meta={"category": "odd", "name": "P2"},
+        )
+        assert [h["id"] for h in both] == ["p2"]
+
+    def test_json_quantized_filter_uses_partition_rows(self, json_store):
+        vectors = _catalogue(n=200)
+        json_store.upsert_embeddings(_items(vectors))
+        json_store.configure_index(quantization="int8", rerank=20)
+
+        hits = json_store.query_similar(
+            vectors[8].tolist(), top_k=5, filter_meta={"category": "even"}
+        )
+        assert hits[0]["id"] == "p8"
+        assert all(h["metadata"]["category"] == "even" for h in hits)
+
+    def test_json_upserts_update_cached_matrices_in_place(
+        self, json_store, monkeypatch
+    ):
+        vectors = _catalogue(n=60)
+        items = _items(vectors)
+        json_store.upsert_embeddings(items[:50])
+        json_store.query_similar(vectors[0].tolist(), top_k=1)
+        for category in ("even", "odd"):
+            json_store.query_similar(
+                vectors[0].tolist(), top_k=1, filter_meta={"category": category}
+            )
+        builds = []
+        matrix = json_store._matrix
+        monkeypatch.setattr(
+            json_store, "_matrix", lambda *a: builds.append(1) or matrix(*a)
+        )
+
+        # New products and a changed embedding, without rebuilding any matrix
+        items[3]["embedding"] = vectors[55].tolist()
+        json_store.upsert_embeddings([items[3]] + items[50:])
+        assert json_store.query_similar(vectors[57].tolist(), top_k=1)[0]["id"] == "p57"
+        even = json_store.query_similar(
+            vectors[56].tolist(), top_k=2, filter_meta={"category": "even"}
+        )
+        assert even[0]["id"] == "p56"
+        odd = json_store.query_similar(
+            vectors[55].tolist(), top_k=2, filter_meta={"category": "odd"}
+        )
+        assert {h["id"] for h in odd} == {"p55", "p3"}
+        assert builds == []
+        assert len(json_store.all_items()) == 60
+
+    def test_sqlite_exact_category_filter(self, sqlite_store):
+        vectors = _catalogue(n=100)
+        sqlite_store.upsert_embeddings(_items(vectors))
+
+        hits = sqlite_store.query_similar(
+            vectors[5].tolist(), top_k=5, filter_meta={"category": "odd"}
+        )
+
+        odd = set(range(1, 100, 2))
+        assert [h["id"] for h in hits] == self._brute_force(vectors, vectors[5], odd, 5)
+        assert (
+            sqlite_store.query_similar(
+                vectors[5].tolist(), filter_meta={"category": "missing"}
+            )
+            == []
+        )
+
+
+class TestSqliteConnections:
+    """The sqlite store reuses one connection per thread."""
+
+    def test_connection_is_reused_per_thread(self, sqlite_store):
+        import threading
+
+        conn = sqlite_store._connect()
+        assert sqlite_store._connect() is conn
+
+        other = []
+        worker = threading.Thread(target=lambda: other.append(sqlite_store._connect()))
+        worker.start()
+        worker.join()
+        assert other[0] is not conn
+
+    def test_concurrent_upserts_from_threads(self, sqlite_store):
+        from concurrent.futures import ThreadPoolExecutor
+
+        items = _items(_catalogue(n=80))
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            written = sum(
+                pool.map(
+                    sqlite_store.upsert_embeddings,
+                    [items[i : i + 10] for i in range(0, 80, 10)],
+                )
+            )
+        # Re-upserting the same texts updates rows in place
+        sqlite_store.upsert_embeddings(items[:10])
+
+        count = (
+            sqlite_store._connect()
+            .execute("SELECT COUNT(*) FROM embeddings")
+            .fetchone()[0]
+        )
+        assert written == 80 and count == 80